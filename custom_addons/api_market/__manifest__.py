@@ -26,7 +26,8 @@ Long description of module's purpose
 
     # always loaded
     'data': [
-        # 'security/ir.model.access.csv',
+        'security/ir.model.access.csv',
+        'data/ir_cron_data.xml',
         'views/views.xml',
         'views/templates.xml',
     ],
@@ -30,11 +30,71 @@ JWT_REFRESH_THRESHOLD_SECONDS = int(os.environ.get('SECOND_MARKET_JWT_REFRESH_TH
 # CONFIGURACIÓN DE API
 # ============================================
 
-# Límite de intentos de login fallidos antes de bloqueo temporal
-MAX_LOGIN_ATTEMPTS = 5
-
-# Tiempo de bloqueo temporal en segundos (después de MAX_LOGIN_ATTEMPTS)
-LOGIN_LOCKOUT_SECONDS = 600  # 5 minutos
+# Caché por worker del estado de los usuarios autenticados (activo, login, nombre).
+# Un cambio se aplica al momento en el worker que lo hace; el resto de workers
+# lo ven como mucho AUTH_USER_CACHE_TTL_SECONDS después (p. ej. una desactivación)
+AUTH_USER_CACHE_TTL_SECONDS = int(os.environ.get('SECOND_MARKET_AUTH_USER_CACHE_TTL', 30))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.environ.get('SECOND_MARKET_AUTH_USER_CACHE_MAX_ENTRIES', 4096))
+
+# Segundos entre actualizaciones de la lista de tokens revocados (logout) que
+# cada worker guarda en memoria; es el retraso máximo con el que otro worker
+# rechaza un token revocado
+TOKEN_REVOCATION_REFRESH_SECONDS = int(os.environ.get('SECOND_MARKET_TOKEN_REVOCATION_REFRESH', 5))
+
+# Límite de intentos de login fallidos antes de bloqueo temporal (por login y por IP).
+# El límite por IP es mayor porque varios usuarios pueden compartir IP (NAT, redes móviles)
+MAX_LOGIN_ATTEMPTS = int(os.environ.get('SECOND_MARKET_MAX_LOGIN_ATTEMPTS', 5))
+MAX_LOGIN_ATTEMPTS_PER_IP = int(os.environ.get('SECOND_MARKET_MAX_LOGIN_ATTEMPTS_PER_IP', 20))
+
+# Ventana deslizante en segundos en la que se cuentan los fallos; un login o IP
+# bloqueado vuelve a poder intentarlo cuando caducan sus fallos más antiguos
+LOGIN_LOCKOUT_SECONDS = int(os.environ.get('SECOND_MARKET_LOGIN_LOCKOUT_SECONDS', 600))  # 10 minutos
+
+# Si la búsqueda exacta de /api/v1/articles/list devuelve menos resultados que este
+# umbral en la primera página, se completa con búsqueda aproximada (trigramas)
+SEARCH_FUZZY_MIN_RESULTS = int(os.environ.get('SECOND_MARKET_SEARCH_FUZZY_MIN_RESULTS', 3))
+
+# Radio por defecto y máximo (km) de la búsqueda por cercanía de /api/v1/articles/list
+GEO_DEFAULT_RADIUS_KM = float(os.environ.get('SECOND_MARKET_GEO_DEFAULT_RADIUS_KM', 25))
+GEO_MAX_RADIUS_KM = float(os.environ.get('SECOND_MARKET_GEO_MAX_RADIUS_KM', 200))
+
+# Número máximo de grupos que devuelve /api/v1/articles/map-clusters
+MAP_MAX_CLUSTERS = int(os.environ.get('SECOND_MARKET_MAP_MAX_CLUSTERS', 64))
+
+# Segundos que se reutilizan los conteos de /api/v1/articles/facets para los mismos filtros
+FACETS_CACHE_TTL_SECONDS = int(os.environ.get('SECOND_MARKET_FACETS_CACHE_TTL', 30))
+
+# Caché por worker de las respuestas de /api/v1/articles/list (se invalida al modificar artículos)
+LIST_CACHE_TTL_SECONDS = int(os.environ.get('SECOND_MARKET_LIST_CACHE_TTL', 60))
+LIST_CACHE_MAX_ENTRIES = int(os.environ.get('SECOND_MARKET_LIST_CACHE_MAX_ENTRIES', 512))
+
+# Entrega de imágenes por el proxy inverso (opcional):
+#   ''           — Odoo transmite el fichero del filestore por bloques (por defecto)
+#   'x-accel'    — cabecera X-Accel-Redirect para nginx; requiere una location
+#                  interna IMAGE_X_ACCEL_PREFIX con alias al directorio filestore
+#                  que conserve el ETag calculado por Odoo:
+#                      location /filestore/ {
+#                          internal;
+#                          alias /var/lib/odoo/filestore/;
+#                          etag off;
+#                          add_header ETag $upstream_http_etag;
+#                      }
+#   'x-sendfile' — cabecera X-Sendfile con la ruta absoluta (Apache/lighttpd)
+IMAGE_OFFLOAD = os.environ.get('SECOND_MARKET_IMAGE_OFFLOAD', '').lower()
+IMAGE_X_ACCEL_PREFIX = os.environ.get('SECOND_MARKET_IMAGE_X_ACCEL_PREFIX', '/filestore/')
+
+# Tamaño de bloque (bytes) al transmitir imágenes desde el filestore
+IMAGE_STREAM_CHUNK_SIZE = int(os.environ.get('SECOND_MARKET_IMAGE_STREAM_CHUNK_SIZE', 64 * 1024))
+
+# Subida de imágenes (POST /api/v1/uploads/images): tamaño máximo por fichero y
+# número máximo de ficheros por petición. Se comprueba Content-Length antes de leer el body.
+UPLOAD_MAX_FILE_BYTES = int(os.environ.get('SECOND_MARKET_UPLOAD_MAX_FILE_BYTES', 10 * 1024 * 1024))
+UPLOAD_MAX_FILES = int(os.environ.get('SECOND_MARKET_UPLOAD_MAX_FILES', 10))
+
+# Subidas reanudables (/api/v1/uploads/sessions): tamaño máximo de cada bloque y
+# horas sin actividad tras las que la tarea programada elimina sesiones y subidas sin usar
+UPLOAD_CHUNK_MAX_BYTES = int(os.environ.get('SECOND_MARKET_UPLOAD_CHUNK_MAX_BYTES', 1024 * 1024))
+UPLOAD_SESSION_TTL_HOURS = int(os.environ.get('SECOND_MARKET_UPLOAD_SESSION_TTL_HOURS', 24))
 
 # Habilitar/deshabilitar logging detallado
 API_DEBUG_MODE = os.environ.get('SECOND_MARKET_API_DEBUG', 'False').lower() == 'true'
@@ -61,6 +121,7 @@ RESPONSE_MESSAGES = {
     'LOGIN_SUCCESS': 'Login exitoso',
     'LOGIN_FAILED': 'Credenciales inválidas',
     'ACCOUNT_DISABLED': 'Tu cuenta está deshabilitada. Contacta al soporte.',
+    'TOO_MANY_ATTEMPTS': 'Demasiados intentos de login. Inténtalo de nuevo más tarde.',
     'REGISTRATION_SUCCESS': 'Usuario registrado exitosamente',
     'REGISTRATION_FAILED': 'Error al registrar usuario',
     
@@ -101,4 +162,5 @@ ERROR_CODES = {
     'USER_NOT_FOUND': 'ERR_USER_001',
     'INTERNAL_ERROR': 'ERR_SYS_001',
     'UNAUTHORIZED': 'ERR_AUTH_004',
+    'TOO_MANY_ATTEMPTS': 'ERR_AUTH_005',
 }
\ No newline at end of file
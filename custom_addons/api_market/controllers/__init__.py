@@ -6,4 +6,5 @@ from . import auth_controller
 from . import chat_den_cat
 from . import com_compr_val
 from . import usuario
+from . import imagenes
 
@@ -6,7 +6,9 @@ Controlador de artículos para la API REST de Second Market.
 **Endpoints disponibles:**
 
 - ``GET/POST /api/v1/articles/list``             — Listar artículos con filtros.
-- ``GET       /api/v1/articles/<id>/image``       — Servir imagen principal (binario HTTP).
+- ``GET/POST /api/v1/articles/map-clusters``     — Agrupar artículos del área visible del mapa.
+- ``GET/POST /api/v1/articles/facets``           — Conteos por categoría, estado y precio.
+- ``GET       /api/v1/articles/<id>/image``       — Servir imagen principal (binario HTTP, ``?size=``).
 - ``GET/POST /api/v1/articles/<id>``             — Detalle completo de un artículo.
 - ``POST      /api/v1/articles``                 — Crear un nuevo artículo.
 - ``PUT       /api/v1/articles/<id>``            — Actualizar un artículo existente.
@@ -19,14 +21,178 @@ mediante el header ``Authorization: Bearer <token>``.
 """
 
 from odoo import http, _
+from odoo.exceptions import UserError
 from odoo.http import request
+from odoo.addons.second_market.tools import geohash
+from odoo.addons.second_market.models.second_market_imagen import RENDITION_SIZES
 import logging
 import base64
+import binascii
+import datetime
+import json
 
-from .auth_controller import verify_jwt_token, get_token_from_request, get_authenticated_user_with_refresh
+from .auth_controller import authenticated, current_user_data
+from .serializers import serialize_articles, avatar_url, LIST_KEYS, MY_ARTICLES_KEYS
+from .cache import TTLCache, make_key
+from .imagenes import image_response, parse_size
 
 _logger = logging.getLogger(__name__)
 
+# Importar configuración
+try:
+    from ..config import (
+        SEARCH_FUZZY_MIN_RESULTS, GEO_DEFAULT_RADIUS_KM, GEO_MAX_RADIUS_KM, MAP_MAX_CLUSTERS,
+        FACETS_CACHE_TTL_SECONDS, LIST_CACHE_TTL_SECONDS, LIST_CACHE_MAX_ENTRIES,
+    )
+except ImportError:
+    SEARCH_FUZZY_MIN_RESULTS = 3
+    GEO_DEFAULT_RADIUS_KM = 25.0
+    GEO_MAX_RADIUS_KM = 200.0
+    MAP_MAX_CLUSTERS = 64
+    FACETS_CACHE_TTL_SECONDS = 30
+    LIST_CACHE_TTL_SECONDS = 60
+    LIST_CACHE_MAX_ENTRIES = 512
+
+#: Filtros del body que afectan al resultado de búsqueda (sin paginación ni orden).
+FILTER_KEYS = (
+    'categoria_id', 'precio_min', 'precio_max', 'estado_producto', 'localidad',
+    'search', 'lat', 'lon', 'radius_km', 'bbox',
+)
+
+#: Claves del body que determinan la respuesta de ``/api/v1/articles/list``.
+LIST_CACHE_KEYS = FILTER_KEYS + ('limit', 'offset', 'cursor', 'sort', 'with_total')
+
+_facets_cache = TTLCache(maxsize=512, ttl=FACETS_CACHE_TTL_SECONDS)
+_list_cache = TTLCache(maxsize=LIST_CACHE_MAX_ENTRIES, ttl=LIST_CACHE_TTL_SECONDS)
+
+
+class InvalidCursorError(ValueError):
+    """El cursor de paginación recibido no se puede decodificar."""
+
+
+class InvalidGeoError(ValueError):
+    """Los parámetros geográficos de la petición no son válidos."""
+
+
+def _encode_cursor(key):
+    """Codificar la clave ``(create_date, id)`` como cursor opaco.
+
+    :param key: Tupla ``(create_date, id)`` del último artículo de la página.
+    :type key: tuple
+    :return: Cadena base64 URL-safe que el cliente devuelve tal cual.
+    :rtype: str
+    """
+    create_date, article_id = key
+    raw = json.dumps([create_date.isoformat(), article_id])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def _decode_cursor(cursor):
+    """Decodificar un cursor generado por :func:`_encode_cursor`.
+
+    :param cursor: Cursor opaco recibido del cliente.
+    :type cursor: str
+    :return: Tupla ``(create_date, id)``.
+    :rtype: tuple
+    :raises InvalidCursorError: Si el cursor está mal formado.
+    """
+    try:
+        create_date, article_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.datetime.fromisoformat(create_date), int(article_id)
+    except (AttributeError, TypeError, ValueError, binascii.Error) as e:
+        raise InvalidCursorError(str(e))
+
+
+def _parse_bbox(bbox):
+    """Validar un rectángulo ``{min_lat, min_lon, max_lat, max_lon}``.
+
+    :param bbox: Rectángulo recibido del cliente.
+    :type bbox: dict
+    :return: Tupla ``(min_lat, min_lon, max_lat, max_lon)``.
+    :rtype: tuple
+    :raises InvalidGeoError: Si faltan claves o los valores están fuera de rango.
+    """
+    try:
+        values = tuple(float(bbox[key]) for key in ('min_lat', 'min_lon', 'max_lat', 'max_lon'))
+    except (KeyError, TypeError, ValueError) as e:
+        raise InvalidGeoError(str(e))
+    min_lat, min_lon, max_lat, max_lon = values
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        raise InvalidGeoError('bbox fuera de rango')
+    return values
+
+
+def _parse_geo(data):
+    """Construir el filtro geográfico del listado a partir del body.
+
+    Admite un centro (``lat``, ``lon`` y ``radius_km`` opcional, por defecto
+    ``GEO_DEFAULT_RADIUS_KM`` y como máximo ``GEO_MAX_RADIUS_KM``) o un
+    rectángulo ``bbox`` (el área visible del mapa). Si llegan ambos, el
+    rectángulo filtra y el centro solo sirve para ordenar por distancia.
+
+    :param data: Body JSON de la petición.
+    :type data: dict
+    :return: Filtro para :meth:`second_market.article._api_query` o ``None``
+        si la petición no es geográfica.
+    :rtype: dict or None
+    :raises InvalidGeoError: Si los parámetros no son válidos.
+    """
+    has_center = data.get('lat') is not None or data.get('lon') is not None
+    if not has_center and not data.get('bbox'):
+        return None
+
+    center = None
+    radius_km = None
+    if has_center:
+        try:
+            center = (float(data['lat']), float(data['lon']))
+            radius_km = float(data.get('radius_km') or GEO_DEFAULT_RADIUS_KM)
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidGeoError(str(e))
+        if not (-90 <= center[0] <= 90 and -180 <= center[1] <= 180):
+            raise InvalidGeoError('lat/lon fuera de rango')
+        if not 0 < radius_km <= GEO_MAX_RADIUS_KM:
+            raise InvalidGeoError('radius_km fuera de rango')
+
+    if data.get('bbox'):
+        return {'bbox': _parse_bbox(data['bbox']), 'center': center, 'radius_km': None}
+    return {'bbox': geohash.bbox_around(center[0], center[1], radius_km), 'center': center, 'radius_km': radius_km}
+
+
+def _build_list_domain(data):
+    """Construir el dominio de búsqueda del listado público de artículos.
+
+    El filtro de texto ``search`` no forma parte del dominio: se resuelve con
+    búsqueda de texto completo en :meth:`second_market.article._api_query`.
+
+    :param data: Body JSON de la petición con los filtros opcionales.
+    :type data: dict
+    :return: Dominio de Odoo.
+    :rtype: list
+    """
+    domain = [
+        ('estado_publicacion', '=', 'publicado'),
+        ('activo', '=', True)
+    ]
+
+    # Filtros opcionales
+    if data.get('categoria_id'):
+        domain.append(('id_categoria', '=', data.get('categoria_id')))
+
+    if data.get('precio_min'):
+        domain.append(('precio', '>=', data.get('precio_min')))
+
+    if data.get('precio_max'):
+        domain.append(('precio', '<=', data.get('precio_max')))
+
+    if data.get('estado_producto'):
+        domain.append(('estado_producto', '=', data.get('estado_producto')))
+
+    if data.get('localidad'):
+        domain.append(('localidad', 'ilike', data.get('localidad')))
+
+    return domain
+
 
 class SecondMarketArticleController(http.Controller):
     """Controlador para la gestión de artículos de segunda mano — API v1.
@@ -35,25 +201,13 @@ class SecondMarketArticleController(http.Controller):
     eliminar artículos. Los endpoints de escritura requieren autenticación JWT.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
-
-        Delega en :func:`~api_market.controllers.auth_controller.get_authenticated_user_with_refresh`,
-        incluyendo renovación automática del token si le queda poco tiempo de vida.
-
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``
-            si el usuario no está autenticado.
-        :rtype: dict or None
-        """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/articles/list', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+    @http.route('/api/v1/articles/list', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
     def get_articles(self, **kwargs):
         """Obtener la lista paginada de artículos publicados con filtros opcionales.
 
         La imagen principal **no** se incluye en la respuesta de lista; en su lugar se
-        devuelve ``imagen_url`` apuntando al endpoint binario
-        ``GET /api/v1/articles/<id>/image``, que Android carga de forma lazy con Coil.
+        devuelve ``imagen_url`` apuntando a la versión de 400 px de la imagen principal
+        (``GET /api/v1/images/<id>?size=400``), que Android carga de forma lazy con Coil.
 
         **Body JSON (todos los campos son opcionales):**
 
@@ -67,98 +221,190 @@ class SecondMarketArticleController(http.Controller):
                 "precio_min": 10.0,
                 "precio_max": 500.0,
                 "estado_producto": "bueno",
-                "localidad": "Sevilla"
+                "localidad": "Sevilla",
+                "sort": "recent",
+                "lat": 37.3891,
+                "lon": -5.9845,
+                "radius_km": 10
             }
 
+        ``search`` usa búsqueda de texto completo en español (sin distinguir
+        acentos) sobre nombre, etiquetas y descripción; la última palabra se
+        busca como prefijo. ``sort`` admite ``recent`` (por defecto,
+        ``create_date`` descendente) o ``relevance`` (``ts_rank`` del texto buscado).
+
+        Si la búsqueda por ``search`` y/o ``localidad`` tiene en total menos de
+        ``SEARCH_FUZZY_MIN_RESULTS`` coincidencias exactas, ``did_you_mean``
+        propone una corrección (p. ej. ``{"search": "bicicleta"}``) y, si todas
+        caben en la primera página, esta se completa con búsqueda aproximada por
+        trigramas (tolerante a erratas) y lleva ``fuzzy = true``. ``total``
+        cuenta solo las coincidencias exactas y la paginación no cambia.
+
+        **Búsqueda geográfica:** con ``lat``/``lon`` se devuelven los artículos a
+        menos de ``radius_km`` kilómetros (por defecto ``GEO_DEFAULT_RADIUS_KM``,
+        máximo ``GEO_MAX_RADIUS_KM``), ordenados por ``distance`` salvo que se
+        indique otro ``sort``; cada artículo incluye ``distancia_km``. En su lugar
+        se puede enviar el área visible del mapa como
+        ``"bbox": {"min_lat": .., "min_lon": .., "max_lat": .., "max_lon": ..}``.
+        Los artículos sin coordenadas no aparecen en estas búsquedas. Parámetros
+        inválidos devuelven ``INVALID_GEO``.
+
+        **Caché:** la respuesta no depende del usuario, así que se guarda en la
+        memoria del *worker* durante ``LIST_CACHE_TTL_SECONDS`` segundos con
+        los parámetros del body como clave. Cada entrada lleva la generación de
+        ``second_market.article`` con la que se calculó (ver
+        :meth:`~api_market.models.second_market_articulo.ArticuloSegundaManoApi._api_cache_generation`);
+        al crear, modificar o borrar un artículo cambia la generación y ningún
+        *worker* vuelve a servir las páginas anteriores.
+
+        **Paginación por cursor:** si el body incluye la clave ``cursor`` (``null``
+        para la primera página), se ignora ``offset`` y se pagina sobre
+        ``(create_date, id)``. La respuesta incluye ``next_cursor``, que se envía
+        tal cual en la siguiente petición, y ``has_more``. El total solo se calcula
+        si se pide con ``"with_total": true``. Solo disponible con ``sort = recent``.
+
+        .. code-block:: json
+
+            {"limit": 20, "cursor": "WyIyMDI1LTAxLTAxVDEwOjAwOjAwIiwgNDJd"}
+
         :param kwargs: Parámetros adicionales del dispatcher de Odoo.
         :return: Diccionario con ``success``, ``data.articles``, ``data.total``,
-            ``data.limit`` y ``data.offset``.
+            ``data.limit`` y ``data.offset`` (modo offset) o ``data.next_cursor``
+            y ``data.has_more`` (modo cursor).
         :rtype: dict
         """
         try:
             data = request.params or request.httprequest.get_json(force=True) or {}
+            Article = request.env['second_market.article'].sudo()
+
+            generation = Article._api_cache_generation()
+            cache_key = make_key('list', generation, {key: data[key] for key in LIST_CACHE_KEYS if key in data})
+            response_data = _list_cache.get(cache_key)
+            if response_data is not None:
+                return {
+                    'success': True,
+                    'data': response_data
+                }
             
             limit = data.get('limit', 20)
             offset = data.get('offset', 0)
+            cursor_mode = 'cursor' in data
+            search_text = data.get('search') or None
+            geo = _parse_geo(data)
+            center = geo['center'] if geo else None
+            sort = data.get('sort') or ('distance' if center and not cursor_mode else 'recent')
             
-            # Construir dominio de búsqueda
-            domain = [
-                ('estado_publicacion', '=', 'publicado'),
-                ('activo', '=', True)
-            ]
-            
-            # Filtros opcionales
-            if data.get('categoria_id'):
-                domain.append(('id_categoria', '=', data.get('categoria_id')))
-            
-            if data.get('search'):
-                search_term = data.get('search')
-                domain.append('|')
-                domain.append(('nombre', 'ilike', search_term))
-                domain.append(('descripcion', 'ilike', search_term))
-            
-            if data.get('precio_min'):
-                domain.append(('precio', '>=', data.get('precio_min')))
-            
-            if data.get('precio_max'):
-                domain.append(('precio', '<=', data.get('precio_max')))
-            
-            if data.get('estado_producto'):
-                domain.append(('estado_producto', '=', data.get('estado_producto')))
+            if sort not in ('recent', 'relevance', 'distance'):
+                return {
+                    'success': False,
+                    'message': 'Orden no válido. Usa recent, relevance o distance',
+                    'error_code': 'INVALID_SORT'
+                }
+            if sort == 'distance' and not center:
+                return {
+                    'success': False,
+                    'message': 'El orden distance requiere lat y lon',
+                    'error_code': 'INVALID_SORT'
+                }
+            if cursor_mode and sort != 'recent':
+                return {
+                    'success': False,
+                    'message': 'La paginación por cursor solo admite el orden recent',
+                    'error_code': 'INVALID_SORT'
+                }
             
-            if data.get('localidad'):
-                domain.append(('localidad', 'ilike', data.get('localidad')))
+            domain = _build_list_domain(data)
             
             # Buscar artículos
-            articles = request.env['second_market.article'].sudo().search(
-                domain,
-                limit=limit,
-                offset=offset,
-                order='create_date desc'
-            )
+            if cursor_mode:
+                after = _decode_cursor(data.get('cursor')) if data.get('cursor') else None
+                articles, next_key = Article._search_keyset(domain, limit=limit, after=after, text=search_text, geo=geo)
+                total_count = Article._count_api(domain, search_text, geo) if data.get('with_total') else None
+            else:
+                articles = Article._search_api(
+                    domain,
+                    text=search_text,
+                    sort=sort,
+                    limit=limit,
+                    offset=offset,
+                    geo=geo
+                )
+                total_count = Article._count_api(domain, search_text, geo)
             
-            total_count = request.env['second_market.article'].sudo().search_count(domain)
-            
-            articles_data = []
-            for article in articles:
-                articles_data.append({
-                    'id': article.id,
-                    'codigo': article.codigo,
-                    'nombre': article.nombre,
-                    'descripcion': article.descripcion,
-                    'precio': article.precio,
-                    'estado_producto': article.estado_producto,
-                    'antiguedad': article.antiguedad,
-                    'localidad': article.localidad,
-                    'categoria': {
-                        'id': article.id_categoria.id,
-                        'nombre': article.id_categoria.name
-                    } if article.id_categoria else None,
-                    'propietario': {
-                        'id': article.id_propietario.id,
-                        'nombre': article.id_propietario.name,
-                        'calificacion_promedio': article.id_propietario.calificacion_promedio
-                    } if article.id_propietario else None,
-                    # Sin base64 en la lista — la imagen se carga por URL desde Android
-                    'imagen_principal': None,
-                    'imagen_url': f'/api/v1/articles/{article.id}/image' if article.imagen_principal else None,
-                    'conteo_imagenes': article.conteo_imagenes,
-                    'conteo_favoritos': article.conteo_favoritos,
-                    'conteo_vistas': article.conteo_vistas,
-                    'etiquetas': [{'id': tag.id, 'nombre': tag.name} for tag in article.ids_etiquetas],
-                    'create_date': article.create_date.isoformat() if article.create_date else None
-                })
-
-            return {
-                'success': True,
-                'data': {
+            # Búsqueda aproximada si la exacta tiene pocos resultados en total
+            fuzzy = False
+            did_you_mean = None
+            first_page = not data.get('cursor') and not offset
+            if first_page and (search_text or data.get('localidad')):
+                exact_count = total_count
+                if exact_count is None:
+                    # Sin más páginas, o con una página ya llena, basta con lo leído.
+                    if next_key and len(articles) < SEARCH_FUZZY_MIN_RESULTS:
+                        exact_count = Article._count_api(domain, search_text, geo)
+                    else:
+                        exact_count = len(articles)
+                if exact_count < SEARCH_FUZZY_MIN_RESULTS:
+                    fuzzy_articles, did_you_mean = Article._search_fuzzy(
+                        _build_list_domain(dict(data, localidad=None)),
+                        text=search_text,
+                        localidad=data.get('localidad'),
+                        limit=limit,
+                        geo=geo
+                    )
+                    # Solo se completa la página si ya contiene todos los resultados
+                    # exactos; si no, se conserva la paginación exacta.
+                    extra = fuzzy_articles - articles
+                    if extra and exact_count <= len(articles):
+                        fuzzy = True
+                        articles = (articles | extra)[:limit]
+            
+            articles_data = serialize_articles(articles, LIST_KEYS)
+            if center:
+                for item in articles_data:
+                    item['distancia_km'] = round(
+                        geohash.haversine_km(center[0], center[1], item['latitud'], item['longitud']), 2
+                    )
+
+            if cursor_mode:
+                response_data = {
+                    'articles': articles_data,
+                    'limit': limit,
+                    'next_cursor': _encode_cursor(next_key) if next_key else None,
+                    'has_more': bool(next_key)
+                }
+                if total_count is not None:
+                    response_data['total'] = total_count
+            else:
+                response_data = {
                     'articles': articles_data,
                     'total': total_count,
                     'limit': limit,
                     'offset': offset
                 }
+            response_data['fuzzy'] = fuzzy
+            response_data['did_you_mean'] = did_you_mean
+
+            # Solo se guarda si ningún artículo cambió mientras se calculaba
+            if Article._api_cache_generation() == generation:
+                _list_cache.set(cache_key, response_data)
+
+            return {
+                'success': True,
+                'data': response_data
             }
             
+        except InvalidCursorError:
+            return {
+                'success': False,
+                'message': 'Cursor de paginación inválido',
+                'error_code': 'INVALID_CURSOR'
+            }
+        except InvalidGeoError:
+            return {
+                'success': False,
+                'message': 'Parámetros geográficos inválidos',
+                'error_code': 'INVALID_GEO'
+            }
         except Exception as e:
             _logger.error(f"Error al obtener artículos: {str(e)}", exc_info=True)
             return {
@@ -167,49 +413,219 @@ class SecondMarketArticleController(http.Controller):
                 'error_code': 'GET_ARTICLES_ERROR'
             }
 
-    @http.route('/api/v1/articles/<int:article_id>/image', type='http', auth='public', methods=['GET'], csrf=False, cors='*')
-    def get_article_image(self, article_id, **kwargs):
+    @http.route('/api/v1/articles/map-clusters', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
+    def get_map_clusters(self, **kwargs):
+        """Agrupar en celdas los artículos publicados del área visible del mapa.
+
+        En lugar de un marcador por artículo devuelve un grupo por celda de
+        geohash, calculado en una sola consulta ``GROUP BY``. La precisión de la
+        celda depende de ``zoom`` y se reduce si hiciera falta para que nunca haya
+        más de ``MAP_MAX_CLUSTERS`` grupos, sea cual sea el número de artículos.
+
+        **Body JSON:**
+
+        .. code-block:: json
+
+            {
+                "bbox": {"min_lat": 37.30, "min_lon": -6.05, "max_lat": 37.45, "max_lon": -5.90},
+                "zoom": 12,
+                "categoria_id": 1,
+                "precio_max": 500.0
+            }
+
+        Admite los mismos filtros que ``/api/v1/articles/list`` (salvo ``search``
+        y la paginación). Cada grupo incluye ``geohash``, ``count``, el centroide
+        ``lat``/``lon``, ``precio_min``/``precio_max`` y ``article_id`` cuando la
+        celda contiene un único artículo (para abrir el detalle directamente).
+
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Diccionario con ``success``, ``data.clusters``, ``data.total`` y
+            ``data.precision``.
+        :rtype: dict
+        """
+        try:
+            data = request.params or request.httprequest.get_json(force=True) or {}
+
+            if not data.get('bbox'):
+                return {
+                    'success': False,
+                    'message': 'El campo bbox es requerido',
+                    'error_code': 'MISSING_FIELD'
+                }
+            bbox = _parse_bbox(data['bbox'])
+            try:
+                zoom = int(data.get('zoom', 12))
+            except (TypeError, ValueError) as e:
+                raise InvalidGeoError(str(e))
+
+            precision = min(
+                geohash.precision_for_zoom(zoom),
+                geohash.precision_for_bbox(*bbox, max_cells=MAP_MAX_CLUSTERS),
+            )
+            clusters = request.env['second_market.article'].sudo()._map_clusters(
+                _build_list_domain(data), bbox, precision
+            )
+
+            return {
+                'success': True,
+                'data': {
+                    'clusters': clusters,
+                    'total': sum(cluster['count'] for cluster in clusters),
+                    'precision': precision
+                }
+            }
+
+        except InvalidGeoError:
+            return {
+                'success': False,
+                'message': 'Parámetros geográficos inválidos',
+                'error_code': 'INVALID_GEO'
+            }
+        except Exception as e:
+            _logger.error(f"Error al agrupar artículos del mapa: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'message': 'Error al obtener grupos del mapa',
+                'error_code': 'GET_MAP_CLUSTERS_ERROR'
+            }
+
+    @http.route('/api/v1/articles/facets', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
+    def get_facets(self, **kwargs):
+        """Obtener los conteos de las facetas de búsqueda para los filtros actuales.
+
+        Recibe el mismo body que ``/api/v1/articles/list`` (se ignoran la
+        paginación y el orden) y devuelve, a partir de una única consulta
+        agrupada, cuántos artículos hay por categoría, por estado del producto y
+        por tramo de precio, para que el cliente construya los *chips* de filtro
+        sin peticiones adicionales. El resultado se reutiliza durante
+        ``FACETS_CACHE_TTL_SECONDS`` segundos para los mismos filtros, mientras
+        no se modifique ningún artículo.
+
+        **Respuesta:**
+
+        .. code-block:: json
+
+            {
+                "success": true,
+                "data": {
+                    "total": 42,
+                    "categorias": [{"id": 1, "nombre": "Electrónica", "count": 30}],
+                    "estados_producto": [{"value": "nuevo", "nombre": "Nuevo", "count": 12}],
+                    "precios": [{"min": 0, "max": 10, "count": 5}, {"min": 1000, "max": null, "count": 1}]
+                }
+            }
+
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Diccionario con ``success`` y ``data`` (conteos por faceta).
+        :rtype: dict
+        """
+        try:
+            data = request.params or request.httprequest.get_json(force=True) or {}
+            filters = {key: data[key] for key in FILTER_KEYS if data.get(key) not in (None, '')}
+            Article = request.env['second_market.article'].sudo()
+
+            generation = Article._api_cache_generation()
+            cache_key = make_key('facets', generation, filters)
+            response_data = _facets_cache.get(cache_key)
+            if response_data is None:
+                counts = Article._facet_counts(
+                    _build_list_domain(filters),
+                    text=filters.get('search'),
+                    geo=_parse_geo(filters)
+                )
+
+                categories = request.env['second_market.category'].sudo().browse(list(counts['categorias']))
+                category_names = {cat['id']: cat['name'] for cat in categories.read(['name'])}
+                estado_labels = dict(Article._fields['estado_producto'].selection)
+
+                response_data = {
+                    'total': counts['total'],
+                    'categorias': sorted((
+                        {'id': cat_id, 'nombre': category_names.get(cat_id), 'count': count}
+                        for cat_id, count in counts['categorias'].items()
+                    ), key=lambda item: -item['count']),
+                    'estados_producto': [
+                        {'value': value, 'nombre': label, 'count': counts['estados_producto'][value]}
+                        for value, label in estado_labels.items()
+                        if value in counts['estados_producto']
+                    ],
+                    'precios': counts['precios']
+                }
+                if Article._api_cache_generation() == generation:
+                    _facets_cache.set(cache_key, response_data)
+
+            return {
+                'success': True,
+                'data': response_data
+            }
+
+        except InvalidGeoError:
+            return {
+                'success': False,
+                'message': 'Parámetros geográficos inválidos',
+                'error_code': 'INVALID_GEO'
+            }
+        except Exception as e:
+            _logger.error(f"Error al obtener facetas: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'message': 'Error al obtener facetas',
+                'error_code': 'GET_FACETS_ERROR'
+            }
+
+    @http.route('/api/v1/articles/<int:article_id>/image', type='http', auth='public', methods=['GET'], csrf=False, save_session=False, cors='*')
+    def get_article_image(self, article_id, size=None, **kwargs):
         """Servir la imagen principal de un artículo en formato binario.
 
         Endpoint de tipo ``http`` (no JSON) que devuelve los bytes de la imagen
-        directamente con su ``Content-Type``. Usado por Android con Coil para
+        directamente con su ``Content-Type`` real. Usado por Android con Coil para
         carga lazy de imágenes (solo cuando la tarjeta es visible en pantalla).
+        Admite el mismo parámetro ``size`` que ``/api/v1/images/<id>``.
 
         Incluye ``Cache-Control: public, max-age=86400`` para evitar peticiones
         repetidas durante 24 horas.
 
         :param article_id: ID del artículo cuya imagen se quiere servir.
         :type article_id: int
+        :param size: Lado mayor deseado en píxeles u ``original`` (por defecto).
+        :type size: str or None
         :param kwargs: Parámetros adicionales del dispatcher de Odoo.
         :return: Respuesta HTTP con la imagen en binario, o ``404 Not Found``
             si el artículo no existe o no tiene imagen.
         :rtype: :class:`odoo.http.Response`
         """
         try:
+            try:
+                size = parse_size(size)
+            except ValueError:
+                return request.make_response(_('Parámetro size no válido'), status=400)
+
             article = request.env['second_market.article'].sudo().browse(article_id)
-            if not article.exists() or not article.imagen_principal:
+            if not article.exists() or not article.main_image_id:
                 return request.not_found()
 
-            image_data = base64.b64decode(article.imagen_principal)
-            return request.make_response(
-                image_data,
-                headers=[
-                    ('Content-Type', 'image/jpeg'),
-                    ('Content-Length', str(len(image_data))),
-                    ('Cache-Control', 'public, max-age=86400'),
-                ]
-            )
+            return image_response(article.main_image_id, size)
         except Exception as e:
             _logger.error(f"Error al servir imagen del artículo {article_id}: {e}")
             return request.not_found()
 
-    @http.route('/api/v1/articles/<int:article_id>', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+    @http.route('/api/v1/articles/<int:article_id>', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
     def get_article_detail(self, article_id, **kwargs):
-        """Obtener el detalle completo de un artículo e incrementar su contador de vistas.
+        """Obtener el detalle completo de un artículo y registrar la visita.
 
-        Devuelve todos los campos del artículo, sus imágenes en base64, los comentarios
+        Devuelve todos los campos del artículo, sus imágenes, los comentarios
         activos y datos públicos del propietario.
 
+        Cada imagen se describe con ``id``, ``width``, ``height``, ``url``
+        (original) y ``urls`` (versiones de 128, 400 y 1024 px) para descargarla
+        desde ``GET /api/v1/images/<id>``. Por compatibilidad, con
+        ``"inline_images": true`` en el body se incluye además el contenido en
+        base64 en ``image``.
+
+        La visita se apunta en una tabla auxiliar sin escribir en la fila del
+        artículo; ``conteo_vistas`` refleja las visitas sumadas por la tarea
+        programada *Second Market: actualizar contador de vistas* (cada 5 minutos).
+
         :param article_id: ID del artículo a consultar.
         :type article_id: int
         :param kwargs: Parámetros adicionales del dispatcher de Odoo.
@@ -226,18 +642,28 @@ class SecondMarketArticleController(http.Controller):
                     'error_code': 'ARTICLE_NOT_FOUND'
                 }
             
-            # Incrementar vistas
-            article.sudo().write({'conteo_vistas': article.conteo_vistas + 1})
+            # Apuntar la visita; el contador se actualiza en lote desde el cron
+            article._record_view(article.id)
             
-            # Obtener imágenes
+            # Obtener imágenes (referencias; el contenido se sirve en /api/v1/images/<id>)
+            data = request.params or request.httprequest.get_json(force=True, silent=True) or {}
+            inline_images = bool(data.get('inline_images'))
             imagenes = []
             for img in article.ids_imagenes:
-                imagenes.append({
+                imagen = {
                     'id': img.id,
                     'name': img.name,
-                    'image': img.image.decode('utf-8') if img.image else None,
-                    'sequence': img.sequence
-                })
+                    'sequence': img.sequence,
+                    'width': img.width,
+                    'height': img.height,
+                    'url': f'/api/v1/images/{img.id}',
+                    'urls': {
+                        str(size): f'/api/v1/images/{img.id}?size={size}' for size in RENDITION_SIZES
+                    }
+                }
+                if inline_images:
+                    imagen['image'] = img.image.decode('utf-8') if img.image else None
+                imagenes.append(imagen)
             
             # Obtener comentarios
             comentarios = []
@@ -276,7 +702,8 @@ class SecondMarketArticleController(http.Controller):
                     'calificacion_promedio': article.id_propietario.calificacion_promedio,
                     'total_valoraciones': article.id_propietario.total_valoraciones,
                     'productos_vendidos': article.id_propietario.productos_vendidos,
-                    'antiguedad': article.id_propietario.antiguedad
+                    'antiguedad': article.id_propietario.antiguedad,
+                    'avatar_url': avatar_url(article.id_propietario.id, article.id_propietario.avatar_version)
                 } if article.id_propietario else None,
                 'imagenes': imagenes,
                 'etiquetas': [{'id': tag.id, 'nombre': tag.name} for tag in article.ids_etiquetas],
@@ -300,13 +727,18 @@ class SecondMarketArticleController(http.Controller):
                 'error_code': 'GET_ARTICLE_ERROR'
             }
 
-    @http.route('/api/v1/articles', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/articles', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def create_article(self, **kwargs):
         """Crear un nuevo artículo y publicarlo directamente.
 
         El usuario autenticado se convierte en el propietario. El artículo se crea
         directamente en estado ``publicado``. Se admiten entre 1 y 10 imágenes.
 
+        Las imágenes se pueden enviar en base64 en ``imagenes`` o, preferiblemente,
+        subirse antes en binario a ``POST /api/v1/uploads/images`` y referenciarse
+        aquí con ``"imagen_tokens": ["<token>", ...]`` (en el orden de aparición).
+
         **Header requerido:** ``Authorization: Bearer <token>``
 
         **Body JSON:**
@@ -330,27 +762,21 @@ class SecondMarketArticleController(http.Controller):
             }
 
         Los campos ``antiguedad``, ``latitud``, ``longitud`` y ``etiquetas_ids`` son opcionales.
+        ``imagenes`` e ``imagen_tokens`` son alternativos.
 
         :param kwargs: Parámetros adicionales del dispatcher de Odoo.
         :return: Diccionario con ``success``, ``message`` y ``data.article_id`` + ``data.codigo``.
         :rtype: dict
         """
         try:
-            # Verificar autenticación
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {
-                    'success': False,
-                    'message': 'No autenticado. Debe proporcionar token en header Authorization',
-                    'error_code': 'UNAUTHORIZED'
-                }
-            
             data = request.params or request.httprequest.get_json(force=True) or {}
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             
             # Validar campos requeridos
-            required_fields = ['nombre', 'descripcion', 'precio', 'estado_producto', 'localidad', 'categoria_id', 'imagenes']
+            imagen_tokens = data.get('imagen_tokens') or []
+            required_fields = ['nombre', 'descripcion', 'precio', 'estado_producto', 'localidad', 'categoria_id']
+            if not imagen_tokens:
+                required_fields.append('imagenes')
             for field in required_fields:
                 if not data.get(field):
                     return {
@@ -360,14 +786,33 @@ class SecondMarketArticleController(http.Controller):
                     }
             
             # Validar imágenes
-            imagenes = data.get('imagenes', [])
-            if len(imagenes) < 1 or len(imagenes) > 10:
+            imagenes = data.get('imagenes') or []
+            if imagen_tokens and imagenes:
+                return {
+                    'success': False,
+                    'message': 'Usa imagenes o imagen_tokens, no ambos',
+                    'error_code': 'INVALID_IMAGE_COUNT'
+                }
+            if not 1 <= len(imagenes or imagen_tokens) <= 10:
                 return {
                     'success': False,
                     'message': 'Debes subir entre 1 y 10 imágenes',
                     'error_code': 'INVALID_IMAGE_COUNT'
                 }
             
+            # Imágenes subidas previamente en binario
+            if imagen_tokens:
+                try:
+                    uploads = request.env['second_market.upload'].sudo()._ready_uploads(
+                        imagen_tokens, user_data['user_id']
+                    )
+                except UserError:
+                    return {
+                        'success': False,
+                        'message': 'Alguna imagen subida no existe o ha caducado',
+                        'error_code': 'INVALID_UPLOAD_TOKEN'
+                    }
+            
             # Crear artículo
             article_vals = {
                 'nombre': data.get('nombre'),
@@ -385,14 +830,17 @@ class SecondMarketArticleController(http.Controller):
             
             article = request.env['second_market.article'].sudo().create(article_vals)
             
-            # Agregar imágenes
-            for img_data in imagenes:
-                request.env['second_market.image'].sudo().create({
+            # Agregar imágenes: las subidas ya normalizadas se reasignan al artículo;
+            # las enviadas en base64 se crean en una sola llamada para normalizarlas en paralelo.
+            if imagen_tokens:
+                uploads._consume(article.id)
+            else:
+                request.env['second_market.image'].sudo().create([{
                     'article_id': article.id,
                     'image': img_data.get('image'),
                     'name': img_data.get('name', ''),
                     'sequence': img_data.get('sequence', 10)
-                })
+                } for img_data in imagenes])
             
             # Agregar etiquetas si existen
             if data.get('etiquetas_ids'):
@@ -424,11 +872,6 @@ class SecondMarketArticleController(http.Controller):
                     'codigo': article.codigo
                 }
             }
-            
-            # Agregar nuevo token si fue renovado
-            if new_token:
-                response['new_token'] = new_token
-                
             return response
             
         except Exception as e:
@@ -440,7 +883,8 @@ class SecondMarketArticleController(http.Controller):
                 'error_detail': str(e)
             }
 
-    @http.route('/api/v1/articles/<int:article_id>', type='json', auth='public', methods=['PUT'], csrf=False, cors='*')
+    @http.route('/api/v1/articles/<int:article_id>', type='json', auth='public', methods=['PUT'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def update_article(self, article_id, **kwargs):
         """Actualizar uno o varios campos de un artículo existente.
 
@@ -467,15 +911,7 @@ class SecondMarketArticleController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {
-                    'success': False,
-                    'message': 'No autenticado',
-                    'error_code': 'UNAUTHORIZED'
-                }
-
-            user = auth_result['user_data']['user']
+            user = current_user_data()['user']
 
             article = request.env['second_market.article'].sudo().browse(article_id)
             if not article.exists():
@@ -530,7 +966,8 @@ class SecondMarketArticleController(http.Controller):
                 'error_code': 'UPDATE_ARTICLE_ERROR'
             }
 
-    @http.route('/api/v1/articles/<int:article_id>/publish', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/articles/<int:article_id>/publish', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def publish_article(self, article_id, **kwargs):
         """Cambiar el estado de un artículo a ``publicado``.
 
@@ -546,16 +983,7 @@ class SecondMarketArticleController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {
-                    'success': False,
-                    'message': 'No autenticado. Debe proporcionar token en header Authorization',
-                    'error_code': 'UNAUTHORIZED'
-                }
-            
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             
             article = request.env['second_market.article'].sudo().browse(article_id)
             
@@ -579,11 +1007,6 @@ class SecondMarketArticleController(http.Controller):
                 'success': True,
                 'message': 'Artículo publicado exitosamente'
             }
-            
-            # Agregar nuevo token si fue renovado
-            if new_token:
-                response['new_token'] = new_token
-                
             return response
             
         except Exception as e:
@@ -594,7 +1017,8 @@ class SecondMarketArticleController(http.Controller):
                 'error_code': 'PUBLISH_ERROR'
             }
 
-    @http.route('/api/v1/articles/<int:article_id>', type='json', auth='public', methods=['DELETE'], csrf=False, cors='*')
+    @http.route('/api/v1/articles/<int:article_id>', type='json', auth='public', methods=['DELETE'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def delete_article(self, article_id, **kwargs):
         """Desactivar (borrado lógico) un artículo.
 
@@ -611,16 +1035,7 @@ class SecondMarketArticleController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {
-                    'success': False,
-                    'message': 'No autenticado. Debe proporcionar token en header Authorization',
-                    'error_code': 'UNAUTHORIZED'
-                }
-            
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             
             article = request.env['second_market.article'].sudo().browse(article_id)
             
@@ -647,11 +1062,6 @@ class SecondMarketArticleController(http.Controller):
                 'success': True,
                 'message': 'Artículo eliminado exitosamente'
             }
-            
-            # Agregar nuevo token si fue renovado
-            if new_token:
-                response['new_token'] = new_token
-                
             return response
             
         except Exception as e:
@@ -662,7 +1072,8 @@ class SecondMarketArticleController(http.Controller):
                 'error_code': 'DELETE_ERROR'
             }
 
-    @http.route('/api/v1/articles/my-articles', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+    @http.route('/api/v1/articles/my-articles', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def get_my_articles(self, **kwargs):
         """Obtener todos los artículos del usuario autenticado (todos los estados).
 
@@ -671,22 +1082,18 @@ class SecondMarketArticleController(http.Controller):
 
         **Header requerido:** ``Authorization: Bearer <token>``
 
+        La imagen principal se devuelve como referencia en ``imagen_url``
+        (versión de 400 px en ``GET /api/v1/images/<id>``) e ``imagen_principal``
+        es ``null``. Por compatibilidad, con ``"inline_images": true`` en el
+        body ``imagen_principal`` incluye el contenido en base64.
+
         :param kwargs: Parámetros opcionales: ``limit`` (por defecto 20)
             y ``offset`` (por defecto 0).
         :return: Diccionario con ``success``, ``data.articles`` y ``data.total``.
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {
-                    'success': False,
-                    'message': 'No autenticado. Debe proporcionar token en header Authorization',
-                    'error_code': 'UNAUTHORIZED'
-                }
-            
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             
             data = request.httprequest.get_json(force=True) or {}
             limit = data.get('limit', 20)
@@ -700,21 +1107,9 @@ class SecondMarketArticleController(http.Controller):
                 ('id_propietario', '=', user_data['user_id'])
             ])
             
-            articles_data = []
-            for article in articles:
-                articles_data.append({
-                    'id': article.id,
-                    'codigo': article.codigo,
-                    'nombre': article.nombre,
-                    'precio': article.precio,
-                    'estado_producto': article.estado_producto,
-                    'estado_publicacion': article.estado_publicacion,
-                    'activo': article.activo,
-                    'conteo_vistas': article.conteo_vistas,
-                    'conteo_comentarios': article.conteo_comentarios,
-                    'imagen_principal': article.imagen_principal.decode('utf-8') if article.imagen_principal else None,
-                    'create_date': article.create_date.isoformat() if article.create_date else None
-                })
+            articles_data = serialize_articles(
+                articles, MY_ARTICLES_KEYS, embed_image=bool(data.get('inline_images'))
+            )
             
             response = {
                 'success': True,
@@ -723,11 +1118,6 @@ class SecondMarketArticleController(http.Controller):
                     'total': total_count
                 }
             }
-            
-            # Agregar nuevo token si fue renovado
-            if new_token:
-                response['new_token'] = new_token
-                
             return response
             
         except Exception as e:
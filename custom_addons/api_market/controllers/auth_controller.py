@@ -14,12 +14,53 @@ Variables de configuración (importadas desde ``config.py`` con fallback):
 - ``JWT_EXP_DELTA_SECONDS``: Duración del token en segundos (por defecto 86 400 = 24h).
 - ``JWT_REFRESH_THRESHOLD_SECONDS``: Segundos restantes a partir de los cuales se
   renueva automáticamente el token (por defecto 7 200 = 2h).
+- ``AUTH_USER_CACHE_TTL_SECONDS`` / ``AUTH_USER_CACHE_MAX_ENTRIES``: Vida y
+  tamaño de la caché por *worker* del estado de los usuarios (ver
+  :func:`get_user_state`).
+
+**Caché de usuarios:** el estado de cada usuario (``activo``, ``login``,
+``name``, ``id_usuario``) se guarda en memoria del *worker*, de modo que
+verificar un token de un usuario ya visto no ejecuta ninguna consulta SQL.
+Al modificar esos campos o borrar el usuario, :func:`invalidate_user_cache` se
+llama desde ``second_market.user`` (ver :mod:`api_market.models.second_market_user`);
+los demás *workers* ven el cambio al caducar su entrada.
+
+**Contexto de autenticación:** :func:`get_auth_context` verifica el token una
+sola vez por petición (una decodificación y, como mucho, una lectura del
+usuario) y guarda el resultado en la propia petición. Los endpoints JSON que
+requieren autenticación usan el decorador :func:`authenticated`::
+
+    @http.route('/api/v1/chats', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
+    def handle_chats(self, **kwargs):
+        user_data = current_user_data()
+        ...
+        return {'success': True, 'data': ...}   # new_token se añade solo
+
+Los endpoints ``type='http'`` (subidas binarias) usan :func:`authenticated_http`,
+que responde igual pero con una respuesta JSON y estado ``401``.
+
+Las respuestas llevan la cabecera ``Server-Timing`` con la duración de la
+autenticación (``auth``) y, con el decorador, la del endpoint (``app``).
+
+**Revocación:** todos los tokens se emiten con :func:`issue_token`, que añade
+un identificador único (``jti``). El logout lo revoca con :func:`revoke_token`
+(tabla ``second_market.token.revocation``) y :func:`is_token_revoked` lo
+comprueba contra un conjunto en memoria del *worker* que se actualiza de forma
+incremental como mucho cada ``TOKEN_REVOCATION_REFRESH_SECONDS`` segundos; el
+resto de comprobaciones no consultan la base de datos.
 """
 
 from odoo.http import request
 import jwt
 import datetime
+import functools
 import logging
+import secrets
+import threading
+import time
+
+from .cache import TTLCache
 
 _logger = logging.getLogger(__name__)
 
@@ -30,6 +71,9 @@ try:
         JWT_ALGORITHM,
         JWT_EXP_DELTA_SECONDS,
         JWT_REFRESH_THRESHOLD_SECONDS,
+        AUTH_USER_CACHE_TTL_SECONDS,
+        AUTH_USER_CACHE_MAX_ENTRIES,
+        TOKEN_REVOCATION_REFRESH_SECONDS,
     )
 except ImportError:
     # Fallback si no existe config.py
@@ -37,6 +81,150 @@ except ImportError:
     JWT_ALGORITHM = 'HS256'
     JWT_EXP_DELTA_SECONDS = 86400
     JWT_REFRESH_THRESHOLD_SECONDS = 7200
+    AUTH_USER_CACHE_TTL_SECONDS = 30
+    AUTH_USER_CACHE_MAX_ENTRIES = 4096
+    TOKEN_REVOCATION_REFRESH_SECONDS = 5
+
+#: Campos de ``second_market.user`` guardados en la caché de usuarios.
+USER_STATE_FIELDS = ('activo', 'login', 'name', 'id_usuario')
+
+#: Estado de los usuarios por ``user_id`` (``None`` si el usuario no existe).
+_user_cache = TTLCache(maxsize=AUTH_USER_CACHE_MAX_ENTRIES, ttl=AUTH_USER_CACHE_TTL_SECONDS)
+
+#: Valor guardado en la caché para usuarios inexistentes (``get`` devuelve ``None`` si no hay entrada).
+_MISSING_USER = object()
+
+
+def get_user_state(user_id):
+    """Obtener el estado de un usuario, desde la caché del *worker* si es posible.
+
+    En caso de fallo de caché se lee con una única consulta y se guarda
+    también la inexistencia del usuario, para que un token de un usuario
+    borrado no consulte la base de datos en cada petición.
+
+    :param user_id: ID interno del usuario.
+    :type user_id: int
+    :return: Diccionario con ``activo``, ``login``, ``name`` e ``id_usuario``,
+        o ``None`` si el usuario no existe.
+    :rtype: dict or None
+    """
+    state = _user_cache.get(user_id)
+    if state is None:
+        rows = request.env['second_market.user'].sudo().search_read([('id', '=', user_id)], list(USER_STATE_FIELDS))
+        state = {field: rows[0][field] for field in USER_STATE_FIELDS} if rows else _MISSING_USER
+        _user_cache.set(user_id, state)
+    return None if state is _MISSING_USER else state
+
+
+def invalidate_user_cache(user_ids):
+    """Descartar de la caché de este *worker* el estado de varios usuarios.
+
+    :param user_ids: IDs internos de los usuarios.
+    :type user_ids: list[int]
+    """
+    for user_id in user_ids:
+        _user_cache.pop(user_id)
+
+
+#: Tokens revocados conocidos por este *worker*: ``jti`` → caducidad (*timestamp* UNIX).
+_revoked_tokens = {}
+
+#: Estado de la sincronización de :data:`_revoked_tokens` con la base de datos.
+_revocation_sync = {'synced_at': None, 'checked': 0.0}
+
+_revocation_lock = threading.Lock()
+
+
+def _sync_revocations():
+    """Actualizar el conjunto de tokens revocados si ha pasado el intervalo.
+
+    La primera vez carga todas las revocaciones vigentes; después solo las
+    nuevas. Descarta también las de tokens ya caducados.
+    """
+    now = time.monotonic()
+    if now - _revocation_sync['checked'] < TOKEN_REVOCATION_REFRESH_SECONDS:
+        return
+    with _revocation_lock:
+        if now - _revocation_sync['checked'] < TOKEN_REVOCATION_REFRESH_SECONDS:
+            return
+        synced_at, revoked = request.env['second_market.token.revocation'].sudo()._revoked_since(
+            _revocation_sync['synced_at']
+        )
+        _revoked_tokens.update(revoked)
+        expired_before = time.time()
+        for jti in [jti for jti, expires in _revoked_tokens.items() if expires <= expired_before]:
+            del _revoked_tokens[jti]
+        _revocation_sync['synced_at'] = synced_at
+        _revocation_sync['checked'] = now
+
+
+def is_token_revoked(jti):
+    """Comprobar si un token ha sido revocado.
+
+    Solo consulta la base de datos cuando toca actualizar el conjunto en
+    memoria (ver :func:`_sync_revocations`). Los tokens emitidos antes de
+    incluir ``jti`` no se pueden revocar.
+
+    :param jti: Identificador del token (claim ``jti``).
+    :type jti: str or None
+    :rtype: bool
+    """
+    if not jti:
+        return False
+    _sync_revocations()
+    return jti in _revoked_tokens
+
+
+def revoke_token(payload):
+    """Revocar un token hasta su caducidad.
+
+    El cambio se aplica al momento en este *worker* y en los demás tras su
+    siguiente actualización.
+
+    :param payload: *Payload* verificado del token.
+    :type payload: dict
+    :return: ``True`` si el token tenía ``jti`` y se ha revocado.
+    :rtype: bool
+    """
+    jti = payload.get('jti')
+    if not jti or not payload.get('exp'):
+        return False
+    request.env['second_market.token.revocation'].sudo()._revoke(
+        jti, payload.get('user_id'), datetime.datetime.utcfromtimestamp(payload['exp'])
+    )
+    with _revocation_lock:
+        _revoked_tokens[jti] = float(payload['exp'])
+    return True
+
+
+def issue_token(user_id, id_usuario, login, name):
+    """Emitir un token JWT para un usuario.
+
+    Único punto de emisión de tokens (login, registro y renovación automática):
+    todos llevan ``jti`` para poder revocarlos.
+
+    :param user_id: ID interno del usuario.
+    :type user_id: int
+    :param id_usuario: ID público de 7 dígitos.
+    :type id_usuario: str
+    :param login: Login del usuario.
+    :type login: str
+    :param name: Nombre del usuario.
+    :type name: str
+    :return: Token JWT firmado.
+    :rtype: str
+    """
+    now = datetime.datetime.utcnow()
+    payload = {
+        'user_id': user_id,
+        'id_usuario': id_usuario,
+        'login': login,
+        'name': name,
+        'jti': secrets.token_urlsafe(16),
+        'exp': now + datetime.timedelta(seconds=JWT_EXP_DELTA_SECONDS),
+        'iat': now
+    }
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
 
 
 def get_token_from_request():
@@ -57,11 +245,92 @@ def get_token_from_request():
     return None
 
 
+def _decode_token(token):
+    """Decodificar y verificar la firma y la caducidad de un token JWT.
+
+    :param token: Token JWT.
+    :type token: str
+    :return: *Payload* del token o ``None`` si ha expirado o no es válido.
+    :rtype: dict or None
+    """
+    try:
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        _logger.warning("Token expirado")
+    except jwt.InvalidTokenError as e:
+        _logger.warning(f"Token inválido: {str(e)}")
+    return None
+
+
+def _user_data_from_payload(payload):
+    """Obtener los datos del usuario de un *payload* ya verificado.
+
+    :param payload: *Payload* devuelto por :func:`_decode_token`.
+    :type payload: dict
+    :return: Datos del usuario (ver :func:`verify_jwt_token`) o ``None`` si
+        el token está revocado o el usuario no existe o está inactivo.
+    :rtype: dict or None
+    """
+    user_id = payload.get('user_id')
+
+    if not user_id:
+        _logger.warning("Token sin user_id")
+        return None
+
+    if is_token_revoked(payload.get('jti')):
+        _logger.warning(f"Token revocado para usuario {user_id}")
+        return None
+
+    state = get_user_state(user_id)
+
+    if not state or not state['activo']:
+        _logger.warning(f"Usuario {user_id} no encontrado o inactivo")
+        return None
+
+    return {
+        'user_id': user_id,
+        'id_usuario': state['id_usuario'],
+        'login': state['login'],
+        'name': state['name'],
+        'user': request.env['second_market.user'].sudo().browse(user_id)
+    }
+
+
+def _refresh_token_for(payload, user_data):
+    """Emitir un token nuevo si al actual le queda poco tiempo de vida.
+
+    :param payload: *Payload* verificado del token actual.
+    :type payload: dict
+    :param user_data: Datos del usuario obtenidos de ese *payload*.
+    :type user_data: dict
+    :return: Nuevo token JWT o ``None`` si no hace falta renovarlo.
+    :rtype: str or None
+    """
+    exp_timestamp = payload.get('exp')
+    if not exp_timestamp:
+        return None
+
+    now = datetime.datetime.utcnow()
+    exp_datetime = datetime.datetime.utcfromtimestamp(exp_timestamp)
+    time_remaining = (exp_datetime - now).total_seconds()
+
+    if time_remaining >= JWT_REFRESH_THRESHOLD_SECONDS:
+        return None
+
+    new_token = issue_token(user_data['user_id'], user_data['id_usuario'], user_data['login'], user_data['name'])
+    _logger.info(f"Token auto-renovado para usuario: {user_data['login']} (ID: {user_data['user_id']})")
+    return new_token
+
+
 def verify_jwt_token(token):
     """Verificar un token JWT y devolver los datos del usuario asociado.
 
     Decodifica el token, extrae el ``user_id`` del payload, y comprueba
-    que el usuario exista y esté activo en ``second_market.user``.
+    que el usuario exista y esté activo en ``second_market.user``. El estado
+    del usuario se obtiene con :func:`get_user_state`, sin SQL si está en caché.
+
+    Para el token de la petición actual es preferible :func:`get_auth_context`,
+    que no repite la verificación si ya se hizo.
 
     Uso típico desde otros controladores::
 
@@ -84,7 +353,7 @@ def verify_jwt_token(token):
                 'id_usuario': str,
                 'login': str,
                 'name': str,
-                'user': second_market.user  # Recordset completo
+                'user': second_market.user  # Recordset (browse, sin leer)
             }
 
         Devuelve ``None`` si el token ha expirado, es inválido o el
@@ -92,33 +361,8 @@ def verify_jwt_token(token):
     :rtype: dict or None
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-        user_id = payload.get('user_id')
-
-        if not user_id:
-            _logger.warning("Token sin user_id")
-            return None
-
-        user = request.env['second_market.user'].sudo().browse(user_id)
-
-        if not user.exists() or not user.activo:
-            _logger.warning(f"Usuario {user_id} no encontrado o inactivo")
-            return None
-
-        return {
-            'user_id': user.id,
-            'id_usuario': user.id_usuario,
-            'login': user.login,
-            'name': user.name,
-            'user': user
-        }
-
-    except jwt.ExpiredSignatureError:
-        _logger.warning("Token expirado")
-        return None
-    except jwt.InvalidTokenError as e:
-        _logger.warning(f"Token inválido: {str(e)}")
-        return None
+        payload = _decode_token(token)
+        return _user_data_from_payload(payload) if payload else None
     except Exception as e:
         _logger.error(f"Error al verificar token: {str(e)}", exc_info=True)
         return None
@@ -142,56 +386,154 @@ def auto_refresh_token_if_needed(token):
         devuelve ``None`` sin intentar la renovación.
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
-
-        exp_timestamp = payload.get('exp')
-        if not exp_timestamp:
+        payload = _decode_token(token)
+        if not payload:
+            return None
+        user_data = _user_data_from_payload(payload)
+        if not user_data:
+            _logger.warning(f"Usuario {payload.get('user_id')} no encontrado o inactivo durante auto-refresh")
             return None
+        return _refresh_token_for(payload, user_data)
+    except Exception as e:
+        _logger.error(f"Error en auto-refresh de token: {str(e)}", exc_info=True)
+        return None
 
-        now = datetime.datetime.utcnow()
-        exp_datetime = datetime.datetime.utcfromtimestamp(exp_timestamp)
-        time_remaining = (exp_datetime - now).total_seconds()
-
-        if time_remaining < JWT_REFRESH_THRESHOLD_SECONDS:
-            user_id = payload.get('user_id')
-            user = request.env['second_market.user'].sudo().browse(user_id)
-
-            if not user.exists() or not user.activo:
-                _logger.warning(f"Usuario {user_id} no encontrado o inactivo durante auto-refresh")
-                return None
-
-            new_payload = {
-                'user_id': user.id,
-                'id_usuario': user.id_usuario,
-                'login': user.login,
-                'name': user.name,
-                'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=JWT_EXP_DELTA_SECONDS),
-                'iat': datetime.datetime.utcnow()
-            }
 
-            new_token = jwt.encode(new_payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
-            _logger.info(f"Token auto-renovado para usuario: {user.login} (ID: {user.id})")
-            return new_token
+def _add_server_timing(name, started):
+    """Añadir una métrica a la cabecera ``Server-Timing`` de la respuesta.
 
-        return None
+    :param name: Nombre de la métrica (``auth``, ``app``...).
+    :type name: str
+    :param started: Instante de inicio según :func:`time.perf_counter`.
+    :type started: float
+    """
+    duration = (time.perf_counter() - started) * 1000
+    request.future_response.headers.add('Server-Timing', f'{name};dur={duration:.1f}')
 
-    except jwt.ExpiredSignatureError:
-        return None
-    except Exception as e:
-        _logger.error(f"Error en auto-refresh de token: {str(e)}", exc_info=True)
-        return None
+
+def get_auth_context():
+    """Autenticar la petición actual una sola vez y reutilizar el resultado.
+
+    El token del header ``Authorization`` se decodifica y verifica una vez; la
+    renovación automática usa el mismo *payload* y los mismos datos del
+    usuario. El resultado (también el fallo) se guarda en la petición, de modo
+    que las siguientes llamadas no repiten ningún trabajo.
+
+    :return: Diccionario ``{'user_data': dict, 'new_token': str}`` (``new_token``
+        solo si el token se renovó) o ``None`` si no hay token, no es válido o
+        el usuario no existe / está inactivo.
+    :rtype: dict or None
+    """
+    try:
+        return request._second_market_auth
+    except AttributeError:
+        pass
+
+    started = time.perf_counter()
+    context = None
+    token = get_token_from_request()
+    if token:
+        try:
+            payload = _decode_token(token)
+            user_data = _user_data_from_payload(payload) if payload else None
+            if user_data:
+                context = {'user_data': user_data}
+                new_token = _refresh_token_for(payload, user_data)
+                if new_token:
+                    context['new_token'] = new_token
+        except Exception as e:
+            _logger.error(f"Error al verificar token: {str(e)}", exc_info=True)
+            context = None
+        _add_server_timing('auth', started)
+
+    request._second_market_auth = context
+    return context
+
+
+def current_user_data():
+    """Datos del usuario autenticado en la petición actual.
+
+    Pensada para endpoints protegidos con :func:`authenticated`, donde la
+    autenticación ya está comprobada.
+
+    :return: Datos del usuario (ver :func:`verify_jwt_token`).
+    :rtype: dict
+    """
+    return get_auth_context()['user_data']
+
+
+#: Respuesta de los endpoints protegidos cuando la petición no está autenticada.
+UNAUTHORIZED_RESPONSE = {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
+
+
+def authenticated(func):
+    """Decorador para endpoints JSON que requieren autenticación.
+
+    Se aplica debajo de ``@http.route``. Antes de ejecutar el endpoint
+    comprueba el token con :func:`get_auth_context` y, si no es válido, responde
+    ``UNAUTHORIZED``. Si el token se ha renovado, añade ``new_token`` a la
+    respuesta del endpoint. La duración del endpoint se publica en la cabecera
+    ``Server-Timing`` como ``app``.
+
+    :param func: Método del controlador que devuelve un diccionario.
+    :return: Método decorado.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        auth = get_auth_context()
+        if not auth:
+            return dict(UNAUTHORIZED_RESPONSE)
+
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        _add_server_timing('app', started)
+
+        if isinstance(result, dict) and auth.get('new_token'):
+            result.setdefault('new_token', auth['new_token'])
+        return result
+    return wrapper
+
+
+def authenticated_http(func):
+    """Variante de :func:`authenticated` para endpoints ``type='http'``.
+
+    El endpoint devuelve el diccionario de la respuesta o una tupla
+    ``(diccionario, estado_http)``, y el decorador lo convierte en una respuesta
+    JSON. Sin token válido responde ``401`` con el mismo cuerpo que
+    :func:`authenticated`; si el token se ha renovado, añade ``new_token``
+    (también a las respuestas de error). Las respuestas ya construidas
+    (:class:`odoo.http.Response`) se devuelven tal cual.
+
+    :param func: Método del controlador.
+    :return: Método decorado.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        auth = get_auth_context()
+        if not auth:
+            return request.make_json_response(dict(UNAUTHORIZED_RESPONSE), status=401)
+
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        _add_server_timing('app', started)
+
+        body, status = result if isinstance(result, tuple) else (result, 200)
+        if not isinstance(body, dict):
+            return result
+        if auth.get('new_token'):
+            body.setdefault('new_token', auth['new_token'])
+        return request.make_json_response(body, status=status)
+    return wrapper
 
 
 def get_authenticated_user_with_refresh():
     """Verificar la autenticación del usuario actual e incluir auto-refresh del token.
 
-    Función helper completa que encadena:
+    Equivale a :func:`get_auth_context`: el token se verifica una sola vez por
+    petición. En los endpoints son preferibles los decoradores
+    :func:`authenticated` y :func:`authenticated_http`.
 
-    1. Extracción del token del header ``Authorization``.
-    2. Verificación de validez y existencia del usuario.
-    3. Comprobación de si el token necesita renovación automática.
-
-    Uso típico en controladores::
+    Uso típico::
 
         auth_result = get_authenticated_user_with_refresh()
         if not auth_result:
@@ -220,21 +562,4 @@ def get_authenticated_user_with_refresh():
         está inactivo.
     :rtype: dict or None
     """
-    token = get_token_from_request()
-
-    if not token:
-        return None
-
-    user_data = verify_jwt_token(token)
-
-    if not user_data:
-        return None
-
-    new_token = auto_refresh_token_if_needed(token)
-
-    result = {'user_data': user_data}
-
-    if new_token:
-        result['new_token'] = new_token
-
-    return result
+    return get_auth_context()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""
+Caché en memoria de respuestas de la API de Second Market.
+
+Cada *worker* de Odoo tiene su propia instancia de :class:`TTLCache`: las
+entradas caducan a los ``ttl`` segundos y, al superar ``maxsize`` entradas, se
+descartan las usadas hace más tiempo (LRU). Es seguro entre hilos del mismo
+proceso.
+
+Uso típico::
+
+    from .cache import TTLCache, make_key
+
+    _facets_cache = TTLCache(maxsize=256, ttl=30)
+
+    key = make_key(filters)
+    data = _facets_cache.get(key)
+    if data is None:
+        data = calcular(filters)
+        _facets_cache.set(key, data)
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_key(*parts):
+    """Construir una clave de caché estable a partir de valores JSON.
+
+    Los diccionarios se serializan con las claves ordenadas, de modo que dos
+    bodies con los mismos filtros en distinto orden comparten entrada.
+
+    :param parts: Valores serializables a JSON (dicts, listas, escalares).
+    :return: Clave de caché.
+    :rtype: str
+    """
+    return json.dumps(parts, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class TTLCache:
+    """Caché clave/valor con caducidad por tiempo y expulsión LRU.
+
+    :param maxsize: Número máximo de entradas.
+    :type maxsize: int
+    :param ttl: Segundos de vida de cada entrada.
+    :type ttl: float
+    """
+
+    def __init__(self, maxsize=256, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Obtener una entrada vigente y marcarla como usada recientemente.
+
+        :param key: Clave de la entrada.
+        :param default: Valor a devolver si no existe o ha caducado.
+        :return: Valor almacenado o ``default``.
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Guardar una entrada, expulsando la menos usada si la caché está llena.
+
+        :param key: Clave de la entrada.
+        :param value: Valor a guardar; no se copia, no debe modificarse después.
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        """Eliminar una entrada si existe.
+
+        :param key: Clave de la entrada.
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Vaciar la caché."""
+        with self._lock:
+            self._data.clear()
@@ -27,7 +27,8 @@ from odoo import http, _
 from odoo.http import request
 import logging
 
-from .auth_controller import verify_jwt_token, get_token_from_request, get_authenticated_user_with_refresh
+from .auth_controller import authenticated, current_user_data
+from .serializers import serialize_articles, CATEGORY_ARTICLES_KEYS
 
 _logger = logging.getLogger(__name__)
 
@@ -40,15 +41,8 @@ class SecondMarketChatController(http.Controller):
     evitando conflictos de rutas duplicadas en Odoo.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
-
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``.
-        :rtype: dict or None
-        """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/chats', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/chats', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def handle_chats(self, **kwargs):
         """Crear un chat o listar los chats del usuario autenticado (endpoint unificado).
 
@@ -102,12 +96,7 @@ class SecondMarketChatController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             data = request.params or {}
 
             if data.get('articulo_id'):
@@ -126,8 +115,6 @@ class SecondMarketChatController(http.Controller):
 
                 if existing_chat:
                     response = {'success': True, 'message': 'Chat recuperado', 'data': {'chat_id': existing_chat.id, 'new_chat': False}}
-                    if new_token:
-                        response['new_token'] = new_token
                     return response
 
                 chat = request.env['second_market.chat'].sudo().create({
@@ -136,8 +123,6 @@ class SecondMarketChatController(http.Controller):
                 })
 
                 response = {'success': True, 'message': 'Chat creado exitosamente', 'data': {'chat_id': chat.id, 'new_chat': True}}
-                if new_token:
-                    response['new_token'] = new_token
                 return response
 
             chats = request.env['second_market.chat'].sudo().search([
@@ -160,15 +145,14 @@ class SecondMarketChatController(http.Controller):
                 })
 
             response = {'success': True, 'data': {'chats': chats_data}}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error en handle_chats: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al procesar la petición de chats', 'error_code': 'CHATS_ERROR'}
 
-    @http.route('/api/v1/chats/<int:chat_id>/messages', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/chats/<int:chat_id>/messages', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def handle_chat_messages(self, chat_id, **kwargs):
         """Enviar un mensaje o listar los mensajes de un chat (endpoint unificado).
 
@@ -202,12 +186,7 @@ class SecondMarketChatController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             data = request.params or {}
 
             chat = request.env['second_market.chat'].sudo().browse(chat_id)
@@ -232,8 +211,6 @@ class SecondMarketChatController(http.Controller):
                         'fecha_envio': message.fecha_envio.isoformat() if message.fecha_envio else None
                     }
                 }
-                if new_token:
-                    response['new_token'] = new_token
                 return response
 
             messages_data = []
@@ -254,8 +231,6 @@ class SecondMarketChatController(http.Controller):
                     'chat_info': {'articulo': {'id': chat.id_articulo.id, 'nombre': chat.id_articulo.nombre}}
                 }
             }
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
@@ -270,15 +245,8 @@ class SecondMarketReportController(http.Controller):
     Los registros creados son visibles para los moderadores en el backend de Odoo.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
-
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``.
-        :rtype: dict or None
-        """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/reports', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/reports', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def create_report(self, **kwargs):
         """Crear una denuncia sobre un artículo, comentario o usuario.
 
@@ -304,12 +272,7 @@ class SecondMarketReportController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
             data = request.params or request.httprequest.get_json(force=True) or {}
 
             for field in ['tipo_denuncia', 'motivo', 'descripcion']:
@@ -347,8 +310,6 @@ class SecondMarketReportController(http.Controller):
                 'message': 'Denuncia creada exitosamente',
                 'data': {'report_id': report.id, 'num_denuncia': report.num_denuncia}
             }
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
@@ -359,7 +320,8 @@ class SecondMarketReportController(http.Controller):
                 'error_code': 'CREATE_REPORT_ERROR'
             }
 
-    @http.route('/api/v1/reports/my-reports', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/reports/my-reports', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def get_my_reports(self, **kwargs):
         """Obtener las denuncias realizadas por el usuario autenticado.
 
@@ -370,12 +332,7 @@ class SecondMarketReportController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             reports = request.env['second_market.report'].sudo().search([
                 ('id_denunciante', '=', user_data['user_id']),
@@ -405,8 +362,6 @@ class SecondMarketReportController(http.Controller):
                 reports_data.append(report_dict)
 
             response = {'success': True, 'data': {'reports': reports_data}}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
@@ -420,7 +375,7 @@ class SecondMarketCategoryController(http.Controller):
     Todos los endpoints son públicos (no requieren autenticación).
     """
 
-    @http.route('/api/v1/categories', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/categories', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def get_categories(self, **kwargs):
         """Obtener todas las categorías activas de la plataforma.
 
@@ -471,12 +426,17 @@ class SecondMarketCategoryController(http.Controller):
             _logger.error(f"Error al obtener categorías: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener categorías', 'error_code': 'GET_CATEGORIES_ERROR'}
 
-    @http.route('/api/v1/categories/<int:category_id>/articles', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/categories/<int:category_id>/articles', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def get_category_articles(self, category_id, **kwargs):
         """Obtener los artículos publicados de una categoría específica.
 
         Admite paginación mediante los parámetros opcionales ``limit`` y ``offset``.
 
+        La imagen principal se devuelve como referencia en ``imagen_url``
+        (versión de 400 px en ``GET /api/v1/images/<id>``) e ``imagen_principal``
+        es ``null``. Por compatibilidad, con ``"inline_images": true`` en el
+        body ``imagen_principal`` incluye el contenido en base64.
+
         :param category_id: ID de la categoría a consultar.
         :type category_id: int
         :param kwargs: Parámetros opcionales: ``limit`` (por defecto 20)
@@ -495,16 +455,9 @@ class SecondMarketCategoryController(http.Controller):
                 ('activo', '=', True)
             ], limit=limit, offset=offset, order='create_date desc')
 
-            articles_data = []
-            for article in articles:
-                articles_data.append({
-                    'id': article.id,
-                    'nombre': article.nombre,
-                    'precio': article.precio,
-                    'estado_producto': article.estado_producto,
-                    'localidad': article.localidad,
-                    'imagen_principal': article.imagen_principal.decode('utf-8') if article.imagen_principal else None
-                })
+            articles_data = serialize_articles(
+                articles, CATEGORY_ARTICLES_KEYS, embed_image=bool(data.get('inline_images'))
+            )
 
             return {'success': True, 'data': {'articles': articles_data}}
 
@@ -512,7 +465,7 @@ class SecondMarketCategoryController(http.Controller):
             _logger.error(f"Error al obtener artículos de categoría: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener artículos', 'error_code': 'GET_CATEGORY_ARTICLES_ERROR'}
 
-    @http.route('/api/v1/tags', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/tags', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def get_tags(self, **kwargs):
         """Obtener todas las etiquetas disponibles en la plataforma.
 
@@ -31,7 +31,7 @@ from odoo import http, _
 from odoo.http import request
 import logging
 
-from .auth_controller import verify_jwt_token, get_token_from_request, get_authenticated_user_with_refresh
+from .auth_controller import authenticated, current_user_data
 
 _logger = logging.getLogger(__name__)
 
@@ -44,15 +44,8 @@ class SecondMarketCommentController(http.Controller):
     en el chatter de Odoo al crearse el comentario.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
-
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``.
-        :rtype: dict or None
-        """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/comments', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/comments', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def create_comment(self, **kwargs):
         """Publicar un comentario público en un artículo.
 
@@ -75,12 +68,7 @@ class SecondMarketCommentController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             data = request.params or request.httprequest.get_json(force=True) or {}
 
@@ -103,15 +91,14 @@ class SecondMarketCommentController(http.Controller):
                 'message': 'Comentario creado exitosamente',
                 'data': {'comment_id': comment.id, 'id_mensaje': comment.id_mensaje}
             }
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al crear comentario: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al crear comentario', 'error_code': 'CREATE_COMMENT_ERROR'}
 
-    @http.route('/api/v1/comments/<int:comment_id>/read', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/comments/<int:comment_id>/read', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def mark_comment_read(self, comment_id, **kwargs):
         """Marcar un comentario como leído.
 
@@ -126,12 +113,7 @@ class SecondMarketCommentController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             comment = request.env['second_market.comment'].sudo().browse(comment_id)
             if not comment.exists():
@@ -143,15 +125,14 @@ class SecondMarketCommentController(http.Controller):
             comment.sudo().leer()
 
             response = {'success': True, 'message': 'Comentario marcado como leído'}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al marcar comentario: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al marcar comentario', 'error_code': 'READ_COMMENT_ERROR'}
 
-    @http.route('/api/v1/comments/<int:comment_id>', type='json', auth='public', methods=['DELETE'], csrf=False, cors='*')
+    @http.route('/api/v1/comments/<int:comment_id>', type='json', auth='public', methods=['DELETE'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def delete_comment(self, comment_id, **kwargs):
         """Eliminar (borrado lógico) un comentario.
 
@@ -167,12 +148,7 @@ class SecondMarketCommentController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             comment = request.env['second_market.comment'].sudo().browse(comment_id)
             if not comment.exists():
@@ -184,15 +160,14 @@ class SecondMarketCommentController(http.Controller):
             comment.sudo().eliminar()
 
             response = {'success': True, 'message': 'Comentario eliminado'}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al eliminar comentario: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al eliminar comentario', 'error_code': 'DELETE_COMMENT_ERROR'}
 
-    @http.route('/api/v1/comments/received', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/comments/received', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def get_received_comments(self, **kwargs):
         """Obtener los comentarios recibidos por el usuario autenticado.
 
@@ -206,12 +181,7 @@ class SecondMarketCommentController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             data = request.httprequest.get_json(force=True) or {}
             limit = data.get('limit', 20)
@@ -234,8 +204,6 @@ class SecondMarketCommentController(http.Controller):
                 })
 
             response = {'success': True, 'data': {'comments': comments_data}}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
@@ -253,15 +221,8 @@ class SecondMarketPurchaseController(http.Controller):
     3. Cualquiera puede llamar a ``POST /api/v1/purchases/<id>/cancel`` → estado ``cancelada``, artículo vuelve a ``publicado``.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
-
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``.
-        :rtype: dict or None
-        """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/purchases', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/purchases', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def create_purchase(self, **kwargs):
         """Iniciar el proceso de compra de un artículo.
 
@@ -294,12 +255,7 @@ class SecondMarketPurchaseController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             data = request.params or request.httprequest.get_json(force=True) or {}
 
@@ -331,15 +287,14 @@ class SecondMarketPurchaseController(http.Controller):
                 'message': 'Compra creada exitosamente',
                 'data': {'purchase_id': purchase.id, 'id_compra': purchase.id_compra, 'precio': purchase.precio}
             }
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al crear compra: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al crear compra', 'error_code': 'CREATE_PURCHASE_ERROR'}
 
-    @http.route('/api/v1/purchases/<int:purchase_id>/confirm', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/purchases/<int:purchase_id>/confirm', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def confirm_purchase(self, purchase_id, **kwargs):
         """Confirmar la entrega y marcar la compra como completada.
 
@@ -355,12 +310,7 @@ class SecondMarketPurchaseController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             purchase = request.env['second_market.purchase'].sudo().browse(purchase_id)
             if not purchase.exists():
@@ -372,15 +322,14 @@ class SecondMarketPurchaseController(http.Controller):
             purchase.sudo().confirmar_transaccion()
 
             response = {'success': True, 'message': 'Compra confirmada exitosamente'}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al confirmar compra: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al confirmar compra', 'error_code': 'CONFIRM_PURCHASE_ERROR'}
 
-    @http.route('/api/v1/purchases/<int:purchase_id>/cancel', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/purchases/<int:purchase_id>/cancel', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def cancel_purchase(self, purchase_id, **kwargs):
         """Cancelar una compra y devolver el artículo a estado publicado.
 
@@ -396,12 +345,7 @@ class SecondMarketPurchaseController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             purchase = request.env['second_market.purchase'].sudo().browse(purchase_id)
             if not purchase.exists():
@@ -413,15 +357,14 @@ class SecondMarketPurchaseController(http.Controller):
             purchase.sudo().cancelar_compra()
 
             response = {'success': True, 'message': 'Compra cancelada'}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al cancelar compra: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al cancelar compra', 'error_code': 'CANCEL_PURCHASE_ERROR'}
 
-    @http.route('/api/v1/purchases/my-purchases', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/purchases/my-purchases', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def get_my_purchases(self, **kwargs):
         """Obtener todas las compras realizadas por el usuario autenticado.
 
@@ -432,12 +375,7 @@ class SecondMarketPurchaseController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             purchases = request.env['second_market.purchase'].sudo().search([
                 ('id_comprador', '=', user_data['user_id'])
@@ -456,15 +394,14 @@ class SecondMarketPurchaseController(http.Controller):
                 })
 
             response = {'success': True, 'data': {'purchases': purchases_data}}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al obtener compras: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener compras', 'error_code': 'GET_PURCHASES_ERROR'}
 
-    @http.route('/api/v1/purchases/my-sales', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/purchases/my-sales', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def get_my_sales(self, **kwargs):
         """Obtener todas las ventas realizadas por el usuario autenticado.
 
@@ -475,12 +412,7 @@ class SecondMarketPurchaseController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             sales = request.env['second_market.purchase'].sudo().search([
                 ('id_vendedor', '=', user_data['user_id'])
@@ -499,8 +431,6 @@ class SecondMarketPurchaseController(http.Controller):
                 })
 
             response = {'success': True, 'data': {'sales': sales_data}}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
@@ -515,15 +445,8 @@ class SecondMarketRatingController(http.Controller):
     Las valoraciones son únicas por par valorador-valorado.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
-
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``.
-        :rtype: dict or None
-        """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/ratings', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/ratings', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def create_rating(self, **kwargs):
         """Crear una valoración para otro usuario.
 
@@ -549,12 +472,7 @@ class SecondMarketRatingController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             data = request.params or request.httprequest.get_json(force=True) or {}
 
@@ -580,8 +498,6 @@ class SecondMarketRatingController(http.Controller):
                 'message': 'Valoración creada exitosamente',
                 'data': {'rating_id': rating.id}
             }
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
@@ -592,7 +508,7 @@ class SecondMarketRatingController(http.Controller):
                 'error_code': 'CREATE_RATING_ERROR'
             }
 
-    @http.route('/api/v1/ratings/user/<int:user_id>', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/ratings/user/<int:user_id>', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def get_user_ratings(self, user_id, **kwargs):
         """Obtener las valoraciones recibidas por un usuario.
 
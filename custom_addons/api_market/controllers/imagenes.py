@@ -0,0 +1,573 @@
+# -*- coding: utf-8 -*-
+
+"""
+Controlador de imágenes de artículos para la API REST de Second Market.
+
+**Endpoints disponibles:**
+
+- ``GET  /api/v1/images/<id>?size=<px>`` — Servir una imagen (o una versión reducida) en binario.
+- ``POST /api/v1/uploads/images``        — Subir imágenes (``multipart/form-data``) y obtener tokens.
+- ``POST /api/v1/uploads/check``         — Comprobar por SHA-1 si una imagen ya existe.
+- ``POST /api/v1/uploads/sessions``      — Abrir una subida reanudable por bloques.
+- ``GET  /api/v1/uploads/sessions/<token>`` — Consultar hasta dónde se ha recibido.
+- ``PUT  /api/v1/uploads/sessions/<token>?offset=<n>`` — Enviar un bloque.
+
+Cada ``second_market.image`` guarda, además del original, versiones con el
+lado mayor limitado a 128, 400 y 1024 píxeles generadas al crear la imagen
+(ver :data:`odoo.addons.second_market.models.second_market_imagen.RENDITION_SIZES`).
+El parámetro ``size`` elige la menor versión que cubre el tamaño pedido, de modo
+que una tarjeta de 120 px descarga la miniatura de 128 px y no el original.
+
+**Revalidación:** las respuestas llevan un ``ETag`` fuerte con el *checksum*
+(SHA-1) del ``ir.attachment`` que guarda el fichero. Si el cliente envía
+``If-None-Match`` con ese valor se responde ``304 Not Modified`` tras una única
+consulta indexada (``ir_attachment`` por ``res_model``/``res_id``), sin leer ni
+decodificar la imagen.
+
+**Entrega del fichero:** las imágenes guardadas en el filestore no pasan por
+base64 ni se cargan en memoria. Con ``IMAGE_OFFLOAD = 'x-accel'`` (nginx) o
+``'x-sendfile'`` (Apache) Odoo solo responde con la cabecera correspondiente y
+es el proxy quien envía el fichero, liberando el *worker* al instante. Sin
+proxy configurado, el fichero se transmite por bloques de
+``IMAGE_STREAM_CHUNK_SIZE`` bytes.
+"""
+
+from odoo import http, _
+from odoo.exceptions import UserError
+from odoo.http import request, Response
+from odoo.tools.mimetypes import guess_mimetype
+from werkzeug.wsgi import wrap_file
+import logging
+
+from .auth_controller import authenticated, authenticated_http, current_user_data
+from ..models.second_market_upload import UploadOffsetError
+
+_logger = logging.getLogger(__name__)
+
+# Importar configuración
+try:
+    from ..config import (
+        IMAGE_OFFLOAD, IMAGE_X_ACCEL_PREFIX, IMAGE_STREAM_CHUNK_SIZE,
+        UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_FILES, UPLOAD_CHUNK_MAX_BYTES,
+    )
+except ImportError:
+    IMAGE_OFFLOAD = ''
+    IMAGE_X_ACCEL_PREFIX = '/filestore/'
+    IMAGE_STREAM_CHUNK_SIZE = 64 * 1024
+    UPLOAD_MAX_FILE_BYTES = 10 * 1024 * 1024
+    UPLOAD_MAX_FILES = 10
+    UPLOAD_CHUNK_MAX_BYTES = 1024 * 1024
+
+#: Cabecera ``Cache-Control`` de las imágenes servidas por la API.
+IMAGE_CACHE_CONTROL = 'public, max-age=86400'
+
+
+def parse_size(value):
+    """Interpretar el parámetro ``size`` de la URL.
+
+    :param value: Valor recibido (``'400'``, ``'original'``, ``None``...).
+    :type value: str or None
+    :return: Tamaño en píxeles o ``None`` para el original.
+    :rtype: int or None
+    :raises ValueError: Si no es un entero positivo ni ``original``.
+    """
+    if not value or value == 'original':
+        return None
+    size = int(value)
+    if size <= 0:
+        raise ValueError(f"size no válido: {value}")
+    return size
+
+
+def find_attachment(record, field_names):
+    """Localizar el ``ir.attachment`` del primer campo binario con contenido.
+
+    :param record: Registro propietario de los campos (con ``sudo``).
+    :param field_names: Campos binarios a probar, en orden de preferencia.
+    :type field_names: list[str]
+    :return: Adjunto encontrado o recordset vacío.
+    :rtype: ir.attachment
+    """
+    attachments = request.env['ir.attachment'].sudo().search([
+        ('res_model', '=', record._name),
+        ('res_id', '=', record.id),
+        ('res_field', 'in', list(field_names)),
+    ])
+    by_field = {attachment.res_field: attachment for attachment in attachments}
+    for field_name in field_names:
+        if field_name in by_field:
+            return by_field[field_name]
+    return attachments.browse()
+
+
+def binary_response(record, field_names):
+    """Construir la respuesta HTTP binaria de un campo con validación por ``ETag``.
+
+    El ``ETag`` es el *checksum* del adjunto, por lo que cambia en cuanto se
+    reemplaza el fichero. Si coincide con ``If-None-Match`` se devuelve
+    ``304 Not Modified`` sin cargar el contenido.
+
+    :param record: Registro propietario de los campos (con ``sudo``).
+    :param field_names: Campos binarios a probar, en orden de preferencia.
+    :type field_names: list[str]
+    :return: Respuesta con los bytes y el ``Content-Type`` del adjunto,
+        ``304 Not Modified`` o ``404 Not Found`` si no hay contenido.
+    :rtype: :class:`odoo.http.Response`
+    """
+    attachment = find_attachment(record, field_names)
+    if not attachment:
+        return request.not_found()
+
+    headers = [
+        ('ETag', f'"{attachment.checksum}"'),
+        ('Cache-Control', IMAGE_CACHE_CONTROL),
+    ]
+    if request.httprequest.if_none_match.contains_weak(attachment.checksum):
+        return request.make_response(b'', headers=headers, status=304)
+
+    headers.append(('Content-Type', attachment.mimetype or 'application/octet-stream'))
+    if attachment.store_fname:
+        return _filestore_response(attachment, headers)
+
+    # Adjunto guardado en base de datos
+    image_data = attachment.raw
+    return request.make_response(
+        image_data,
+        headers=headers + [('Content-Length', str(len(image_data)))]
+    )
+
+
+def _filestore_response(attachment, headers):
+    """Enviar un adjunto del filestore sin cargarlo en memoria.
+
+    Según ``IMAGE_OFFLOAD`` delega el envío en el proxy (``X-Accel-Redirect``
+    o ``X-Sendfile``) o transmite el fichero por bloques desde el *worker*.
+
+    :param attachment: Adjunto con ``store_fname``.
+    :type attachment: ir.attachment
+    :param headers: Cabeceras ya calculadas (``ETag``, ``Cache-Control``,
+        ``Content-Type``).
+    :type headers: list[tuple]
+    :return: Respuesta HTTP.
+    :rtype: :class:`odoo.http.Response`
+    """
+    if IMAGE_OFFLOAD == 'x-accel':
+        location = f"{IMAGE_X_ACCEL_PREFIX.rstrip('/')}/{request.env.cr.dbname}/{attachment.store_fname}"
+        return request.make_response(b'', headers=headers + [('X-Accel-Redirect', location)])
+
+    full_path = attachment._full_path(attachment.store_fname)
+    if IMAGE_OFFLOAD == 'x-sendfile':
+        return request.make_response(b'', headers=headers + [('X-Sendfile', full_path)])
+
+    try:
+        stream = open(full_path, 'rb')
+    except OSError as e:
+        _logger.error(f"No se encuentra el fichero del adjunto {attachment.id}: {e}")
+        return request.not_found()
+    return Response(
+        wrap_file(request.httprequest.environ, stream, buffer_size=IMAGE_STREAM_CHUNK_SIZE),
+        headers=headers + [('Content-Length', str(attachment.file_size))],
+        direct_passthrough=True,
+    )
+
+
+def image_response(image, size=None):
+    """Construir la respuesta HTTP binaria de una imagen de artículo.
+
+    :param image: Registro ``second_market.image`` (con ``sudo``).
+    :param size: Lado mayor deseado en píxeles o ``None`` para el original.
+    :type size: int or None
+    :return: Respuesta de :func:`binary_response` con la versión pedida (o el
+        original si la versión no existe).
+    :rtype: :class:`odoo.http.Response`
+    """
+    field_name = image._rendition_field(size)
+    return binary_response(image, [field_name, 'image'] if field_name != 'image' else ['image'])
+
+
+class SecondMarketImageController(http.Controller):
+    """Controlador para servir las imágenes de los artículos — API v1."""
+
+    @http.route('/api/v1/images/<int:image_id>', type='http', auth='public', methods=['GET'], csrf=False, save_session=False, cors='*')
+    def get_image(self, image_id, size=None, **kwargs):
+        """Servir una imagen de artículo en binario, en el tamaño pedido.
+
+        Endpoint de tipo ``http`` (no JSON) pensado para cargarse directamente
+        desde Android con Coil.
+
+        **Ejemplos:**
+
+        - ``/api/v1/images/15?size=128`` — miniatura (lado mayor 128 px).
+        - ``/api/v1/images/15?size=400`` — tarjeta del listado.
+        - ``/api/v1/images/15?size=1024`` — detalle a pantalla completa.
+        - ``/api/v1/images/15`` o ``?size=original`` — fichero original.
+
+        :param image_id: ID de la ``second_market.image``.
+        :type image_id: int
+        :param size: Lado mayor deseado en píxeles u ``original``.
+        :type size: str or None
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Respuesta HTTP con la imagen, ``304 Not Modified`` si el
+            ``ETag`` de ``If-None-Match`` sigue vigente, ``400 Bad Request`` si
+            ``size`` no es válido o ``404 Not Found`` si la imagen no existe.
+        :rtype: :class:`odoo.http.Response`
+        """
+        try:
+            try:
+                size = parse_size(size)
+            except ValueError:
+                return request.make_response(_('Parámetro size no válido'), status=400)
+
+            # Sin exists(): la búsqueda del adjunto ya descarta imágenes inexistentes
+            image = request.env['second_market.image'].sudo().browse(image_id)
+            return image_response(image, size)
+        except Exception as e:
+            _logger.error(f"Error al servir la imagen {image_id}: {e}")
+            return request.not_found()
+
+    @http.route('/api/v1/uploads/images', type='http', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated_http
+    def upload_images(self, **kwargs):
+        """Subir imágenes en binario y obtener un token por fichero.
+
+        Primera fase de la creación de artículos sin base64: el cliente envía
+        los ficheros en el campo ``file`` de un ``multipart/form-data`` (uno o
+        varios) y después llama a ``POST /api/v1/articles`` con
+        ``"imagen_tokens": [...]`` en lugar de ``imagenes``.
+
+        El tamaño total se valida con ``Content-Length`` antes de leer el body
+        (ver :mod:`api_market.models.ir_http`); cada fichero admite como máximo
+        ``UPLOAD_MAX_FILE_BYTES`` bytes y cada petición ``UPLOAD_MAX_FILES``
+        ficheros.
+
+        **Header requerido:** ``Authorization: Bearer <token>``
+
+        **Ejemplo:**
+
+        .. code-block:: bash
+
+            curl -H "Authorization: Bearer <token>" \\
+                 -F file=@foto1.jpg -F file=@foto2.jpg \\
+                 http://localhost:8069/api/v1/uploads/images
+
+        **Respuesta:**
+
+        .. code-block:: json
+
+            {
+                "success": true,
+                "data": {
+                    "uploads": [{"token": "Yx3...", "name": "foto1.jpg", "size": 183422, "mimetype": "image/jpeg"}]
+                }
+            }
+
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Respuesta JSON con ``success`` y ``data.uploads``.
+        :rtype: :class:`odoo.http.Response`
+        """
+        try:
+            files = request.httprequest.files.getlist('file')
+            if not 1 <= len(files) <= UPLOAD_MAX_FILES:
+                return {
+                    'success': False,
+                    'message': f'Debes subir entre 1 y {UPLOAD_MAX_FILES} imágenes',
+                    'error_code': 'INVALID_IMAGE_COUNT'
+                }, 400
+
+            contents = []
+            for file in files:
+                content = file.read(UPLOAD_MAX_FILE_BYTES + 1)
+                if len(content) > UPLOAD_MAX_FILE_BYTES:
+                    return {
+                        'success': False,
+                        'message': f'La imagen {file.filename} supera el tamaño máximo permitido',
+                        'error_code': 'FILE_TOO_LARGE'
+                    }, 413
+                if not guess_mimetype(content).startswith('image/'):
+                    return {
+                        'success': False,
+                        'message': f'El fichero {file.filename} no es una imagen',
+                        'error_code': 'INVALID_IMAGE_TYPE'
+                    }, 400
+                contents.append((file.filename, content))
+
+            Upload = request.env['second_market.upload'].sudo()
+            user_id = current_user_data()['user_id']
+            uploads_data = []
+            for filename, content in contents:
+                upload = Upload._create_from_bytes(user_id, filename, content)
+                uploads_data.append({
+                    'token': upload.token,
+                    'name': upload.name,
+                    'size': upload.file_size,
+                    'mimetype': upload.mimetype
+                })
+
+            response = {
+                'success': True,
+                'data': {
+                    'uploads': uploads_data
+                }
+            }
+            return response
+
+        except Exception as e:
+            _logger.error(f"Error al subir imágenes: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'message': 'Error al subir imágenes',
+                'error_code': 'UPLOAD_ERROR'
+            }, 500
+
+    @http.route('/api/v1/uploads/check', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
+    def check_uploads(self, **kwargs):
+        """Comprobar qué imágenes ya existen en el servidor antes de subirlas.
+
+        El cliente calcula el SHA-1 de cada foto y lo envía aquí. Para las que
+        ya existen (por ejemplo, al volver a publicar un artículo con las mismas
+        fotos) se devuelve directamente un token utilizable en ``imagen_tokens``
+        de ``POST /api/v1/articles``, sin transferir la imagen; el resto se sube
+        con ``/api/v1/uploads/images`` o ``/api/v1/uploads/sessions``.
+
+        Solo se reconocen imágenes de artículos del propio usuario o de artículos
+        publicados; las demás aparecen en ``missing`` aunque existan.
+
+        **Header requerido:** ``Authorization: Bearer <token>``
+
+        **Body JSON:**
+
+        .. code-block:: json
+
+            {"sha1": ["3f786850e387550fdab836ed7e6dc881de23001b", "89e6c98d92887913cadf06b2adb97f26cde4849b"]}
+
+        **Respuesta:**
+
+        .. code-block:: json
+
+            {
+                "success": true,
+                "data": {
+                    "found": {"3f786850e387550fdab836ed7e6dc881de23001b": "Yx3..."},
+                    "missing": ["89e6c98d92887913cadf06b2adb97f26cde4849b"]
+                }
+            }
+
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Diccionario con ``success`` y ``data.found`` (SHA-1 → token) y
+            ``data.missing``.
+        :rtype: dict
+        """
+        try:
+            data = request.params or request.httprequest.get_json(force=True) or {}
+            checksums = [str(checksum).lower() for checksum in (data.get('sha1') or [])]
+            if not 1 <= len(checksums) <= UPLOAD_MAX_FILES:
+                return {
+                    'success': False,
+                    'message': f'Debes indicar entre 1 y {UPLOAD_MAX_FILES} hashes',
+                    'error_code': 'INVALID_IMAGE_COUNT'
+                }
+
+            uploads = request.env['second_market.upload'].sudo()._create_from_checksums(
+                current_user_data()['user_id'], checksums
+            )
+            response = {
+                'success': True,
+                'data': {
+                    'found': {checksum: upload.token for checksum, upload in uploads.items()},
+                    'missing': [checksum for checksum in checksums if checksum not in uploads]
+                }
+            }
+            return response
+
+        except Exception as e:
+            _logger.error(f"Error al comprobar imágenes: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'message': 'Error al comprobar imágenes',
+                'error_code': 'UPLOAD_ERROR'
+            }
+
+    def _session_data(self, session):
+        """Estado de una sesión de subida reanudable para la respuesta.
+
+        :param session: Registro ``second_market.upload``.
+        :return: Diccionario con ``token``, ``offset``, ``size`` y ``complete``.
+        :rtype: dict
+        """
+        return {
+            'token': session.token,
+            'offset': session.received_size,
+            'size': session.total_size,
+            'complete': session.state == 'done'
+        }
+
+    def _find_session(self, token, user_id):
+        """Buscar una sesión de subida del usuario por su token.
+
+        :return: Sesión encontrada o recordset vacío.
+        :rtype: second_market.upload
+        """
+        return request.env['second_market.upload'].sudo().search([
+            ('token', '=', token),
+            ('user_id', '=', user_id),
+        ], limit=1)
+
+    @http.route('/api/v1/uploads/sessions', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
+    def open_upload_session(self, **kwargs):
+        """Abrir una subida reanudable de una imagen.
+
+        Pensado para redes móviles inestables: la imagen se envía por bloques
+        con ``PUT /api/v1/uploads/sessions/<token>?offset=<n>`` y, si la conexión
+        se corta, ``GET /api/v1/uploads/sessions/<token>`` indica desde qué
+        posición continuar. Al completarse, el token se usa en ``imagen_tokens``
+        de ``POST /api/v1/articles`` igual que los de ``/api/v1/uploads/images``.
+        Las sesiones sin actividad durante ``UPLOAD_SESSION_TTL_HOURS`` horas se
+        eliminan automáticamente.
+
+        **Header requerido:** ``Authorization: Bearer <token>``
+
+        **Body JSON:**
+
+        .. code-block:: json
+
+            {"name": "foto1.jpg", "size": 2483211, "sha1": "<sha1 del fichero, opcional>"}
+
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Diccionario con ``success`` y ``data`` (``token``, ``offset``,
+            ``size``, ``complete`` y ``chunk_size`` máximo).
+        :rtype: dict
+        """
+        try:
+            data = request.params or request.httprequest.get_json(force=True) or {}
+            try:
+                size = int(data.get('size') or 0)
+            except (TypeError, ValueError):
+                size = 0
+            if not 0 < size <= UPLOAD_MAX_FILE_BYTES:
+                return {
+                    'success': False,
+                    'message': 'Tamaño de fichero no válido o superior al máximo permitido',
+                    'error_code': 'FILE_TOO_LARGE'
+                }
+
+            session = request.env['second_market.upload'].sudo()._open_session(
+                current_user_data()['user_id'],
+                data.get('name') or '',
+                size,
+                checksum=data.get('sha1')
+            )
+            response = {
+                'success': True,
+                'data': dict(self._session_data(session), chunk_size=UPLOAD_CHUNK_MAX_BYTES)
+            }
+            return response
+
+        except Exception as e:
+            _logger.error(f"Error al abrir sesión de subida: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'message': 'Error al abrir la sesión de subida',
+                'error_code': 'UPLOAD_ERROR'
+            }
+
+    @http.route('/api/v1/uploads/sessions/<string:token>', type='http', auth='public', methods=['GET'], csrf=False, save_session=False, cors='*')
+    @authenticated_http
+    def get_upload_session(self, token, **kwargs):
+        """Consultar el estado de una subida reanudable.
+
+        **Header requerido:** ``Authorization: Bearer <token>``
+
+        :param token: Token de la sesión.
+        :type token: str
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Respuesta JSON con ``success`` y ``data`` (``offset`` es la
+            posición del siguiente bloque).
+        :rtype: :class:`odoo.http.Response`
+        """
+        session = self._find_session(token, current_user_data()['user_id'])
+        if not session:
+            return {
+                'success': False,
+                'message': 'Sesión de subida no encontrada',
+                'error_code': 'UPLOAD_NOT_FOUND'
+            }, 404
+        return {'success': True, 'data': self._session_data(session)}
+
+    @http.route('/api/v1/uploads/sessions/<string:token>', type='http', auth='public', methods=['PUT'], csrf=False, save_session=False, cors='*')
+    @authenticated_http
+    def put_upload_chunk(self, token, offset=None, **kwargs):
+        """Enviar un bloque de una subida reanudable.
+
+        El body es el contenido binario del bloque (``application/octet-stream``,
+        como máximo ``UPLOAD_CHUNK_MAX_BYTES`` bytes) y la cabecera
+        ``X-Chunk-SHA1`` su SHA-1 en hexadecimal. El bloque debe empezar en la
+        posición ``offset`` que devolvió la petición anterior; si no coincide se
+        responde ``409`` con la posición correcta.
+
+        **Header requerido:** ``Authorization: Bearer <token>``
+
+        :param token: Token de la sesión.
+        :type token: str
+        :param offset: Posición del bloque dentro del fichero.
+        :type offset: str
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Respuesta JSON con ``success`` y ``data`` (nuevo ``offset`` y
+            ``complete``); ``409 OFFSET_MISMATCH`` o ``400 INVALID_CHUNK`` si el
+            bloque no es válido.
+        :rtype: :class:`odoo.http.Response`
+        """
+        try:
+            session = self._find_session(token, current_user_data()['user_id'])
+            if not session:
+                return {
+                    'success': False,
+                    'message': 'Sesión de subida no encontrada',
+                    'error_code': 'UPLOAD_NOT_FOUND'
+                }, 404
+
+            try:
+                offset = int(offset)
+            except (TypeError, ValueError):
+                return {
+                    'success': False,
+                    'message': 'El parámetro offset es requerido',
+                    'error_code': 'MISSING_FIELD'
+                }, 400
+
+            # Lectura acotada: un cuerpo sin Content-Length no puede superar el límite
+            chunk = request.httprequest.stream.read(UPLOAD_CHUNK_MAX_BYTES + 1)
+            if not chunk or len(chunk) > UPLOAD_CHUNK_MAX_BYTES:
+                return {
+                    'success': False,
+                    'message': 'Bloque vacío o superior al tamaño máximo permitido',
+                    'error_code': 'INVALID_CHUNK'
+                }, 400
+
+            try:
+                session._append_chunk(offset, chunk, request.httprequest.headers.get('X-Chunk-SHA1'))
+            except UploadOffsetError as e:
+                return {
+                    'success': False,
+                    'message': str(e),
+                    'error_code': 'OFFSET_MISMATCH',
+                    'data': self._session_data(session)
+                }, 409
+            except UserError as e:
+                return {
+                    'success': False,
+                    'message': str(e),
+                    'error_code': 'INVALID_CHUNK',
+                    'data': self._session_data(session)
+                }, 400
+
+            return {'success': True, 'data': self._session_data(session)}
+
+        except Exception as e:
+            _logger.error(f"Error al recibir bloque de subida: {str(e)}", exc_info=True)
+            return {
+                'success': False,
+                'message': 'Error al recibir el bloque',
+                'error_code': 'UPLOAD_ERROR'
+            }, 500
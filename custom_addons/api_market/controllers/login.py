@@ -11,14 +11,14 @@ tokens JWT (JSON Web Tokens) firmados con el algoritmo HS256.
 - ``POST /api/v1/auth/login``    — Autenticar usuario y obtener token.
 - ``POST /api/v1/auth/register`` — Registrar nuevo usuario y obtener token.
 - ``POST /api/v1/auth/verify``   — Verificar validez de un token existente.
-- ``POST /api/v1/auth/logout``   — Cerrar sesión (logging del evento).
+- ``POST /api/v1/auth/logout``   — Cerrar sesión (revoca el token).
 """
 
 from odoo import http, _
 from odoo.http import request
 import jwt
-import datetime
 import logging
+import time
 from passlib.context import CryptContext
 
 #: Contexto de hashing de contraseñas (mismo esquema que en `second_market.user`).
@@ -40,6 +40,8 @@ except ImportError:
     RESPONSE_MESSAGES = {}
     ERROR_CODES = {}
 
+from .auth_controller import issue_token, revoke_token
+
 _logger = logging.getLogger(__name__)
 
 
@@ -51,7 +53,7 @@ class SecondMarketAuthController(http.Controller):
     previa de Odoo (``auth='public'``).
     """
 
-    @http.route('/api/v1/auth/login', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/auth/login', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def login(self, **kwargs):
         """Autenticar un usuario y devolver un token JWT.
 
@@ -59,6 +61,11 @@ class SecondMarketAuthController(http.Controller):
         cuenta esté activa y genera un token JWT con expiración configurada en
         ``JWT_EXP_DELTA_SECONDS``.
 
+        Antes de buscar al usuario y de comprobar la contraseña se aplica el
+        límite de intentos fallidos por login y por IP
+        (ver :mod:`api_market.models.second_market_login_attempt`). Un intento
+        rechazado devuelve ``TOO_MANY_ATTEMPTS`` con ``retry_after`` (segundos).
+
         **Body JSON esperado:**
 
         .. code-block:: json
@@ -105,11 +112,23 @@ class SecondMarketAuthController(http.Controller):
                     'error_code': ERROR_CODES.get('MISSING_CREDENTIALS', 'MISSING_CREDENTIALS')
                 }
 
+            attempts = request.env['second_market.login.attempt'].sudo()
+            ip = request.httprequest.remote_addr
+            retry_after = attempts._check_throttle(login, ip)
+            if retry_after:
+                return {
+                    'success': False,
+                    'message': RESPONSE_MESSAGES.get('TOO_MANY_ATTEMPTS', 'Demasiados intentos de login'),
+                    'error_code': ERROR_CODES.get('TOO_MANY_ATTEMPTS', 'TOO_MANY_ATTEMPTS'),
+                    'retry_after': retry_after
+                }
+
             user = request.env['second_market.user'].sudo().search([
                 ('login', '=', login)
             ], limit=1)
 
             if not user:
+                attempts._register_failure(login, ip)
                 return {
                     'success': False,
                     'message': RESPONSE_MESSAGES.get('LOGIN_FAILED', 'Credenciales inválidas'),
@@ -124,22 +143,16 @@ class SecondMarketAuthController(http.Controller):
                 }
 
             if not crypt_context.verify(password, user.password):
+                attempts._register_failure(login, ip)
                 return {
                     'success': False,
                     'message': RESPONSE_MESSAGES.get('LOGIN_FAILED', 'Credenciales inválidas'),
                     'error_code': ERROR_CODES.get('INVALID_CREDENTIALS', 'INVALID_CREDENTIALS')
                 }
 
-            payload = {
-                'user_id': user.id,
-                'id_usuario': user.id_usuario,
-                'login': user.login,
-                'name': user.name,
-                'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=JWT_EXP_DELTA_SECONDS),
-                'iat': datetime.datetime.utcnow()
-            }
+            attempts._register_success(login)
 
-            token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+            token = issue_token(user.id, user.id_usuario, user.login, user.name)
 
             user_data = {
                 'id': user.id,
@@ -178,7 +191,7 @@ class SecondMarketAuthController(http.Controller):
                 'error_code': ERROR_CODES.get('INTERNAL_ERROR', 'INTERNAL_ERROR')
             }
 
-    @http.route('/api/v1/auth/register', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/auth/register', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def register(self, **kwargs):
         """Registrar un nuevo usuario y devolver un token JWT.
 
@@ -261,16 +274,7 @@ class SecondMarketAuthController(http.Controller):
 
             user = request.env['second_market.user'].sudo().create(user_vals)
 
-            payload = {
-                'user_id': user.id,
-                'id_usuario': user.id_usuario,
-                'login': user.login,
-                'name': user.name,
-                'exp': datetime.datetime.utcnow() + datetime.timedelta(seconds=JWT_EXP_DELTA_SECONDS),
-                'iat': datetime.datetime.utcnow()
-            }
-
-            token = jwt.encode(payload, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+            token = issue_token(user.id, user.id_usuario, user.login, user.name)
 
             user_data = {
                 'id': user.id,
@@ -303,7 +307,7 @@ class SecondMarketAuthController(http.Controller):
                 'error_code': 'REGISTRATION_ERROR'
             }
 
-    @http.route('/api/v1/auth/verify', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/auth/verify', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def verify_token(self, **kwargs):
         """Verificar la validez de un token JWT.
 
@@ -386,17 +390,18 @@ class SecondMarketAuthController(http.Controller):
                 'error_code': 'VERIFICATION_ERROR'
             }
 
-    @http.route('/api/v1/auth/logout', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/auth/logout', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
     def logout(self, **kwargs):
-        """Registrar el cierre de sesión del usuario.
+        """Cerrar la sesión del usuario revocando su token.
 
-        JWT es stateless: el logout real se realiza en el cliente eliminando
-        el token almacenado. Este endpoint se usa principalmente para registrar
-        el evento en los logs del servidor.
+        El token del header ``Authorization`` se revoca hasta su caducidad
+        (ver :func:`~api_market.controllers.auth_controller.revoke_token`): a
+        partir de ese momento la API lo rechaza como no autenticado. El cliente
+        debe eliminarlo igualmente de su almacenamiento local.
 
         .. note::
-            No invalida el token en el servidor. El cliente debe eliminar
-            el token de su almacenamiento local tras llamar a este endpoint.
+            Los tokens emitidos antes de incluir el claim ``jti`` no se pueden
+            revocar y siguen siendo válidos hasta que caducan.
 
         :param kwargs: Parámetros adicionales del dispatcher de Odoo.
         :return: Diccionario con ``success = True`` y mensaje de confirmación.
@@ -412,7 +417,9 @@ class SecondMarketAuthController(http.Controller):
                     payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM], options={"verify_exp": False})
                     _logger.info(f"Logout para usuario: {payload.get('login')} (ID: {payload.get('user_id')})")
                 except Exception:
-                    pass
+                    payload = None
+                if payload and payload.get('exp', 0) > time.time():
+                    revoke_token(payload)
 
             return {
                 'success': True,
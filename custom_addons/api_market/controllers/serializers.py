@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Serialización de listados de artículos para la API de Second Market.
+
+Los endpoints de listado (``/api/v1/articles/list``, ``/api/v1/articles/my-articles``,
+``/api/v1/categories/<id>/articles`` y ``/api/v1/users/<id>/articles``) comparten
+:func:`serialize_articles`, que lee cada página con un número fijo de consultas
+SQL independientemente del ``limit``:
+
+1. Una lectura de los campos del artículo (``read``).
+2. Una lectura de las categorías referenciadas.
+3. Una lectura de los propietarios referenciados.
+4. Una lectura de las etiquetas referenciadas (la relación *many2many* se
+   resuelve en la lectura del paso 1).
+5. Solo si el endpoint incrusta la imagen, una lectura de los binarios de las
+   imágenes principales (localizadas mediante el campo almacenado
+   ``main_image_id``, sin tocar el filestore en el resto de casos).
+
+Uso típico desde un controlador::
+
+    from .serializers import serialize_articles, LIST_KEYS
+
+    articles = request.env['second_market.article'].sudo().search(domain, limit=20)
+    articles_data = serialize_articles(articles, LIST_KEYS)
+"""
+
+#: Campos del artículo que se copian tal cual en la respuesta.
+SCALAR_KEYS = (
+    'id', 'codigo', 'nombre', 'descripcion', 'precio', 'estado_producto',
+    'estado_publicacion', 'antiguedad', 'localidad', 'latitud', 'longitud',
+    'activo', 'conteo_imagenes', 'conteo_favoritos', 'conteo_vistas',
+    'conteo_comentarios', 'create_date',
+)
+
+#: Claves de ``GET/POST /api/v1/articles/list``.
+LIST_KEYS = (
+    'id', 'codigo', 'nombre', 'descripcion', 'precio', 'estado_producto',
+    'antiguedad', 'localidad', 'latitud', 'longitud', 'categoria', 'propietario',
+    'imagen_principal', 'imagen_url', 'conteo_imagenes', 'conteo_favoritos', 'conteo_vistas',
+    'etiquetas', 'create_date',
+)
+
+#: Claves de ``GET/POST /api/v1/articles/my-articles``.
+MY_ARTICLES_KEYS = (
+    'id', 'codigo', 'nombre', 'precio', 'estado_producto', 'estado_publicacion',
+    'activo', 'conteo_vistas', 'conteo_comentarios', 'imagen_principal', 'imagen_url',
+    'create_date',
+)
+
+#: Claves de ``POST /api/v1/categories/<id>/articles``.
+CATEGORY_ARTICLES_KEYS = (
+    'id', 'nombre', 'precio', 'estado_producto', 'localidad', 'imagen_principal',
+    'imagen_url',
+)
+
+#: Claves de ``GET/POST /api/v1/users/<id>/articles``.
+USER_ARTICLES_KEYS = (
+    'id', 'codigo', 'nombre', 'descripcion', 'precio', 'estado_producto',
+    'localidad', 'imagen_principal', 'imagen_url', 'conteo_vistas', 'create_date',
+)
+
+
+def _binary_to_text(value):
+    """Normalizar el valor de un campo ``Binary`` leído con ``read`` a ``str``.
+
+    :param value: Valor devuelto por el ORM (``bytes``, ``str`` o ``False``).
+    :return: Cadena base64 o ``None`` si no hay valor.
+    :rtype: str or None
+    """
+    if not value:
+        return None
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def avatar_url(user_id, version, size=128):
+    """URL del avatar de un usuario en ``GET /api/v1/users/<id>/avatar``.
+
+    La URL incluye la versión del avatar (``v``), de modo que cambia al
+    reemplazar la foto y el cliente puede cachearla sin revalidar.
+
+    :param user_id: ID interno del usuario.
+    :type user_id: int
+    :param version: Valor de ``avatar_version`` del usuario (``False`` si no tiene avatar).
+    :type version: str or bool
+    :param size: Lado mayor deseado en píxeles o ``None`` para el original.
+    :type size: int or None
+    :return: URL relativa o ``None`` si el usuario no tiene avatar.
+    :rtype: str or None
+    """
+    if not version:
+        return None
+    if size:
+        return f'/api/v1/users/{user_id}/avatar?size={size}&v={version}'
+    return f'/api/v1/users/{user_id}/avatar?v={version}'
+
+
+def serialize_articles(articles, keys, embed_image=False):
+    """Serializar una página de artículos con un número constante de consultas.
+
+    Claves compuestas admitidas además de :data:`SCALAR_KEYS`:
+
+    - ``categoria``: ``{'id', 'nombre'}`` o ``None``.
+    - ``propietario``: ``{'id', 'nombre', 'calificacion_promedio', 'avatar_url'}``
+      o ``None``; ``avatar_url`` apunta a la versión de 128 px (ver :func:`avatar_url`).
+    - ``etiquetas``: lista de ``{'id', 'nombre'}``.
+    - ``imagen_url``: URL de la versión de 400 px de la imagen principal
+      (``/api/v1/images/<id>?size=400``) o ``None``.
+    - ``imagen_principal``: imagen principal en base64 si ``embed_image`` es
+      ``True``; ``None`` en otro caso.
+
+    :param articles: Recordset de ``second_market.article`` (con ``sudo`` si procede).
+    :param keys: Claves a incluir en cada diccionario, en orden.
+    :type keys: tuple
+    :param embed_image: Incrustar la imagen principal en base64.
+    :type embed_image: bool
+    :return: Lista de diccionarios en el mismo orden que ``articles``.
+    :rtype: list[dict]
+    """
+    if not articles:
+        return []
+
+    env = articles.env
+    read_fields = [key for key in keys if key in SCALAR_KEYS and key != 'id']
+    if 'categoria' in keys:
+        read_fields.append('id_categoria')
+    if 'propietario' in keys:
+        read_fields.append('id_propietario')
+    if 'etiquetas' in keys:
+        read_fields.append('ids_etiquetas')
+    if 'imagen_url' in keys or 'imagen_principal' in keys:
+        read_fields.append('main_image_id')
+
+    rows = articles.read(read_fields or ['id'], load=None)
+
+    categories = {}
+    if 'categoria' in keys:
+        category_ids = {row['id_categoria'] for row in rows if row['id_categoria']}
+        categories = {
+            cat['id']: cat for cat in env['second_market.category'].browse(category_ids).read(['name'])
+        }
+
+    owners = {}
+    if 'propietario' in keys:
+        owner_ids = {row['id_propietario'] for row in rows if row['id_propietario']}
+        owners = {
+            owner['id']: owner
+            for owner in env['second_market.user'].browse(owner_ids).read(['name', 'calificacion_promedio', 'avatar_version'])
+        }
+
+    tags = {}
+    if 'etiquetas' in keys:
+        tag_ids = {tag_id for row in rows for tag_id in row['ids_etiquetas']}
+        tags = {tag['id']: tag for tag in env['second_market.tag'].browse(tag_ids).read(['name'])}
+
+    image_data = {}
+    if embed_image and 'imagen_principal' in keys:
+        image_ids = {row['main_image_id'] for row in rows if row['main_image_id']}
+        image_data = {
+            img['id']: _binary_to_text(img['image'])
+            for img in env['second_market.image'].browse(image_ids).read(['image'])
+        }
+
+    result = []
+    for row in rows:
+        values = {}
+        for key in keys:
+            if key == 'create_date':
+                values[key] = row['create_date'].isoformat() if row['create_date'] else None
+            elif key in SCALAR_KEYS:
+                values[key] = row[key]
+            elif key == 'categoria':
+                category = categories.get(row['id_categoria'])
+                values[key] = {
+                    'id': category['id'],
+                    'nombre': category['name']
+                } if category else None
+            elif key == 'propietario':
+                owner = owners.get(row['id_propietario'])
+                values[key] = {
+                    'id': owner['id'],
+                    'nombre': owner['name'],
+                    'calificacion_promedio': owner['calificacion_promedio'],
+                    'avatar_url': avatar_url(owner['id'], owner['avatar_version'])
+                } if owner else None
+            elif key == 'etiquetas':
+                values[key] = [
+                    {'id': tag_id, 'nombre': tags[tag_id]['name']}
+                    for tag_id in row['ids_etiquetas'] if tag_id in tags
+                ]
+            elif key == 'imagen_url':
+                values[key] = f"/api/v1/images/{row['main_image_id']}?size=400" if row['main_image_id'] else None
+            elif key == 'imagen_principal':
+                values[key] = image_data.get(row['main_image_id']) if embed_image else None
+        result.append(values)
+    return result
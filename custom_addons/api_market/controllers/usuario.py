@@ -9,12 +9,19 @@ Controlador de gestión de perfiles de usuario para la API REST de Second Market
 - ``POST     /api/v1/users/update-profile``       — Actualizar perfil propio.
 - ``POST     /api/v1/users/change-password``      — Cambiar contraseña.
 - ``GET/POST /api/v1/users/<id>``                 — Perfil público de un usuario.
+- ``GET      /api/v1/users/<id>/avatar?size=<px>``  — Avatar de un usuario en binario.
 - ``GET/POST /api/v1/users/<id>/articles``        — Artículos publicados de un usuario.
 - ``GET/POST /api/v1/users/<id>/ratings``         — Valoraciones de un usuario.
 - ``GET/POST /api/v1/users/statistics``           — Estadísticas detalladas del usuario autenticado.
 - ``POST     /api/v1/users/deactivate``           — Desactivar cuenta propia.
 
 Todos los endpoints protegidos requieren el header ``Authorization: Bearer <token>``.
+
+Los perfiles no incluyen la foto: devuelven ``avatar_url`` (versión de 128 px),
+``avatar_urls`` (128, 512 y original) y ``avatar_version``, una huella que
+cambia al reemplazar la foto y forma parte de las URLs. Por compatibilidad,
+con ``"inline_avatar": true`` en el body se incluye además el avatar en base64
+en ``avatar``.
 """
 
 from odoo import http, _
@@ -25,7 +32,14 @@ from passlib.context import CryptContext
 #: Contexto de hashing de contraseñas (mismo esquema que en ``login.py``).
 crypt_context = CryptContext(schemes=["pbkdf2_sha512", "plaintext"], deprecated="auto")
 
-from .auth_controller import verify_jwt_token, get_token_from_request, get_authenticated_user_with_refresh
+from .auth_controller import authenticated, current_user_data
+from .serializers import serialize_articles, avatar_url, USER_ARTICLES_KEYS
+from .imagenes import binary_response, parse_size
+
+try:
+    from odoo.addons.second_market.models.second_market_app_users import AVATAR_SIZES
+except ImportError:
+    AVATAR_SIZES = (128, 512)
 
 _logger = logging.getLogger(__name__)
 
@@ -34,28 +48,42 @@ class SecondMarketUserController(http.Controller):
     """Controlador para la gestión de perfiles y cuentas de usuario.
 
     Todos los métodos que requieren autenticación comprueban el token JWT
-    mediante :func:`~api_market.controllers.auth_controller.get_authenticated_user_with_refresh`.
+    con el decorador :func:`~api_market.controllers.auth_controller.authenticated`.
     Si el token está próximo a expirar, se renueva automáticamente y se devuelve
     en el campo ``new_token`` de la respuesta.
     """
 
-    def _get_authenticated_user(self):
-        """Obtener el usuario autenticado a partir del token JWT del request.
+    def _avatar_data(self, user):
+        """Referencias al avatar de un usuario para incluir en su perfil.
 
-        Delega en :func:`~api_market.controllers.auth_controller.get_authenticated_user_with_refresh`,
-        que incluye renovación automática del token si es necesario.
+        Solo se lee ``avatar_version``; el binario se incluye en base64 en
+        ``avatar`` únicamente si la petición lo pide con ``inline_avatar``.
 
-        :return: Diccionario ``{'user_data': dict, 'new_token': str}`` o ``None``
-            si el usuario no está autenticado.
-        :rtype: dict or None
+        :param user: Registro ``second_market.user``.
+        :return: Diccionario con ``avatar_url``, ``avatar_urls``,
+            ``avatar_version`` y, si se pide, ``avatar``.
+        :rtype: dict
         """
-        return get_authenticated_user_with_refresh()
-
-    @http.route('/api/v1/users/profile', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+        version = user.avatar_version
+        data = {
+            'avatar_url': avatar_url(user.id, version),
+            'avatar_urls': {
+                **{str(size): avatar_url(user.id, version, size) for size in AVATAR_SIZES},
+                'original': avatar_url(user.id, version, None),
+            } if version else None,
+            'avatar_version': version or None,
+        }
+        params = request.params or request.httprequest.get_json(force=True, silent=True) or {}
+        if params.get('inline_avatar'):
+            data['avatar'] = user.avatar.decode('utf-8') if user.avatar else None
+        return data
+
+    @http.route('/api/v1/users/profile', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def get_my_profile(self, **kwargs):
         """Obtener el perfil completo del usuario autenticado.
 
-        Devuelve todos los campos del perfil, incluyendo el avatar en base64,
+        Devuelve todos los campos del perfil, las URLs del avatar,
         estadísticas de venta/compra y calificación promedio.
 
         **Header requerido:** ``Authorization: Bearer <token>``
@@ -70,7 +98,8 @@ class SecondMarketUserController(http.Controller):
                     "id": 1,
                     "name": "Jonatan",
                     "login": "jonatan@ejemplo.com",
-                    "avatar": "<base64>",
+                    "avatar_url": "/api/v1/users/1/avatar?size=128&v=3f2a9c01b7de",
+                    "avatar_version": "3f2a9c01b7de",
                     "calificacion_promedio": 4.5,
                     "productos_en_venta": 3
                 }
@@ -81,12 +110,7 @@ class SecondMarketUserController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             user = request.env['second_market.user'].sudo().browse(user_data['user_id'])
 
@@ -101,7 +125,7 @@ class SecondMarketUserController(http.Controller):
                 'telefono': user.telefono,
                 'ubicacion': user.ubicacion,
                 'biografia': user.biografia,
-                'avatar': user.avatar.decode('utf-8') if user.avatar else None,
+                **self._avatar_data(user),
                 'calificacion_promedio': user.calificacion_promedio,
                 'total_valoraciones': user.total_valoraciones,
                 'productos_en_venta': user.productos_en_venta,
@@ -113,15 +137,14 @@ class SecondMarketUserController(http.Controller):
             }
 
             response_data = {'success': True, 'data': profile_data}
-            if new_token:
-                response_data['new_token'] = new_token
             return response_data
 
         except Exception as e:
             _logger.error(f"Error al obtener perfil: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener perfil', 'error_code': 'GET_PROFILE_ERROR'}
 
-    @http.route('/api/v1/users/update-profile', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/users/update-profile', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def update_profile(self, **kwargs):
         """Actualizar campos del perfil del usuario autenticado.
 
@@ -148,12 +171,7 @@ class SecondMarketUserController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             user = request.env['second_market.user'].sudo().browse(user_data['user_id'])
             if not user.exists():
@@ -183,15 +201,14 @@ class SecondMarketUserController(http.Controller):
                 user.sudo().write(update_vals)
 
             response = {'success': True, 'message': 'Perfil actualizado exitosamente'}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al actualizar perfil: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al actualizar perfil', 'error_code': 'UPDATE_PROFILE_ERROR', 'error_detail': str(e)}
 
-    @http.route('/api/v1/users/change-password', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/users/change-password', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def change_password(self, **kwargs):
         """Cambiar la contraseña del usuario autenticado.
 
@@ -214,12 +231,7 @@ class SecondMarketUserController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_result = self._get_authenticated_user()
-            if not auth_result:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
-
-            user_data = auth_result['user_data']
-            new_token = auth_result.get('new_token')
+            user_data = current_user_data()
 
             data = request.params or request.httprequest.get_json(force=True) or {}
 
@@ -240,15 +252,13 @@ class SecondMarketUserController(http.Controller):
             _logger.info(f"Contraseña cambiada para usuario {user.id}")
 
             response = {'success': True, 'message': 'Contraseña actualizada exitosamente'}
-            if new_token:
-                response['new_token'] = new_token
             return response
 
         except Exception as e:
             _logger.error(f"Error al cambiar contraseña: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al cambiar contraseña', 'error_code': 'CHANGE_PASSWORD_ERROR'}
 
-    @http.route('/api/v1/users/<int:user_id>', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+    @http.route('/api/v1/users/<int:user_id>', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
     def get_user_profile(self, user_id, **kwargs):
         """Obtener el perfil público de un usuario por su ID.
 
@@ -273,7 +283,7 @@ class SecondMarketUserController(http.Controller):
                 'name': user.name,
                 'ubicacion': user.ubicacion,
                 'biografia': user.biografia,
-                'avatar': user.avatar.decode('utf-8') if user.avatar else None,
+                **self._avatar_data(user),
                 'calificacion_promedio': user.calificacion_promedio,
                 'total_valoraciones': user.total_valoraciones,
                 'productos_en_venta': user.productos_en_venta,
@@ -288,13 +298,60 @@ class SecondMarketUserController(http.Controller):
             _logger.error(f"Error al obtener perfil de usuario: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener perfil', 'error_code': 'GET_USER_PROFILE_ERROR'}
 
-    @http.route('/api/v1/users/<int:user_id>/articles', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+    @http.route('/api/v1/users/<int:user_id>/avatar', type='http', auth='public', methods=['GET'], csrf=False, save_session=False, cors='*')
+    def get_user_avatar(self, user_id, size=None, **kwargs):
+        """Servir el avatar de un usuario en binario, en el tamaño pedido.
+
+        Endpoint de tipo ``http`` (no JSON) pensado para cargarse directamente
+        desde Android con Coil. El parámetro ``v`` de las URLs devueltas en los
+        perfiles solo sirve para cambiar la URL al reemplazar la foto; la
+        revalidación se hace con el ``ETag`` (*checksum* del adjunto).
+
+        **Ejemplos:**
+
+        - ``/api/v1/users/7/avatar?size=128`` — tarjeta de vendedor.
+        - ``/api/v1/users/7/avatar?size=512`` — pantalla de perfil.
+        - ``/api/v1/users/7/avatar`` o ``?size=original`` — fichero original.
+
+        :param user_id: ID interno del usuario.
+        :type user_id: int
+        :param size: Lado mayor deseado en píxeles u ``original``.
+        :type size: str or None
+        :param kwargs: Parámetros adicionales del dispatcher de Odoo.
+        :return: Respuesta HTTP con el avatar, ``304 Not Modified`` si el
+            ``ETag`` de ``If-None-Match`` sigue vigente, ``400 Bad Request`` si
+            ``size`` no es válido o ``404 Not Found`` si el usuario no existe,
+            está desactivado o no tiene avatar.
+        :rtype: :class:`odoo.http.Response`
+        """
+        try:
+            try:
+                size = parse_size(size)
+            except ValueError:
+                return request.make_response(_('Parámetro size no válido'), status=400)
+
+            user = request.env['second_market.user'].sudo().browse(user_id)
+            if not user.exists() or not user.activo:
+                return request.not_found()
+
+            field_name = user._avatar_field(size)
+            return binary_response(user, [field_name, 'avatar'] if field_name != 'avatar' else ['avatar'])
+        except Exception as e:
+            _logger.error(f"Error al servir el avatar del usuario {user_id}: {e}")
+            return request.not_found()
+
+    @http.route('/api/v1/users/<int:user_id>/articles', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
     def get_user_articles(self, user_id, **kwargs):
         """Obtener los artículos publicados de un usuario.
 
         Devuelve solo artículos en estado ``publicado`` y activos.
         Admite paginación mediante ``limit`` y ``offset``.
 
+        La imagen principal se devuelve como referencia en ``imagen_url``
+        (versión de 400 px en ``GET /api/v1/images/<id>``) e ``imagen_principal``
+        es ``null``. Por compatibilidad, con ``"inline_images": true`` en el
+        body ``imagen_principal`` incluye el contenido en base64.
+
         :param user_id: ID interno del usuario propietario.
         :type user_id: int
         :param kwargs: Parámetros opcionales: ``limit`` (int, por defecto 20) y
@@ -313,20 +370,9 @@ class SecondMarketUserController(http.Controller):
                 ('activo', '=', True)
             ], limit=limit, offset=offset, order='create_date desc')
 
-            articles_data = []
-            for article in articles:
-                articles_data.append({
-                    'id': article.id,
-                    'codigo': article.codigo,
-                    'nombre': article.nombre,
-                    'descripcion': article.descripcion,
-                    'precio': article.precio,
-                    'estado_producto': article.estado_producto,
-                    'localidad': article.localidad,
-                    'imagen_principal': article.imagen_principal.decode('utf-8') if article.imagen_principal else None,
-                    'conteo_vistas': article.conteo_vistas,
-                    'create_date': article.create_date.isoformat() if article.create_date else None
-                })
+            articles_data = serialize_articles(
+                articles, USER_ARTICLES_KEYS, embed_image=bool(data.get('inline_images'))
+            )
 
             return {'success': True, 'data': {'articles': articles_data}}
 
@@ -334,7 +380,7 @@ class SecondMarketUserController(http.Controller):
             _logger.error(f"Error al obtener artículos de usuario: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener artículos', 'error_code': 'GET_USER_ARTICLES_ERROR'}
 
-    @http.route('/api/v1/users/<int:user_id>/ratings', type='json', auth='public', methods=['GET', 'POST'], csrf=False, cors='*')
+    @http.route('/api/v1/users/<int:user_id>/ratings', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False, cors='*')
     def get_user_ratings(self, user_id, **kwargs):
         """Obtener las valoraciones recibidas por un usuario.
 
@@ -384,7 +430,8 @@ class SecondMarketUserController(http.Controller):
             _logger.error(f"Error al obtener valoraciones de usuario: {str(e)}", exc_info=True)
             return {'success': False, 'message': 'Error al obtener valoraciones', 'error_code': 'GET_USER_RATINGS_ERROR'}
 
-    @http.route('/api/v1/users/statistics', type='json', auth='public', methods=['GET', 'POST'], csrf=False)
+    @http.route('/api/v1/users/statistics', type='json', auth='public', methods=['GET', 'POST'], csrf=False, save_session=False)
+    @authenticated
     def get_my_statistics(self, **kwargs):
         """Obtener estadísticas detalladas de actividad del usuario autenticado.
 
@@ -410,11 +457,7 @@ class SecondMarketUserController(http.Controller):
         :rtype: dict
         """
         try:
-            auth_data = self._get_authenticated_user()
-            user = auth_data.get('user_data', {}).get('user')
-
-            if not user:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
+            user = current_user_data()['user']
 
             stats = {
                 'productos_en_venta': user.productos_en_venta,
@@ -443,7 +486,8 @@ class SecondMarketUserController(http.Controller):
             _logger.error(f"Error al obtener estadísticas: {str(e)}", exc_info=True)
             return {'success': False, 'message': str(e), 'error_code': 'GET_STATISTICS_ERROR'}
 
-    @http.route('/api/v1/users/deactivate', type='json', auth='public', methods=['POST'], csrf=False, cors='*')
+    @http.route('/api/v1/users/deactivate', type='json', auth='public', methods=['POST'], csrf=False, save_session=False, cors='*')
+    @authenticated
     def deactivate_account(self, **kwargs):
         """Desactivar la cuenta del usuario autenticado.
 
@@ -465,9 +509,7 @@ class SecondMarketUserController(http.Controller):
         :rtype: dict
         """
         try:
-            user_data = self._get_authenticated_user()
-            if not user_data:
-                return {'success': False, 'message': 'No autenticado', 'error_code': 'UNAUTHORIZED'}
+            user_data = current_user_data()
 
             data = request.params or request.httprequest.get_json(force=True) or {}
 
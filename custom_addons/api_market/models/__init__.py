@@ -1,3 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from . import models
+from . import second_market_articulo
+from . import second_market_user
+from . import second_market_imagen
+from . import second_market_categoria
+from . import second_market_etiqueta
+from . import second_market_rating
+from . import second_market_upload
+from . import second_market_login_attempt
+from . import second_market_token_revocation
+from . import ir_http
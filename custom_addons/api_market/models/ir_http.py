@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Comprobaciones previas al despacho de las peticiones de subida de la API.
+
+Odoo lee y analiza el body de las rutas ``type='http'`` antes de llamar al
+controlador. Para las subidas de imágenes se valida aquí ``Content-Length``,
+de modo que una petición demasiado grande se rechaza con ``413`` sin llegar a
+recibirse entera.
+
+Los atributos de werkzeug de ``request.httprequest`` son de solo lectura en
+Odoo, así que los cuerpos sin ``Content-Length`` (``chunked``) no se limitan
+aquí: los bloques de las subidas reanudables se leen con un límite en el
+propio controlador y los ``multipart`` quedan sujetos al máximo general de Odoo.
+"""
+
+from odoo import models
+from odoo.http import request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Importar configuración
+try:
+    from ..config import UPLOAD_MAX_FILE_BYTES, UPLOAD_MAX_FILES, UPLOAD_CHUNK_MAX_BYTES
+except ImportError:
+    UPLOAD_MAX_FILE_BYTES = 10 * 1024 * 1024
+    UPLOAD_MAX_FILES = 10
+    UPLOAD_CHUNK_MAX_BYTES = 1024 * 1024
+
+#: Prefijo de las rutas de subida protegidas por el límite de tamaño.
+UPLOAD_ROUTE_PREFIX = '/api/v1/uploads/'
+
+#: Prefijo de las rutas de subida reanudable (un bloque por petición).
+UPLOAD_SESSION_ROUTE_PREFIX = '/api/v1/uploads/sessions'
+
+#: Margen para las cabeceras ``multipart`` de cada parte.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+def upload_max_content_length(path):
+    """Tamaño máximo del body de una petición de subida.
+
+    :param path: Ruta de la petición.
+    :type path: str
+    :return: Bytes permitidos: un bloque de ``UPLOAD_CHUNK_MAX_BYTES`` en las
+        sesiones reanudables; ``UPLOAD_MAX_FILES`` ficheros de
+        ``UPLOAD_MAX_FILE_BYTES`` más el margen de ``multipart`` en el resto.
+    :rtype: int
+    """
+    if path.startswith(UPLOAD_SESSION_ROUTE_PREFIX):
+        return UPLOAD_CHUNK_MAX_BYTES + MULTIPART_OVERHEAD_BYTES
+    return UPLOAD_MAX_FILES * UPLOAD_MAX_FILE_BYTES + MULTIPART_OVERHEAD_BYTES
+
+
+class IrHttp(models.AbstractModel):
+    """Limita el tamaño del body de las subidas antes de analizarlo."""
+
+    _inherit = 'ir.http'
+
+    @classmethod
+    def _pre_dispatch(cls, rule, args):
+        """Rechazar subidas demasiado grandes antes de leer el body.
+
+        :param rule: Regla de enrutado encontrada.
+        :param args: Argumentos de la ruta.
+        :raises RequestEntityTooLarge: Si ``Content-Length`` supera el límite.
+        """
+        super(IrHttp, cls)._pre_dispatch(rule, args)
+        httprequest = request.httprequest
+        if httprequest.path.startswith(UPLOAD_ROUTE_PREFIX):
+            max_length = upload_max_content_length(httprequest.path)
+            if httprequest.content_length and httprequest.content_length > max_length:
+                raise RequestEntityTooLarge()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extensión de ``second_market.article`` para la caché de respuestas de la API.
+
+La caché de :mod:`api_market.controllers.cache` vive en la memoria de cada
+*worker*, así que necesita una señal común para saber cuándo una respuesta ha
+dejado de ser válida. Esa señal es un contador de generación guardado en una
+secuencia de PostgreSQL (``second_market_article_generation_seq``): toda
+creación, modificación o borrado de artículos lo incrementa y las entradas de
+la caché se guardan con la generación con la que se calcularon.
+"""
+
+from odoo import models, api
+
+#: Secuencia de PostgreSQL con la generación de los datos de artículos.
+GENERATION_SEQUENCE = 'second_market_article_generation_seq'
+
+
+class ArticuloSegundaManoApi(models.Model):
+    """Añade a ``second_market.article`` el contador de generación de la caché de la API."""
+
+    _inherit = 'second_market.article'
+
+    def init(self):
+        """Crear la secuencia del contador de generación si no existe."""
+        super(ArticuloSegundaManoApi, self).init()
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {GENERATION_SEQUENCE}")
+
+    @api.model
+    def _api_cache_generation(self):
+        """Leer la generación actual de los datos de artículos.
+
+        La lectura de una secuencia no depende de la transacción, por lo que
+        todos los *workers* ven el mismo valor en cuanto se incrementa.
+
+        :return: Generación actual.
+        :rtype: int
+        """
+        self.env.cr.execute(f"SELECT last_value FROM {GENERATION_SEQUENCE}")
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _bump_api_cache_generation(self):
+        """Invalidar las respuestas cacheadas de todos los *workers*.
+
+        Incrementa la generación inmediatamente y otra vez tras el ``COMMIT``:
+        una petición que lea los datos antiguos entre ambos momentos guarda su
+        respuesta con una generación que queda obsoleta al confirmarse la
+        transacción. El segundo incremento se registra una sola vez por
+        transacción.
+        """
+        cr = self.env.cr
+        cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+        if not cr.postcommit.data.get('api_market.generation_bump'):
+            cr.postcommit.data['api_market.generation_bump'] = True
+            registry = self.env.registry
+
+            def bump_after_commit():
+                with registry.cursor() as new_cr:
+                    new_cr.execute(f"SELECT nextval('{GENERATION_SEQUENCE}')")
+
+            cr.postcommit.add(bump_after_commit)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Crear artículos e invalidar la caché de respuestas de la API.
+
+        :param vals_list: Lista de diccionarios con los valores de cada artículo.
+        :type vals_list: list[dict]
+        :return: Recordset con los artículos creados.
+        :rtype: second_market.article
+        """
+        articulos = super(ArticuloSegundaManoApi, self).create(vals_list)
+        self._bump_api_cache_generation()
+        return articulos
+
+    def write(self, vals):
+        """Actualizar artículos e invalidar la caché de respuestas de la API.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(ArticuloSegundaManoApi, self).write(vals)
+        self._bump_api_cache_generation()
+        return res
+
+    def unlink(self):
+        """Eliminar artículos e invalidar la caché de respuestas de la API.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        res = super(ArticuloSegundaManoApi, self).unlink()
+        self._bump_api_cache_generation()
+        return res
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extensión de ``second_market.category`` para la caché de respuestas de la API.
+
+Las respuestas cacheadas de artículos (listados y facetas) incluyen el nombre
+de la categoría, así que modificar o borrar una categoría incrementa la
+generación de la caché (ver :mod:`api_market.models.second_market_articulo`).
+"""
+
+from odoo import models
+
+
+class CategoriaSegundaManoApi(models.Model):
+    """Añade a ``second_market.category`` la invalidación de la caché de la API."""
+
+    _inherit = 'second_market.category'
+
+    def write(self, vals):
+        """Actualizar categorías e invalidar la caché de respuestas de la API.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(CategoriaSegundaManoApi, self).write(vals)
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
+
+    def unlink(self):
+        """Eliminar categorías e invalidar la caché de respuestas de la API.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        res = super(CategoriaSegundaManoApi, self).unlink()
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extensión de ``second_market.tag`` para la caché de respuestas de la API.
+
+Las respuestas cacheadas de artículos incluyen el nombre de sus etiquetas, así
+que modificar o borrar una etiqueta incrementa la generación de la caché (ver
+:mod:`api_market.models.second_market_articulo`).
+"""
+
+from odoo import models
+
+
+class EtiquetaSegundaManoApi(models.Model):
+    """Añade a ``second_market.tag`` la invalidación de la caché de la API."""
+
+    _inherit = 'second_market.tag'
+
+    def write(self, vals):
+        """Actualizar etiquetas e invalidar la caché de respuestas de la API.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(EtiquetaSegundaManoApi, self).write(vals)
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
+
+    def unlink(self):
+        """Eliminar etiquetas e invalidar la caché de respuestas de la API.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        res = super(EtiquetaSegundaManoApi, self).unlink()
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extensión de ``second_market.image`` para la caché de respuestas de la API.
+
+Los listados y el detalle de artículos incluyen la URL y el orden de sus
+imágenes, así que crear, modificar o borrar una imagen incrementa la generación
+de la caché (ver :mod:`api_market.models.second_market_articulo`).
+"""
+
+from odoo import models, api
+
+
+class ImagenArticuloApi(models.Model):
+    """Añade a ``second_market.image`` la invalidación de la caché de la API."""
+
+    _inherit = 'second_market.image'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Crear imágenes e invalidar la caché de respuestas de la API.
+
+        :param vals_list: Lista de diccionarios con los valores de cada imagen.
+        :type vals_list: list[dict]
+        :return: Recordset con las imágenes creadas.
+        :rtype: second_market.image
+        """
+        imagenes = super(ImagenArticuloApi, self).create(vals_list)
+        self.env['second_market.article']._bump_api_cache_generation()
+        return imagenes
+
+    def write(self, vals):
+        """Actualizar imágenes e invalidar la caché de respuestas de la API.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(ImagenArticuloApi, self).write(vals)
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
+
+    def unlink(self):
+        """Eliminar imágenes e invalidar la caché de respuestas de la API.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        res = super(ImagenArticuloApi, self).unlink()
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+"""
+Limitación de intentos de login para la API de Second Market.
+
+Cada intento fallido de ``POST /api/v1/auth/login`` se apunta en la tabla
+``second_market_login_attempt`` con el login (normalizado) y la IP de origen.
+Antes de buscar al usuario y de calcular el hash PBKDF2 de la contraseña, el
+login comprueba con una sola consulta indexada cuántos fallos hay en la ventana
+deslizante de ``LOGIN_LOCKOUT_SECONDS`` segundos:
+
+- por login, como máximo ``MAX_LOGIN_ATTEMPTS``;
+- por IP, como máximo ``MAX_LOGIN_ATTEMPTS_PER_IP`` (más alto, porque varias
+  personas pueden compartir IP).
+
+Si se supera cualquiera de los dos límites el intento se rechaza sin hacer
+ningún cálculo costoso y se apunta como ``bloqueado``, de modo que
+:meth:`IntentoLogin._throttle_counters` puede informar de cuántos intentos se
+han rechazado; la limpieza diaria deja esos contadores en el log. La tabla es compartida por todos los *workers*.
+
+**Concurrencia:** con ``READ COMMITTED`` varias peticiones simultáneas con el
+mismo login verían el mismo número de fallos y probarían todas la contraseña.
+Por eso :meth:`IntentoLogin._check_throttle` toma antes de contar un bloqueo
+consultivo de PostgreSQL por login (``pg_advisory_xact_lock``) que se libera
+al terminar la transacción de la petición: los intentos de un mismo login se
+procesan de uno en uno y cada uno ve los fallos ya confirmados de los
+anteriores. El límite por IP no se serializa (bloquearía a todos los usuarios
+detrás de la misma IP), así que puede superarse en tantos intentos como
+peticiones simultáneas haya.
+"""
+
+import datetime
+import logging
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Importar configuración
+try:
+    from ..config import MAX_LOGIN_ATTEMPTS, MAX_LOGIN_ATTEMPTS_PER_IP, LOGIN_LOCKOUT_SECONDS
+except ImportError:
+    MAX_LOGIN_ATTEMPTS = 5
+    MAX_LOGIN_ATTEMPTS_PER_IP = 20
+    LOGIN_LOCKOUT_SECONDS = 600
+
+
+class IntentoLogin(models.Model):
+    """Intento de login fallido o rechazado por exceso de intentos.
+
+    :cvar _name: Nombre técnico del modelo en Odoo.
+    :cvar _description: Descripción legible del modelo.
+    :cvar _order: Orden por defecto (más reciente primero).
+    :cvar _log_access: Sin columnas de auditoría: la tabla recibe una fila por intento.
+    """
+
+    _name = 'second_market.login.attempt'
+    _description = 'Intento de Login'
+    _order = 'fecha desc, id desc'
+    _log_access = False
+
+    login = fields.Char(
+        string='Login',
+        required=True,
+        readonly=True,
+        help='Login normalizado (minúsculas, sin espacios) del intento'
+    )
+
+    ip = fields.Char(
+        string='IP',
+        readonly=True,
+        help='Dirección IP de origen del intento'
+    )
+
+    fecha = fields.Datetime(
+        string='Fecha',
+        required=True,
+        readonly=True,
+        default=fields.Datetime.now
+    )
+
+    resultado = fields.Selection(
+        [
+            ('fallido', 'Fallido'),
+            ('bloqueado', 'Bloqueado'),
+        ],
+        string='Resultado',
+        required=True,
+        readonly=True,
+        default='fallido',
+        help='Fallido: credenciales incorrectas. Bloqueado: rechazado sin comprobar la contraseña'
+    )
+
+    def init(self):
+        """Crear los índices de las consultas de la ventana deslizante."""
+        super(IntentoLogin, self).init()
+        create_index(self.env.cr, 'second_market_login_attempt_login_idx', self._table, ['login', 'fecha'])
+        create_index(self.env.cr, 'second_market_login_attempt_ip_idx', self._table, ['ip', 'fecha'])
+
+    @api.model
+    def _normalize_login(self, login):
+        """Normalizar un login para que las variantes de mayúsculas cuenten juntas.
+
+        :param login: Login recibido.
+        :type login: str
+        :rtype: str
+        """
+        return (login or '').strip().lower()
+
+    @api.model
+    def _check_throttle(self, login, ip):
+        """Comprobar si un intento de login supera los límites de la ventana.
+
+        Si los supera, el intento se apunta como ``bloqueado``. Antes de contar
+        toma el bloqueo consultivo del login, que se mantiene hasta el final de
+        la transacción (ver la documentación del módulo).
+
+        :param login: Login recibido.
+        :type login: str
+        :param ip: IP de origen.
+        :type ip: str or None
+        :return: ``0`` si el intento puede continuar o los segundos que faltan
+            para que caduque el fallo más antiguo de la ventana.
+        :rtype: int
+        """
+        login = self._normalize_login(login)
+        now = fields.Datetime.now()
+        window_start = now - datetime.timedelta(seconds=LOGIN_LOCKOUT_SECONDS)
+        self.env.cr.execute(SQL(
+            "SELECT pg_advisory_xact_lock(hashtext(%s), hashtext(%s))",
+            self._table, login,
+        ))
+        self.env.cr.execute(SQL(
+            """
+            SELECT count(*) FILTER (WHERE login = %(login)s),
+                   min(fecha) FILTER (WHERE login = %(login)s),
+                   count(*) FILTER (WHERE ip = %(ip)s),
+                   min(fecha) FILTER (WHERE ip = %(ip)s)
+              FROM %(table)s
+             WHERE resultado = 'fallido'
+               AND fecha >= %(window_start)s
+               AND (login = %(login)s OR ip = %(ip)s)
+            """,
+            login=login,
+            ip=ip,
+            window_start=window_start,
+            table=SQL.identifier(self._table),
+        ))
+        login_count, login_oldest, ip_count, ip_oldest = self.env.cr.fetchone()
+
+        oldest = []
+        if login_count >= MAX_LOGIN_ATTEMPTS:
+            oldest.append(login_oldest)
+        if ip and ip_count >= MAX_LOGIN_ATTEMPTS_PER_IP:
+            oldest.append(ip_oldest)
+        if not oldest:
+            return 0
+
+        self.sudo().create({'login': login, 'ip': ip, 'resultado': 'bloqueado'})
+        _logger.warning(f"Login bloqueado por exceso de intentos: {login} desde {ip}")
+        retry_at = max(oldest) + datetime.timedelta(seconds=LOGIN_LOCKOUT_SECONDS)
+        return max(1, int((retry_at - now).total_seconds()))
+
+    @api.model
+    def _register_failure(self, login, ip):
+        """Apuntar un intento de login con credenciales incorrectas.
+
+        :param login: Login recibido.
+        :type login: str
+        :param ip: IP de origen.
+        :type ip: str or None
+        """
+        self.sudo().create({'login': self._normalize_login(login), 'ip': ip, 'resultado': 'fallido'})
+
+    @api.model
+    def _register_success(self, login):
+        """Olvidar los fallos de un login tras autenticarse correctamente.
+
+        Los fallos de la IP se conservan: una IP que prueba muchos logins
+        sigue limitada aunque acierte alguno.
+
+        :param login: Login autenticado.
+        :type login: str
+        """
+        self.sudo().search([
+            ('login', '=', self._normalize_login(login)),
+            ('resultado', '=', 'fallido'),
+        ]).unlink()
+
+    @api.model
+    def _throttle_counters(self, hours=24):
+        """Contar los intentos fallidos y rechazados de las últimas horas.
+
+        :param hours: Horas hacia atrás.
+        :type hours: int
+        :return: Diccionario ``{'fallido': int, 'bloqueado': int}``.
+        :rtype: dict
+        """
+        since = fields.Datetime.now() - datetime.timedelta(hours=hours)
+        counters = {'fallido': 0, 'bloqueado': 0}
+        for resultado, count in self.sudo()._read_group([('fecha', '>=', since)], ['resultado'], ['__count']):
+            counters[resultado] = count
+        return counters
+
+    @api.model
+    def _gc_login_attempts(self, days=7):
+        """Eliminar los intentos antiguos (tarea programada).
+
+        Antes de borrar deja en el log los contadores de las últimas 24 horas
+        (:meth:`_throttle_counters`); la tarea se ejecuta una vez al día, así que
+        cada línea resume un día de intentos fallidos y rechazados.
+
+        :param days: Días que se conservan los intentos.
+        :type days: int
+        :return: Número de intentos eliminados.
+        :rtype: int
+        """
+        counters = self._throttle_counters()
+        _logger.info(
+            f"Intentos de login en las últimas 24 h: {counters['fallido']} fallidos, "
+            f"{counters['bloqueado']} bloqueados"
+        )
+        limit_date = fields.Datetime.now() - datetime.timedelta(days=days)
+        self.env.cr.execute(SQL(
+            "DELETE FROM %s WHERE fecha < %s",
+            SQL.identifier(self._table), limit_date,
+        ))
+        return self.env.cr.rowcount
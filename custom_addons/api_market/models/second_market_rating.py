@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extensión de ``second_market.rating`` para la caché de respuestas de la API.
+
+Los listados cacheados incluyen la ``calificacion_promedio`` del propietario,
+un campo calculado y almacenado a partir de sus valoraciones. El ORM lo
+recalcula sin pasar por ``write`` de ``second_market.user``, así que crear,
+modificar o borrar una valoración incrementa la generación de la caché (ver
+:mod:`api_market.models.second_market_articulo`).
+"""
+
+from odoo import models, api
+
+#: Campos de la valoración de los que depende ``calificacion_promedio``.
+CACHED_RATING_FIELDS = frozenset({'calificacion', 'id_usuario'})
+
+
+class ValoracionApi(models.Model):
+    """Añade a ``second_market.rating`` la invalidación de la caché de la API."""
+
+    _inherit = 'second_market.rating'
+
+    @api.model
+    def create(self, vals):
+        """Crear una valoración e invalidar la caché de respuestas de la API.
+
+        :param vals: Diccionario con los valores del nuevo registro.
+        :type vals: dict
+        :return: Registro de valoración creado.
+        :rtype: second_market.rating
+        """
+        valoracion = super(ValoracionApi, self).create(vals)
+        self.env['second_market.article']._bump_api_cache_generation()
+        return valoracion
+
+    def write(self, vals):
+        """Actualizar valoraciones e invalidar la caché si cambia el promedio.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(ValoracionApi, self).write(vals)
+        if CACHED_RATING_FIELDS.intersection(vals):
+            self.env['second_market.article']._bump_api_cache_generation()
+        return res
+
+    def unlink(self):
+        """Eliminar valoraciones e invalidar la caché de respuestas de la API.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        res = super(ValoracionApi, self).unlink()
+        self.env['second_market.article']._bump_api_cache_generation()
+        return res
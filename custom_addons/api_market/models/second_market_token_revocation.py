@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+"""
+Revocación de tokens JWT de la API de Second Market.
+
+Cada token emitido lleva un identificador único (claim ``jti``). Al hacer
+logout, el ``jti`` se guarda en esta tabla junto con la caducidad del token;
+pasada esa fecha la fila ya no sirve (el token se rechaza por expirado) y la
+tarea programada la elimina.
+
+La comprobación en cada petición no consulta esta tabla: cada *worker* mantiene
+en memoria el conjunto de ``jti`` revocados y lo actualiza de forma incremental
+como mucho cada ``TOKEN_REVOCATION_REFRESH_SECONDS`` segundos (ver
+:func:`api_market.controllers.auth_controller.is_token_revoked`).
+"""
+
+import datetime
+
+from odoo import models, fields, api
+from odoo.tools import SQL
+
+#: Margen (segundos) con el que se relee la tabla en cada actualización
+#: incremental, para no perder revocaciones de transacciones que confirmaron tarde.
+SYNC_OVERLAP_SECONDS = 60
+
+
+class RevocacionToken(models.Model):
+    """Token JWT revocado antes de su caducidad.
+
+    :cvar _name: Nombre técnico del modelo en Odoo.
+    :cvar _description: Descripción legible del modelo.
+    :cvar _log_access: Sin columnas de auditoría; ``revocado`` guarda la fecha.
+    """
+
+    _name = 'second_market.token.revocation'
+    _description = 'Revocación de Token'
+    _order = 'revocado desc, id desc'
+    _log_access = False
+
+    jti = fields.Char(
+        string='JTI',
+        required=True,
+        readonly=True,
+        index=True,
+        help='Identificador único del token revocado (claim jti)'
+    )
+
+    user_id = fields.Many2one(
+        'second_market.user',
+        string='Usuario',
+        readonly=True,
+        ondelete='cascade'
+    )
+
+    expira = fields.Datetime(
+        string='Caducidad del Token',
+        required=True,
+        readonly=True,
+        index=True,
+        help='A partir de esta fecha el token ya no es válido y la revocación se elimina'
+    )
+
+    revocado = fields.Datetime(
+        string='Fecha de Revocación',
+        required=True,
+        readonly=True,
+        index=True,
+        default=fields.Datetime.now
+    )
+
+    _sql_constraints = [
+        ('jti_unique', 'UNIQUE(jti)', 'El token ya está revocado.'),
+    ]
+
+    @api.model
+    def _revoke(self, jti, user_id, expires_at):
+        """Revocar un token.
+
+        :param jti: Identificador del token.
+        :type jti: str
+        :param user_id: ID del usuario del token.
+        :type user_id: int
+        :param expires_at: Caducidad del token (UTC, sin zona horaria).
+        :type expires_at: datetime.datetime
+        """
+        self.env.cr.execute(SQL(
+            """
+            INSERT INTO %(table)s (jti, user_id, expira, revocado)
+            VALUES (%(jti)s, %(user_id)s, %(expira)s, now() AT TIME ZONE 'UTC')
+            ON CONFLICT (jti) DO NOTHING
+            """,
+            table=SQL.identifier(self._table),
+            jti=jti,
+            user_id=user_id,
+            expira=expires_at,
+        ))
+
+    @api.model
+    def _revoked_since(self, since=None):
+        """Obtener los tokens revocados vigentes, opcionalmente solo los recientes.
+
+        :param since: Fecha de la actualización anterior (devuelta por esta
+            misma función); ``None`` para obtener todos.
+        :type since: datetime.datetime or None
+        :return: Tupla ``(fecha, revocados)``: ``fecha`` es la que debe pasarse
+            en la siguiente llamada y ``revocados`` una lista de
+            ``(jti, caducidad)`` con la caducidad como *timestamp* UNIX.
+        :rtype: tuple
+        """
+        overlap = since - datetime.timedelta(seconds=SYNC_OVERLAP_SECONDS) if since else None
+        self.env.cr.execute(SQL(
+            """
+            SELECT jti, extract(epoch FROM expira)
+              FROM %(table)s
+             WHERE expira > now() AT TIME ZONE 'UTC'
+               %(since)s
+            """,
+            table=SQL.identifier(self._table),
+            since=SQL("AND revocado >= %s", overlap) if overlap else SQL(),
+        ))
+        revoked = [(jti, float(expires)) for jti, expires in self.env.cr.fetchall()]
+        self.env.cr.execute("SELECT now() AT TIME ZONE 'UTC'")
+        return self.env.cr.fetchone()[0], revoked
+
+    @api.model
+    def _gc_expired_revocations(self):
+        """Eliminar las revocaciones de tokens ya caducados (tarea programada).
+
+        :return: Número de revocaciones eliminadas.
+        :rtype: int
+        """
+        self.env.cr.execute(SQL(
+            "DELETE FROM %s WHERE expira <= now() AT TIME ZONE 'UTC'",
+            SQL.identifier(self._table),
+        ))
+        return self.env.cr.rowcount
@@ -0,0 +1,447 @@
+# -*- coding: utf-8 -*-
+
+"""
+Subidas de imágenes en dos fases para la API de Second Market.
+
+Los clientes suben cada imagen como fichero binario (``multipart/form-data``) a
+``POST /api/v1/uploads/images`` y reciben un *token* por fichero. Después crean
+el artículo enviando solo esos tokens en ``imagen_tokens``, de modo que el body
+JSON de ``POST /api/v1/articles`` ya no contiene imágenes en base64.
+
+El contenido de cada subida se normaliza al recibirlo y se guarda en un
+``ir.attachment`` (filestore) que el registro :class:`SubidaImagen` asocia al
+usuario que lo subió. Al crear el artículo ese mismo adjunto pasa a ser la
+imagen, sin volver a transferir ni codificar el contenido.
+
+**Subidas reanudables:** en conexiones móviles inestables el cliente puede abrir
+una sesión (estado ``uploading``) y enviar la imagen por bloques indicando su
+posición. Los bloques se añaden a un fichero temporal en
+``<data_dir>/second_market_uploads/<bd>/`` y, al recibir el último, el fichero
+completo se convierte en el adjunto de la subida (estado ``done``). Tras una
+desconexión basta con consultar ``received_size`` y continuar desde ahí. La
+tarea programada :meth:`SubidaImagen._gc_stale_uploads` elimina las subidas
+abandonadas.
+"""
+
+import datetime
+import hashlib
+import logging
+import os
+import secrets
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import config
+from odoo.tools.mimetypes import guess_mimetype
+
+_logger = logging.getLogger(__name__)
+
+# Importar configuración
+try:
+    from ..config import UPLOAD_SESSION_TTL_HOURS
+except ImportError:
+    UPLOAD_SESSION_TTL_HOURS = 24
+
+
+class UploadOffsetError(UserError):
+    """El bloque recibido no empieza en la posición esperada de la sesión."""
+
+
+class SubidaImagen(models.Model):
+    """Imagen subida por un usuario y pendiente de asociarse a un artículo.
+
+    :cvar _name: Nombre técnico del modelo en Odoo.
+    :cvar _description: Descripción legible del modelo.
+    :cvar _order: Orden por defecto (más reciente primero).
+    """
+
+    _name = 'second_market.upload'
+    _description = 'Subida de Imagen'
+    _order = 'create_date desc, id desc'
+
+    token = fields.Char(
+        string='Token',
+        required=True,
+        readonly=True,
+        copy=False,
+        index=True,
+        default=lambda self: secrets.token_urlsafe(24),
+        help='Identificador opaco que el cliente envía en imagen_tokens'
+    )
+
+    user_id = fields.Many2one(
+        'second_market.user',
+        string='Usuario',
+        required=True,
+        ondelete='cascade',
+        index=True,
+        help='Usuario que subió la imagen'
+    )
+
+    name = fields.Char(
+        string='Nombre del fichero'
+    )
+
+    attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='Adjunto',
+        ondelete='set null',
+        help='Adjunto con el contenido subido'
+    )
+
+    file_size = fields.Integer(
+        string='Tamaño (bytes)',
+        related='attachment_id.file_size'
+    )
+
+    mimetype = fields.Char(
+        string='Tipo MIME',
+        related='attachment_id.mimetype'
+    )
+
+    state = fields.Selection([
+        ('uploading', 'Subiendo'),
+        ('done', 'Completada'),
+    ],
+        string='Estado',
+        required=True,
+        default='done',
+        help='Las sesiones reanudables permanecen en "Subiendo" hasta recibir el último bloque'
+    )
+
+    total_size = fields.Integer(
+        string='Tamaño esperado (bytes)',
+        help='Tamaño total anunciado al abrir una sesión reanudable'
+    )
+
+    received_size = fields.Integer(
+        string='Recibido (bytes)',
+        default=0,
+        help='Bytes recibidos; el siguiente bloque debe empezar en esta posición'
+    )
+
+    checksum = fields.Char(
+        string='SHA-1',
+        help='SHA-1 (hex) del fichero tal como lo subió el cliente; en las sesiones '
+             'reanudables puede anunciarse al abrirlas y se verifica al completarlas'
+    )
+
+    _sql_constraints = [
+        ('token_unique', 'UNIQUE(token)', 'El token de subida debe ser único.'),
+    ]
+
+    @api.model
+    def _create_from_bytes(self, user_id, name, content):
+        """Registrar una subida guardando el contenido en un ``ir.attachment``.
+
+        :param user_id: ID del ``second_market.user`` que sube la imagen.
+        :type user_id: int
+        :param name: Nombre del fichero.
+        :type name: str
+        :param content: Contenido binario del fichero.
+        :type content: bytes
+        :return: Subida creada.
+        :rtype: second_market.upload
+        """
+        upload = self.create({
+            'user_id': user_id,
+            'name': name,
+            'checksum': hashlib.sha1(content).hexdigest(),
+        })
+        upload._store_content(content)
+        return upload
+
+    def _store_content(self, content):
+        """Normalizar el contenido subido y guardarlo como adjunto de la subida.
+
+        La normalización se hace al recibir la imagen para que al crear el
+        artículo baste con reasignar el adjunto (ver :meth:`_consume`).
+
+        :param content: Contenido binario original.
+        :type content: bytes
+        """
+        self.ensure_one()
+        normalized = self.env['second_market.image']._normalize_contents([content])[0]
+        self.attachment_id = self.env['ir.attachment'].create({
+            'name': self.name or self.token,
+            'raw': normalized,
+            'res_model': self._name,
+            'res_id': self.id,
+        })
+
+    @api.model
+    def _reusable_images_domain(self, user_id):
+        """Dominio de las ``second_market.image`` que un usuario puede reutilizar.
+
+        Solo las de sus propios artículos o las de artículos publicados y
+        activos, que ya son públicas: así la deduplicación no permite averiguar
+        si existe una imagen privada de otro usuario ni adjuntarla.
+
+        :param user_id: ID del ``second_market.user`` que sube la imagen.
+        :type user_id: int
+        :return: Dominio de búsqueda.
+        :rtype: list
+        """
+        return [
+            '|',
+            ('article_id.id_propietario', '=', user_id),
+            '&',
+            ('article_id.estado_publicacion', '=', 'publicado'),
+            ('article_id.activo', '=', True),
+        ]
+
+    @api.model
+    def _create_from_checksums(self, user_id, checksums):
+        """Crear subidas a partir de imágenes ya guardadas con el mismo contenido.
+
+        Para cada SHA-1 que coincide con una ``second_market.image`` reutilizable
+        por el usuario (ver :meth:`_reusable_images_domain`) se crea una subida
+        que apunta al adjunto de esa imagen, sin transferir ni copiar bytes.
+
+        :param user_id: ID del ``second_market.user`` que sube la imagen.
+        :type user_id: int
+        :param checksums: SHA-1 (hex) de las imágenes que el cliente quiere subir.
+        :type checksums: list[str]
+        :return: Diccionario ``{sha1: subida}`` con las imágenes encontradas.
+        :rtype: dict
+        """
+        checksums = list({checksum.lower() for checksum in checksums if checksum})
+        images = self.env['second_market.image'].search(
+            [('checksum', 'in', checksums)] + self._reusable_images_domain(user_id)
+        )
+        image_by_checksum = {image.checksum: image for image in images}
+        attachments = self.env['ir.attachment'].search([
+            ('res_model', '=', 'second_market.image'),
+            ('res_field', '=', 'image'),
+            ('res_id', 'in', [image.id for image in image_by_checksum.values()]),
+        ])
+        attachment_by_image = {attachment.res_id: attachment for attachment in attachments}
+
+        uploads = {}
+        for checksum, image in image_by_checksum.items():
+            attachment = attachment_by_image.get(image.id)
+            if attachment:
+                uploads[checksum] = self.create({
+                    'user_id': user_id,
+                    'name': image.name or attachment.name,
+                    'attachment_id': attachment.id,
+                    'checksum': checksum,
+                })
+        return uploads
+
+    @api.model
+    def _ready_uploads(self, tokens, user_id):
+        """Obtener las subidas completadas de un usuario en el orden de ``tokens``.
+
+        :param tokens: Tokens devueltos por el endpoint de subida, en orden.
+        :type tokens: list[str]
+        :param user_id: ID del usuario que crea el artículo; solo puede usar sus
+            propias subidas.
+        :type user_id: int
+        :return: Subidas en el orden de ``tokens``.
+        :rtype: second_market.upload
+        :raises UserError: Si algún token no existe o pertenece a otro usuario.
+        """
+        uploads = self.search([
+            ('token', 'in', list(tokens)),
+            ('user_id', '=', user_id),
+            ('state', '=', 'done'),
+        ])
+        by_token = {upload.token: upload for upload in uploads}
+        missing = [token for token in tokens if token not in by_token or not by_token[token].attachment_id]
+        if missing:
+            raise UserError(_('Tokens de subida no válidos: %s') % ', '.join(missing))
+        return self.browse([by_token[token].id for token in tokens])
+
+    def _consume(self, article_id):
+        """Convertir las subidas en imágenes del artículo y eliminarlas.
+
+        El adjunto de cada subida, ya normalizado al recibirlo, pasa a ser el
+        campo ``image`` de la nueva ``second_market.image`` cambiando su
+        ``res_model``/``res_field``/``res_id``: el contenido no se vuelve a leer
+        ni a codificar. Los adjuntos que pertenecen a otra imagen (subidas de
+        :meth:`_create_from_checksums`) se copian; el filestore reutiliza el
+        mismo fichero porque está direccionado por contenido.
+
+        :param article_id: ID del artículo al que se añaden las imágenes.
+        :type article_id: int
+        :return: Imágenes creadas, en el orden del recordset.
+        :rtype: second_market.image
+        """
+        images = self.env['second_market.image'].create([{
+            'article_id': article_id,
+            'name': upload.name or '',
+            'sequence': (index + 1) * 10,
+            'checksum': upload.checksum or False,
+        } for index, upload in enumerate(self)])
+
+        reused = self.env['ir.attachment']
+        for upload, image in zip(self, images):
+            target = {'res_model': image._name, 'res_field': 'image', 'res_id': image.id}
+            attachment = upload.attachment_id
+            if attachment.res_model == self._name and attachment not in reused:
+                attachment.write(target)
+                reused |= attachment
+            else:
+                attachment.copy(target)
+
+        # Las versiones reducidas y las dimensiones dependen de ``image``.
+        images.invalidate_recordset(['image'])
+        images.modified(['image'])
+        self.unlink()
+        return images
+
+    # ============================================
+    # SUBIDAS REANUDABLES
+    # ============================================
+
+    @api.model
+    def _chunk_dir(self):
+        """Directorio de los ficheros temporales de las sesiones de esta base de datos.
+
+        :return: Ruta absoluta (se crea si no existe).
+        :rtype: str
+        """
+        path = os.path.join(config['data_dir'], 'second_market_uploads', self.env.cr.dbname)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _chunk_path(self):
+        """Ruta del fichero temporal de la sesión.
+
+        :return: Ruta absoluta del fichero parcial.
+        :rtype: str
+        """
+        self.ensure_one()
+        return os.path.join(self._chunk_dir(), self.token)
+
+    @api.model
+    def _open_session(self, user_id, name, total_size, checksum=None):
+        """Abrir una sesión de subida reanudable.
+
+        :param user_id: ID del ``second_market.user`` que sube la imagen.
+        :type user_id: int
+        :param name: Nombre del fichero.
+        :type name: str
+        :param total_size: Tamaño total del fichero en bytes.
+        :type total_size: int
+        :param checksum: SHA-1 (hex) del fichero completo, opcional.
+        :type checksum: str or None
+        :return: Sesión creada en estado ``uploading``.
+        :rtype: second_market.upload
+        """
+        session = self.create({
+            'user_id': user_id,
+            'name': name,
+            'state': 'uploading',
+            'total_size': total_size,
+            'checksum': checksum.lower() if checksum else False,
+        })
+        open(session._chunk_path(), 'wb').close()
+        return session
+
+    def _append_chunk(self, offset, data, chunk_checksum):
+        """Añadir un bloque a la sesión y completarla si es el último.
+
+        El registro se bloquea (``SELECT ... FOR UPDATE``) para que dos bloques
+        concurrentes de la misma sesión no se intercalen. Si una petición
+        anterior escribió en el fichero pero su transacción no llegó a
+        confirmarse, los bytes sobrantes se descartan truncando el fichero a
+        ``received_size``.
+
+        :param offset: Posición del bloque dentro del fichero.
+        :type offset: int
+        :param data: Contenido del bloque.
+        :type data: bytes
+        :param chunk_checksum: SHA-1 (hex) del bloque.
+        :type chunk_checksum: str
+        :raises UploadOffsetError: Si ``offset`` no coincide con ``received_size``.
+        :raises UserError: Si el checksum no coincide, el bloque excede el tamaño
+            anunciado o la sesión ya está completa.
+        """
+        self.ensure_one()
+        self.env.cr.execute("SELECT id FROM second_market_upload WHERE id = %s FOR UPDATE", [self.id])
+        self.invalidate_recordset(['state', 'received_size'])
+        if self.state != 'uploading':
+            raise UserError(_('La subida ya está completa.'))
+        if offset != self.received_size:
+            raise UploadOffsetError(_('Se esperaba el bloque en la posición %s.') % self.received_size)
+        if hashlib.sha1(data).hexdigest() != (chunk_checksum or '').lower():
+            raise UserError(_('El checksum del bloque no coincide.'))
+        if offset + len(data) > self.total_size:
+            raise UserError(_('El bloque excede el tamaño anunciado del fichero.'))
+
+        path = self._chunk_path()
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as chunk_file:
+            chunk_file.seek(offset)
+            chunk_file.truncate()
+            chunk_file.write(data)
+        self.received_size = offset + len(data)
+
+        if self.received_size == self.total_size:
+            self._finish_session()
+
+    def _finish_session(self):
+        """Convertir el fichero completo de la sesión en el adjunto de la subida.
+
+        :raises UserError: Si el SHA-1 del fichero no coincide con el anunciado o
+            el contenido no es una imagen.
+        """
+        self.ensure_one()
+        path = self._chunk_path()
+        with open(path, 'rb') as chunk_file:
+            content = chunk_file.read()
+        if self.checksum and hashlib.sha1(content).hexdigest() != self.checksum:
+            self.received_size = 0
+            raise UserError(_('El checksum del fichero completo no coincide; hay que repetir la subida.'))
+        if not guess_mimetype(content).startswith('image/'):
+            self.received_size = 0
+            raise UserError(_('El fichero subido no es una imagen.'))
+        self._store_content(content)
+        self.checksum = self.checksum or hashlib.sha1(content).hexdigest()
+        self.state = 'done'
+        self._remove_chunk_file()
+
+    def _remove_chunk_file(self):
+        """Borrar los ficheros temporales de las sesiones del recordset."""
+        for upload in self:
+            try:
+                os.unlink(upload._chunk_path())
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                _logger.warning(f"No se pudo borrar el fichero temporal de la subida {upload.token}: {e}")
+
+    @api.model
+    def _gc_stale_uploads(self):
+        """Eliminar subidas no utilizadas (tarea programada).
+
+        Borra las sesiones incompletas y las subidas que nunca se asociaron a un
+        artículo cuya última modificación supera ``UPLOAD_SESSION_TTL_HOURS``,
+        junto con sus adjuntos y ficheros temporales.
+
+        :return: Número de subidas eliminadas.
+        :rtype: int
+        """
+        limit_date = fields.Datetime.now() - datetime.timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+        stale = self.search([('write_date', '<', limit_date)])
+        count = len(stale)
+        stale.unlink()
+        if count:
+            _logger.info(f"Eliminadas {count} subidas de imágenes caducadas")
+        return count
+
+    def unlink(self):
+        """Eliminar las subidas junto con sus adjuntos y ficheros temporales.
+
+        Solo se borran los adjuntos propios de la subida; los que pertenecen a
+        una imagen existente (ver :meth:`_create_from_checksums`) se conservan.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        attachments = self.mapped('attachment_id').filtered(lambda attachment: attachment.res_model == self._name)
+        self.filtered(lambda upload: upload.state == 'uploading')._remove_chunk_file()
+        res = super(SubidaImagen, self).unlink()
+        attachments.unlink()
+        return res
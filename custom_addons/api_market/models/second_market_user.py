@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""
+Extensión de ``second_market.user`` para las cachés de la API.
+
+- Los listados de artículos incluyen datos del propietario (nombre y URL del
+  avatar), así que los cambios en esos campos invalidan también las respuestas
+  cacheadas (ver :mod:`api_market.models.second_market_articulo`).
+- La verificación de tokens guarda en memoria de cada *worker* el estado de los
+  usuarios (ver :func:`api_market.controllers.auth_controller.get_user_state`);
+  al cambiar ``activo``, ``login`` o ``name`` se descarta la entrada.
+"""
+
+from odoo import models
+
+from ..controllers.auth_controller import invalidate_user_cache
+
+#: Campos del usuario que aparecen en las respuestas cacheadas de artículos.
+CACHED_USER_FIELDS = {'name', 'avatar'}
+
+#: Campos del usuario guardados en la caché de autenticación.
+AUTH_CACHED_USER_FIELDS = {'activo', 'login', 'name', 'id_usuario'}
+
+
+class SecondMarketUserApi(models.Model):
+    """Añade a ``second_market.user`` la invalidación de las cachés de la API."""
+
+    _inherit = 'second_market.user'
+
+    def _invalidate_auth_cache(self):
+        """Descartar los usuarios de la caché de autenticación de este *worker*.
+
+        Se descartan al momento y otra vez tras el ``COMMIT``, para que una
+        petición que lea el estado anterior entre ambos momentos no lo deje
+        guardado.
+        """
+        user_ids = list(self.ids)
+        invalidate_user_cache(user_ids)
+        self.env.cr.postcommit.add(lambda: invalidate_user_cache(user_ids))
+
+    def write(self, vals):
+        """Actualizar usuarios e invalidar las cachés de la API afectadas.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(SecondMarketUserApi, self).write(vals)
+        if CACHED_USER_FIELDS.intersection(vals):
+            self.env['second_market.article']._bump_api_cache_generation()
+        if AUTH_CACHED_USER_FIELDS.intersection(vals):
+            self._invalidate_auth_cache()
+        return res
+
+    def unlink(self):
+        """Eliminar usuarios y descartarlos de la caché de autenticación.
+
+        :return: Resultado de la operación de borrado.
+        :rtype: bool
+        """
+        self._invalidate_auth_cache()
+        return super(SecondMarketUserApi, self).unlink()
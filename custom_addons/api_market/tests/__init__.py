@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_articulos
+from . import test_second_market_login_attempt
+from . import test_second_market_token_revocation
+from . import test_second_market_upload
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import datetime
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from odoo.addons.second_market.tests.common import SecondMarketCase
+
+from ..controllers.articulos import InvalidCursorError, _decode_cursor, _encode_cursor
+
+
+@tagged('post_install', '-at_install')
+class TestCursor(BaseCase):
+    """Tests de la codificación de los cursores de paginación."""
+
+    def test_round_trip_keeps_microseconds(self):
+        key = (datetime.datetime(2025, 1, 1, 10, 0, 0, 123456), 42)
+
+        self.assertEqual(_decode_cursor(_encode_cursor(key)), key)
+
+    def test_cursor_is_url_safe(self):
+        cursor = _encode_cursor((datetime.datetime(2025, 1, 1, 10, 0, 0, 999999), 10 ** 9))
+
+        self.assertFalse(set(cursor) & {'+', '/'})
+
+    def test_invalid_cursor(self):
+        invalid = [
+            'no es base64!',
+            base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+            base64.urlsafe_b64encode(b'["no es una fecha", 1]').decode(),
+            base64.urlsafe_b64encode(b'["2025-01-01T10:00:00", "x"]').decode(),
+            None,
+        ]
+        for cursor in invalid:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursorError):
+                _decode_cursor(cursor)
+
+
+@tagged('post_install', '-at_install')
+class TestCursorKeyset(SecondMarketCase):
+    """El cursor devuelto al cliente reproduce la clave exacta de ``_search_keyset``."""
+
+    def test_cursor_continues_after_last_article(self):
+        articulos = self.env['second_market.article']
+        for index in range(3):
+            articulos |= self.create_article(nombre=f'Artículo {index}')
+        domain = [('id', 'in', articulos.ids)]
+        Article = self.env['second_market.article']
+
+        first, next_key = Article._search_keyset(domain, limit=2)
+        second, last_key = Article._search_keyset(domain, limit=2, after=_decode_cursor(_encode_cursor(next_key)))
+
+        self.assertEqual(len(first | second), 3)
+        self.assertFalse(first & second)
+        self.assertIsNone(last_key)
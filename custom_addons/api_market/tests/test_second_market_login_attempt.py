@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+
+from ..models.second_market_login_attempt import (
+    LOGIN_LOCKOUT_SECONDS,
+    MAX_LOGIN_ATTEMPTS,
+    MAX_LOGIN_ATTEMPTS_PER_IP,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestIntentoLogin(TransactionCase):
+    """Tests de la ventana deslizante de intentos de login."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestIntentoLogin, cls).setUpClass()
+        cls.Attempt = cls.env['second_market.login.attempt']
+
+    def _fail(self, login, ip, times=1, seconds_ago=0):
+        fecha = fields.Datetime.now() - datetime.timedelta(seconds=seconds_ago)
+        self.Attempt.create([
+            {'login': login, 'ip': ip, 'fecha': fecha, 'resultado': 'fallido'}
+            for _i in range(times)
+        ])
+
+    def test_below_limit_is_allowed(self):
+        self._fail('ana@example.com', '10.0.0.1', times=MAX_LOGIN_ATTEMPTS - 1)
+
+        self.assertEqual(self.Attempt._check_throttle('ana@example.com', '10.0.0.1'), 0)
+
+    def test_login_limit_blocks_and_is_recorded(self):
+        self._fail('ana@example.com', '10.0.0.1', times=MAX_LOGIN_ATTEMPTS)
+
+        retry_after = self.Attempt._check_throttle(' ANA@example.com ', '10.0.0.2')
+
+        self.assertTrue(0 < retry_after <= LOGIN_LOCKOUT_SECONDS)
+        self.assertEqual(self.Attempt._throttle_counters()['bloqueado'], 1)
+
+    def test_failures_outside_window_expire(self):
+        self._fail('ana@example.com', '10.0.0.1', times=MAX_LOGIN_ATTEMPTS, seconds_ago=LOGIN_LOCKOUT_SECONDS + 60)
+
+        self.assertEqual(self.Attempt._check_throttle('ana@example.com', '10.0.0.1'), 0)
+
+    def test_retry_after_counts_from_oldest_failure(self):
+        self._fail('ana@example.com', '10.0.0.1', seconds_ago=LOGIN_LOCKOUT_SECONDS - 30)
+        self._fail('ana@example.com', '10.0.0.1', times=MAX_LOGIN_ATTEMPTS - 1)
+
+        retry_after = self.Attempt._check_throttle('ana@example.com', '10.0.0.1')
+
+        self.assertTrue(0 < retry_after <= 30)
+
+    def test_ip_limit_blocks_other_logins(self):
+        for index in range(MAX_LOGIN_ATTEMPTS_PER_IP):
+            self._fail(f'usuario{index}@example.com', '10.0.0.9')
+
+        self.assertTrue(self.Attempt._check_throttle('nuevo@example.com', '10.0.0.9'))
+        self.assertEqual(self.Attempt._check_throttle('nuevo@example.com', '10.0.0.10'), 0)
+
+    def test_success_clears_login_failures_only(self):
+        self._fail('ana@example.com', '10.0.0.1', times=MAX_LOGIN_ATTEMPTS)
+        self._fail('otro@example.com', '10.0.0.1')
+
+        self.Attempt._register_success('Ana@example.com')
+
+        self.assertEqual(self.Attempt._check_throttle('ana@example.com', '10.0.0.1'), 0)
+        self.assertEqual(self.Attempt.search_count([('login', '=', 'otro@example.com')]), 1)
+
+    def test_gc_logs_counters(self):
+        self._fail('ana@example.com', '10.0.0.1', times=2)
+
+        with self.assertLogs('odoo.addons.api_market.models.second_market_login_attempt', level='INFO') as logs:
+            self.Attempt._gc_login_attempts()
+
+        self.assertIn('2 fallidos, 0 bloqueados', logs.output[0])
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+
+from odoo import fields
+from odoo.tests import tagged
+from odoo.tests.common import HttpCase, TransactionCase
+
+from ..controllers import auth_controller
+
+
+@tagged('post_install', '-at_install')
+class TestRevocacionToken(TransactionCase):
+    """Tests del modelo de tokens revocados."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRevocacionToken, cls).setUpClass()
+        cls.Revocation = cls.env['second_market.token.revocation']
+
+    def test_revoke_is_idempotent(self):
+        expires = fields.Datetime.now() + datetime.timedelta(hours=1)
+
+        self.Revocation._revoke('jti-1', None, expires)
+        self.Revocation._revoke('jti-1', None, expires)
+
+        self.assertEqual(self.Revocation.search_count([('jti', '=', 'jti-1')]), 1)
+
+    def test_revoked_since_returns_only_valid_tokens(self):
+        now = fields.Datetime.now()
+        self.Revocation._revoke('vigente', None, now + datetime.timedelta(hours=1))
+        self.Revocation._revoke('caducado', None, now - datetime.timedelta(hours=1))
+
+        synced_at, revoked = self.Revocation._revoked_since()
+
+        jtis = {jti for jti, _expires in revoked}
+        self.assertIn('vigente', jtis)
+        self.assertNotIn('caducado', jtis)
+        self.assertTrue(synced_at)
+
+    def test_gc_removes_expired(self):
+        now = fields.Datetime.now()
+        self.Revocation._revoke('vigente', None, now + datetime.timedelta(hours=1))
+        self.Revocation._revoke('caducado', None, now - datetime.timedelta(hours=1))
+
+        self.assertGreaterEqual(self.Revocation._gc_expired_revocations(), 1)
+        remaining = self.Revocation.search([('jti', 'in', ['vigente', 'caducado'])])
+        self.assertEqual(remaining.mapped('jti'), ['vigente'])
+
+
+@tagged('post_install', '-at_install')
+class TestLogoutRevocaToken(HttpCase):
+    """Un token revocado en el logout deja de servir, también en otros *workers*."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestLogoutRevocaToken, cls).setUpClass()
+        cls.env['second_market.user'].create({
+            'name': 'Usuario Token',
+            'login': 'token.test@example.com',
+            'password': 'password-test',
+        })
+
+    def _call(self, route, params=None, token=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else None
+        return self.make_jsonrpc_request(route, params or {}, headers=headers)
+
+    def _login(self):
+        result = self._call('/api/v1/auth/login', {'login': 'token.test@example.com', 'password': 'password-test'})
+        self.assertTrue(result['success'], result)
+        return result['data']['token']
+
+    def _reset_worker_revocations(self):
+        """Simular otro *worker*: olvidar las revocaciones conocidas en memoria."""
+        auth_controller._revoked_tokens.clear()
+        auth_controller._revocation_sync.update(synced_at=None, checked=0.0)
+
+    def test_logout_revokes_token(self):
+        token = self._login()
+        other = self._login()
+        self.assertTrue(self._call('/api/v1/users/profile', token=token)['success'])
+
+        self.assertTrue(self._call('/api/v1/auth/logout', token=token)['success'])
+
+        self.assertEqual(self._call('/api/v1/users/profile', token=token)['error_code'], 'UNAUTHORIZED')
+        self.assertTrue(self._call('/api/v1/users/profile', token=other)['success'])
+
+    def test_revocation_reaches_other_workers(self):
+        token = self._login()
+        self._call('/api/v1/auth/logout', token=token)
+        self._reset_worker_revocations()
+
+        self.assertEqual(self._call('/api/v1/users/profile', token=token)['error_code'], 'UNAUTHORIZED')
+
+    def test_issued_tokens_are_unique(self):
+        user = self.env['second_market.user'].search([('login', '=', 'token.test@example.com')])
+        first = auth_controller.issue_token(user.id, user.id_usuario, user.login, user.name)
+        second = auth_controller.issue_token(user.id, user.id_usuario, user.login, user.name)
+
+        self.assertNotEqual(first, second)
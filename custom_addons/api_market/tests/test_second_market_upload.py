@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+
+from odoo.tests import tagged
+
+from odoo.addons.second_market.tests.common import SecondMarketCase, make_jpeg
+
+
+@tagged('post_install', '-at_install')
+class TestSubidaImagen(SecondMarketCase):
+    """Tests de la deduplicación de subidas por SHA-1."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestSubidaImagen, cls).setUpClass()
+        cls.other = cls.env['second_market.user'].create({
+            'name': 'Otro Usuario',
+            'login': 'otro.test@example.com',
+            'password': 'password-test',
+        })
+        cls.Upload = cls.env['second_market.upload']
+
+    def _article_with_image(self, color, **vals):
+        content = make_jpeg(color=color)
+        self.create_article(image_content=content, **vals)
+        return hashlib.sha1(content).hexdigest()
+
+    def test_own_draft_image_is_reused(self):
+        checksum = self._article_with_image((10, 10, 10))
+
+        uploads = self.Upload._create_from_checksums(self.owner.id, [checksum])
+
+        self.assertIn(checksum, uploads)
+        self.assertEqual(uploads[checksum].user_id, self.owner)
+
+    def test_other_users_draft_image_is_hidden(self):
+        checksum = self._article_with_image((20, 20, 20))
+
+        uploads = self.Upload._create_from_checksums(self.other.id, [checksum])
+
+        self.assertEqual(uploads, {})
+
+    def test_published_image_is_reused_by_anyone(self):
+        checksum = self._article_with_image((30, 30, 30), estado_publicacion='publicado')
+
+        uploads = self.Upload._create_from_checksums(self.other.id, [checksum])
+
+        self.assertIn(checksum, uploads)
+
+    def test_inactive_published_image_is_hidden(self):
+        checksum = self._article_with_image((40, 40, 40), estado_publicacion='publicado', activo=False)
+
+        uploads = self.Upload._create_from_checksums(self.other.id, [checksum])
+
+        self.assertEqual(uploads, {})
+
+    def test_consume_repoints_upload_attachment(self):
+        original = make_jpeg(width=3000, height=100, color=(50, 60, 70))
+        upload = self.Upload._create_from_bytes(self.owner.id, 'foto.jpg', original)
+        attachment = upload.attachment_id
+        articulo = self.create_article()
+
+        uploads = self.Upload._ready_uploads([upload.token], self.owner.id)
+        imagen = uploads._consume(articulo.id)
+
+        self.assertFalse(upload.exists())
+        self.assertTrue(attachment.exists())
+        self.assertEqual(
+            (attachment.res_model, attachment.res_field, attachment.res_id),
+            ('second_market.image', 'image', imagen.id),
+        )
+        self.assertEqual(imagen.checksum, hashlib.sha1(original).hexdigest())
+        self.assertEqual(imagen.width, 2048)
+        self.assertTrue(imagen.image_128)
+
+    def test_consume_copies_attachment_of_existing_image(self):
+        checksum = self._article_with_image((60, 60, 60))
+        existing = self.env['second_market.image'].search([('checksum', '=', checksum)])
+        upload = self.Upload._create_from_checksums(self.owner.id, [checksum])[checksum]
+        articulo = self.create_article()
+
+        imagen = upload._consume(articulo.id)
+
+        self.assertTrue(existing.image)
+        self.assertEqual(imagen.image, existing.image)
+        self.assertEqual(imagen.checksum, checksum)
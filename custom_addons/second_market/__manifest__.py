@@ -25,6 +25,8 @@ Long description of module's purpose
     'data': [
         'security/ir.model.access.csv',
         'data/ir_sequence_data.xml',
+        'data/ir_cron_data.xml',
+        'data/ir_actions_server_data.xml',
         'views/menu_root.xml',
         'views/articulos_views.xml',
         'views/categorias_views.xml',
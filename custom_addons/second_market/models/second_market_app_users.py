@@ -10,12 +10,17 @@ ciclo de vida de sus artículos y valoraciones recibidas.
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+import base64
+import hashlib
 import re
 from passlib.context import CryptContext
 
 #: Contexto de hashing de contraseñas usando el estándar de Odoo (PBKDF2-SHA512).
 crypt_context = CryptContext(schemes=["pbkdf2_sha512", "plaintext"], deprecated="auto")
 
+#: Lados máximos (en píxeles) de las versiones reducidas del avatar.
+AVATAR_SIZES = (128, 512)
+
 
 class SecondMarketUser(models.Model):
     """Modelo que representa un usuario de la plataforma Second Market.
@@ -226,6 +231,31 @@ class SecondMarketUser(models.Model):
         help='Imagen del perfil del usuario'
     )
 
+    avatar_512 = fields.Image(
+        string='Foto de Perfil 512',
+        related='avatar',
+        max_width=512,
+        max_height=512,
+        store=True,
+        help='Versión del avatar con el lado mayor limitado a 512 px (perfil)'
+    )
+
+    avatar_128 = fields.Image(
+        string='Foto de Perfil 128',
+        related='avatar',
+        max_width=128,
+        max_height=128,
+        store=True,
+        help='Versión del avatar con el lado mayor limitado a 128 px (tarjetas de vendedor)'
+    )
+
+    avatar_version = fields.Char(
+        string='Versión del Avatar',
+        compute='_computar_avatar_version',
+        store=True,
+        help='Huella del avatar actual; cambia cada vez que se reemplaza la foto'
+    )
+
     telefono = fields.Char(
         string='Teléfono',
         size=15,
@@ -246,6 +276,34 @@ class SecondMarketUser(models.Model):
     # CAMPOS COMPUTADOS
     # ============================================
 
+    @api.depends('avatar')
+    def _computar_avatar_version(self):
+        """Calcular una huella corta (SHA-1 truncado) del avatar.
+
+        Permite a la API publicar URLs de avatar que cambian con la foto sin
+        leer el binario en cada consulta de perfil.
+        Almacena el resultado en :attr:`avatar_version`.
+        """
+        for usuario in self:
+            usuario.avatar_version = hashlib.sha1(base64.b64decode(usuario.avatar)).hexdigest()[:12] if usuario.avatar else False
+
+    def _avatar_field(self, size=None):
+        """Nombre del campo binario del avatar que corresponde a un tamaño pedido.
+
+        Se elige la menor versión cuyo lado mayor cubre ``size``; sin tamaño,
+        o si es mayor que todas las versiones, el original.
+
+        :param size: Lado mayor deseado en píxeles.
+        :type size: int or None
+        :return: ``'avatar_128'``, ``'avatar_512'`` o ``'avatar'``.
+        :rtype: str
+        """
+        if size:
+            for rendition in AVATAR_SIZES:
+                if size <= rendition:
+                    return f'avatar_{rendition}'
+        return 'avatar'
+
     @api.depends('ids_articulos_venta', 'ids_articulos_venta.estado_publicacion', 'ids_articulos_venta.activo')
     def _computar_productos_en_venta(self):
         """Contar los artículos activos en estado ``publicado`` o ``reservado``.
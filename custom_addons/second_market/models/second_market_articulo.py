@@ -7,8 +7,71 @@ Define el modelo :class:`ArticuloSegundaMano` que representa los productos
 publicados por los usuarios en la plataforma Second Market.
 """
 
+import difflib
+import re
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import SQL
+from odoo.tools.sql import create_index
+
+from ..tools import geohash
+
+#: Configuración de búsqueda de texto completo (``spanish`` + ``unaccent``).
+FTS_CONFIG = 'second_market_es'
+
+#: Campos del artículo que alimentan ``search_vector``.
+FTS_FIELDS = ('nombre', 'descripcion', 'ids_etiquetas')
+
+#: Umbral de similitud por trigramas (``pg_trgm``) para la búsqueda tolerante a erratas.
+FUZZY_THRESHOLD = 0.4
+
+#: Tabla auxiliar donde se acumulan las visitas pendientes de sumar a ``conteo_vistas``.
+VIEW_BUFFER_TABLE = 'second_market_article_view'
+
+#: Límites (en euros) de los tramos de precio de :meth:`ArticuloSegundaMano._facet_counts`.
+PRICE_BUCKETS = (0, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _to_tsquery_text(text):
+    """Convertir el texto libre de búsqueda en una expresión para ``to_tsquery``.
+
+    Solo se conservan las palabras (letras y dígitos), unidas con ``&``. La última palabra
+    se busca como prefijo (``:*``) para que las búsquedas mientras se escribe
+    encuentren resultados con palabras incompletas.
+
+    :param text: Texto introducido por el usuario.
+    :type text: str
+    :return: Expresión ``tsquery`` o ``None`` si no hay palabras.
+    :rtype: str or None
+    """
+    words = re.findall(r'[^\W_]+', text or '')
+    if not words:
+        return None
+    words[-1] += ':*'
+    return ' & '.join(words)
+
+
+def _closest_phrase(text, names):
+    """Proponer una corrección de ``text`` a partir de nombres de artículos parecidos.
+
+    Cada palabra del texto se sustituye por la palabra más parecida del
+    vocabulario formado por ``names`` (``difflib``).
+
+    :param text: Texto buscado por el usuario.
+    :type text: str
+    :param names: Nombres de los artículos encontrados por similitud.
+    :type names: list[str]
+    :return: Texto corregido, o ``None`` si no difiere del original.
+    :rtype: str or None
+    """
+    vocabulary = {word.lower() for name in names for word in re.findall(r'[^\W_]+', name or '')}
+    corrected = []
+    for word in re.findall(r'[^\W_]+', text or ''):
+        match = difflib.get_close_matches(word.lower(), vocabulary, n=1, cutoff=0.6)
+        corrected.append(match[0] if match else word.lower())
+    suggestion = ' '.join(corrected)
+    return suggestion if suggestion and suggestion != (text or '').strip().lower() else None
 
 
 class ArticuloSegundaMano(models.Model):
@@ -133,6 +196,13 @@ class ArticuloSegundaMano(models.Model):
         digits=(10, 6)
     )
 
+    geohash = fields.Char(
+        string='Geohash',
+        compute='_computar_geohash',
+        store=True,
+        help='Geohash de la ubicación; sus prefijos indexados resuelven las búsquedas por zona'
+    )
+
     # ============================================
     # IMÁGENES Y ETIQUETAS
     # ============================================
@@ -159,6 +229,21 @@ class ArticuloSegundaMano(models.Model):
         store=True
     )
 
+    main_image_id = fields.Many2one(
+        'second_market.image',
+        string='Imagen Principal (referencia)',
+        compute='_computar_main_image',
+        store=True,
+        ondelete='set null',
+        help='Imagen de menor secuencia; permite localizar la portada sin cargar binarios'
+    )
+
+    has_image = fields.Boolean(
+        string='Tiene Imagen',
+        compute='_computar_main_image',
+        store=True
+    )
+
     imagen_principal = fields.Binary(
         string='Imagen Principal',
         compute='_computar_imagen_principal',
@@ -194,6 +279,15 @@ class ArticuloSegundaMano(models.Model):
         help='Si está desmarcado, el artículo no aparecerá en búsquedas'
     )
 
+    fecha_eliminacion = fields.Datetime(
+        string='Fecha de eliminación',
+        readonly=True,
+        copy=False,
+        index=True,
+        help='Momento en que el artículo pasó a "Eliminado"; la limpieza de imágenes '
+             'cuenta desde aquí el plazo de retención'
+    )
+
     # ============================================
     # ESTADÍSTICAS
     # ============================================
@@ -246,6 +340,87 @@ class ArticuloSegundaMano(models.Model):
         help='El artículo tiene denuncias pendientes'
     )
 
+    def init(self):
+        """Crear los índices y estructuras auxiliares que no se pueden declarar en los campos.
+
+        - ``second_market_article_feed_idx`` cubre el orden ``(create_date, id)``
+          del feed público y permite paginar por cursor sin recorrer las filas
+          anteriores.
+        - La columna ``search_vector`` (``tsvector``) con índice GIN sobre nombre,
+          etiquetas y descripción, usando la configuración :data:`FTS_CONFIG`
+          (diccionario ``spanish`` con ``unaccent``). Se mantiene al día desde
+          :meth:`create`, :meth:`write` y las etiquetas.
+        - Índices GIN de trigramas (``pg_trgm``) sobre ``nombre`` y ``localidad``,
+          que resuelven los ``ilike`` y la búsqueda aproximada de
+          :meth:`_search_fuzzy` sin recorrer la tabla.
+        - Índice B-tree ``text_pattern_ops`` sobre ``geohash`` para las consultas
+          por prefijo (``LIKE 'prefijo%'``) de las búsquedas geográficas.
+        - La tabla :data:`VIEW_BUFFER_TABLE`, donde :meth:`_record_view` apunta
+          cada visita sin tocar la fila del artículo.
+        - ``fecha_eliminacion`` de los artículos ya eliminados antes de existir el
+          campo, tomada de su ``write_date``.
+        """
+        cr = self.env.cr
+        create_index(
+            cr,
+            'second_market_article_feed_idx',
+            self._table,
+            ['create_date DESC', 'id DESC'],
+            where="estado_publicacion = 'publicado' AND activo",
+        )
+
+        cr.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        cr.execute("SELECT 1 FROM pg_ts_config WHERE cfgname = %s", [FTS_CONFIG])
+        if not cr.fetchone():
+            cr.execute(SQL(
+                "CREATE TEXT SEARCH CONFIGURATION %s (COPY = pg_catalog.spanish)",
+                SQL.identifier(FTS_CONFIG),
+            ))
+            cr.execute(SQL(
+                "ALTER TEXT SEARCH CONFIGURATION %s ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem",
+                SQL.identifier(FTS_CONFIG),
+            ))
+
+        cr.execute(SQL(
+            "ALTER TABLE %s ADD COLUMN IF NOT EXISTS search_vector tsvector",
+            SQL.identifier(self._table),
+        ))
+        create_index(cr, 'second_market_article_search_vector_idx', self._table, ['search_vector'], method='gin')
+
+        cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        create_index(cr, 'second_market_article_nombre_trgm_idx', self._table, ['nombre gin_trgm_ops'], method='gin')
+        create_index(cr, 'second_market_article_localidad_trgm_idx', self._table, ['localidad gin_trgm_ops'], method='gin')
+
+        create_index(
+            cr,
+            'second_market_article_geohash_idx',
+            self._table,
+            ['geohash text_pattern_ops'],
+            where='geohash IS NOT NULL',
+        )
+        cr.execute(SQL(
+            """
+            CREATE TABLE IF NOT EXISTS %s (
+                article_id integer NOT NULL,
+                create_date timestamp without time zone NOT NULL DEFAULT (now() at time zone 'UTC')
+            )
+            """,
+            SQL.identifier(VIEW_BUFFER_TABLE),
+        ))
+
+        cr.execute(SQL(
+            """
+            UPDATE %s SET fecha_eliminacion = write_date
+             WHERE estado_publicacion = 'eliminado' AND fecha_eliminacion IS NULL
+            """,
+            SQL.identifier(self._table),
+        ))
+
+        cr.execute(SQL("SELECT id FROM %s WHERE search_vector IS NULL", SQL.identifier(self._table)))
+        pending_ids = [row[0] for row in cr.fetchall()]
+        if pending_ids:
+            self.browse(pending_ids)._refresh_search_vector()
+
     def action_publicar(self):
         """Pasar el artículo al estado *publicado*.
 
@@ -262,6 +437,486 @@ class ArticuloSegundaMano(models.Model):
                 raise UserError(_('Solo se pueden publicar artículos en estado borrador.'))
         return True
 
+    # ============================================
+    # MÉTODOS CREATE Y WRITE
+    # ============================================
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Crear artículos e indexar su texto para la búsqueda de texto completo.
+
+        :param vals_list: Lista de diccionarios con los valores de cada artículo.
+        :type vals_list: list[dict]
+        :return: Recordset con los artículos creados.
+        :rtype: second_market.article
+        """
+        for vals in vals_list:
+            if vals.get('estado_publicacion') == 'eliminado':
+                vals.setdefault('fecha_eliminacion', fields.Datetime.now())
+        articulos = super(ArticuloSegundaMano, self).create(vals_list)
+        articulos._refresh_search_vector()
+        return articulos
+
+    def write(self, vals):
+        """Actualizar artículos y reindexar su texto si cambian nombre, descripción o etiquetas.
+
+        Al pasar a ``eliminado`` se guarda ``fecha_eliminacion``, que no cambia con
+        escrituras posteriores; al salir de ese estado se borra.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        to_stamp = to_clear = self.browse()
+        if 'estado_publicacion' in vals and 'fecha_eliminacion' not in vals:
+            if vals['estado_publicacion'] == 'eliminado':
+                to_stamp = self.filtered(lambda articulo: not articulo.fecha_eliminacion)
+            else:
+                to_clear = self.filtered('fecha_eliminacion')
+        res = super(ArticuloSegundaMano, self).write(vals)
+        if to_stamp:
+            super(ArticuloSegundaMano, to_stamp).write({'fecha_eliminacion': fields.Datetime.now()})
+        if to_clear:
+            super(ArticuloSegundaMano, to_clear).write({'fecha_eliminacion': False})
+        if any(field in vals for field in FTS_FIELDS):
+            self._refresh_search_vector()
+        return res
+
+    # ============================================
+    # BÚSQUEDAS PARA LA API
+    # ============================================
+
+    def _refresh_search_vector(self):
+        """Recalcular ``search_vector`` de los artículos del recordset.
+
+        Pesos: ``A`` para el nombre, ``B`` para los nombres de las etiquetas y
+        ``C`` para la descripción. Se ejecuta en una única sentencia ``UPDATE``.
+        """
+        if not self.ids:
+            return
+        self.flush_recordset(list(FTS_FIELDS))
+        self.env['second_market.tag'].flush_model(['name'])
+        self.env.cr.execute(SQL("""
+            UPDATE second_market_article a
+               SET search_vector =
+                   setweight(to_tsvector(%(config)s, coalesce(a.nombre, '')), 'A') ||
+                   setweight(to_tsvector(%(config)s, coalesce((
+                       SELECT string_agg(t.name, ' ')
+                         FROM second_market_article_tag_rel r
+                         JOIN second_market_tag t ON t.id = r.tag_id
+                        WHERE r.article_id = a.id
+                   ), '')), 'B') ||
+                   setweight(to_tsvector(%(config)s, coalesce(a.descripcion, '')), 'C')
+             WHERE a.id = ANY(%(ids)s)
+        """, config=FTS_CONFIG, ids=list(self.ids)))
+
+    @api.model
+    def _distance_sql(self, query, latitude, longitude):
+        """Expresión SQL de la distancia (km, fórmula del haversine) a un punto.
+
+        :param query: Consulta sobre ``second_market_article``.
+        :type query: odoo.tools.query.Query
+        :param latitude: Latitud del punto de referencia.
+        :type latitude: float
+        :param longitude: Longitud del punto de referencia.
+        :type longitude: float
+        :return: Expresión SQL.
+        :rtype: odoo.tools.SQL
+        """
+        lat_sql = SQL.identifier(query.table, 'latitud')
+        lon_sql = SQL.identifier(query.table, 'longitud')
+        return SQL(
+            "2 * %s * asin(least(1, sqrt("
+            "power(sin(radians(%s - %s) / 2), 2) + "
+            "cos(radians(%s)) * cos(radians(%s)) * power(sin(radians(%s - %s) / 2), 2)"
+            ")))",
+            geohash.EARTH_RADIUS_KM, lat_sql, latitude, latitude, lat_sql, lon_sql, longitude,
+        )
+
+    @api.model
+    def _api_query(self, domain, text=None, geo=None):
+        """Construir la consulta base de los listados de la API.
+
+        Parte del dominio de Odoo (incluidas las reglas de acceso) y añade:
+
+        - Con ``text``, la condición de texto completo sobre ``search_vector``,
+          resuelta con el índice GIN.
+        - Con ``geo``, el filtro geográfico: los prefijos de geohash que cubren
+          el rectángulo (índice ``second_market_article_geohash_idx``), el
+          rectángulo exacto y, si hay radio, la distancia al centro.
+
+        ``geo`` es un diccionario con las claves:
+
+        - ``bbox``: ``(min_lat, min_lon, max_lat, max_lon)``.
+        - ``center``: ``(lat, lon)`` o ``None``.
+        - ``radius_km``: radio en km alrededor de ``center`` o ``None``.
+
+        :param domain: Dominio de filtrado.
+        :type domain: list
+        :param text: Texto libre de búsqueda.
+        :type text: str or None
+        :param geo: Filtro geográfico.
+        :type geo: dict or None
+        :return: Consulta sin orden ni límite.
+        :rtype: odoo.tools.query.Query
+        """
+        query = self._search(domain)
+        tsquery = _to_tsquery_text(text)
+        if text and tsquery is None:
+            # Texto sin palabras indexables: no puede coincidir con nada
+            query.add_where(SQL("FALSE"))
+        elif tsquery:
+            query.add_where(SQL(
+                "%s @@ to_tsquery(%s, %s)",
+                SQL.identifier(query.table, 'search_vector'), FTS_CONFIG, tsquery,
+            ))
+
+        if geo:
+            min_lat, min_lon, max_lat, max_lon = geo['bbox']
+            geohash_sql = SQL.identifier(query.table, 'geohash')
+            query.add_where(SQL("(%s)", SQL(" OR ").join(
+                SQL("%s LIKE %s", geohash_sql, prefix + '%')
+                for prefix in geohash.cover_bbox(min_lat, min_lon, max_lat, max_lon)
+            )))
+            query.add_where(SQL(
+                "%s BETWEEN %s AND %s AND %s BETWEEN %s AND %s",
+                SQL.identifier(query.table, 'latitud'), min_lat, max_lat,
+                SQL.identifier(query.table, 'longitud'), min_lon, max_lon,
+            ))
+            if geo.get('center') and geo.get('radius_km'):
+                query.add_where(SQL(
+                    "%s <= %s", self._distance_sql(query, *geo['center']), geo['radius_km'],
+                ))
+        return query
+
+    @api.model
+    def _search_api(self, domain, text=None, sort='recent', limit=20, offset=0, geo=None):
+        """Buscar artículos para la API con paginación por ``offset``.
+
+        :param domain: Dominio de filtrado.
+        :type domain: list
+        :param text: Texto libre de búsqueda (texto completo).
+        :type text: str or None
+        :param sort: ``'recent'`` (``create_date`` descendente), ``'relevance'``
+            (``ts_rank`` descendente; solo tiene efecto si hay ``text``) o
+            ``'distance'`` (distancia ascendente a ``geo['center']``).
+        :type sort: str
+        :param limit: Número máximo de artículos.
+        :type limit: int
+        :param offset: Número de artículos a saltar.
+        :type offset: int
+        :param geo: Filtro geográfico (ver :meth:`_api_query`).
+        :type geo: dict or None
+        :return: Recordset de artículos en el orden pedido.
+        :rtype: second_market.article
+        """
+        query = self._api_query(domain, text, geo)
+        id_sql = SQL.identifier(query.table, 'id')
+        tsquery = _to_tsquery_text(text)
+        if sort == 'distance' and geo and geo.get('center'):
+            query.order = SQL("%s ASC, %s DESC", self._distance_sql(query, *geo['center']), id_sql)
+        elif sort == 'relevance' and tsquery:
+            query.order = SQL(
+                "ts_rank(%s, to_tsquery(%s, %s)) DESC, %s DESC",
+                SQL.identifier(query.table, 'search_vector'), FTS_CONFIG, tsquery, id_sql,
+            )
+        else:
+            query.order = SQL("%s DESC, %s DESC", SQL.identifier(query.table, 'create_date'), id_sql)
+        query.limit = limit
+        query.offset = offset
+        self.env.cr.execute(query.select(id_sql))
+        return self.browse([row[0] for row in self.env.cr.fetchall()])
+
+    @api.model
+    def _count_api(self, domain, text=None, geo=None):
+        """Contar los artículos que devolvería :meth:`_search_api`.
+
+        :param domain: Dominio de filtrado.
+        :type domain: list
+        :param text: Texto libre de búsqueda (texto completo).
+        :type text: str or None
+        :param geo: Filtro geográfico (ver :meth:`_api_query`).
+        :type geo: dict or None
+        :return: Número de artículos.
+        :rtype: int
+        """
+        query = self._api_query(domain, text, geo)
+        self.env.cr.execute(query.select(SQL("COUNT(*)")))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _search_fuzzy(self, domain, text=None, localidad=None, limit=20, geo=None):
+        """Buscar artículos por similitud de trigramas para tolerar erratas.
+
+        Se usa como alternativa cuando la búsqueda exacta devuelve pocos
+        resultados (p. ej. *bicileta* en lugar de *bicicleta*). Ambas condiciones
+        usan operadores de ``pg_trgm`` resueltos con los índices GIN de
+        :meth:`init`:
+
+        - ``text <% nombre`` (similitud de palabra con el nombre).
+        - ``localidad % valor`` (similitud con la localidad).
+
+        :param domain: Dominio de filtrado (sin el filtro de ``localidad``).
+        :type domain: list
+        :param text: Texto libre buscado.
+        :type text: str or None
+        :param localidad: Localidad buscada.
+        :type localidad: str or None
+        :param limit: Número máximo de artículos.
+        :type limit: int
+        :param geo: Filtro geográfico (ver :meth:`_api_query`).
+        :type geo: dict or None
+        :return: Tupla ``(articulos, sugerencia)``; ``sugerencia`` es un
+            diccionario con las claves ``search`` y/o ``localidad`` corregidas,
+            o ``None`` si no hay nada que sugerir.
+        :rtype: tuple
+        """
+        if not text and not localidad:
+            return self.browse(), None
+
+        self.env.cr.execute(
+            "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true),"
+            "       set_config('pg_trgm.similarity_threshold', %s, true)",
+            [str(FUZZY_THRESHOLD), str(FUZZY_THRESHOLD)],
+        )
+        query = self._api_query(domain, geo=geo)
+        nombre_sql = SQL.identifier(query.table, 'nombre')
+        localidad_sql = SQL.identifier(query.table, 'localidad')
+        scores = []
+        if text:
+            query.add_where(SQL("%s <%% %s", text, nombre_sql))
+            scores.append(SQL("word_similarity(%s, %s)", text, nombre_sql))
+        if localidad:
+            query.add_where(SQL("%s %% %s", localidad_sql, localidad))
+            scores.append(SQL("similarity(%s, %s)", localidad_sql, localidad))
+        query.order = SQL("%s DESC, %s DESC", SQL(" + ").join(scores), SQL.identifier(query.table, 'id'))
+        query.limit = limit
+        self.env.cr.execute(query.select(SQL.identifier(query.table, 'id'), nombre_sql, localidad_sql))
+        rows = self.env.cr.fetchall()
+
+        suggestion = {}
+        if rows and text:
+            corrected = _closest_phrase(text, [row[1] for row in rows])
+            if corrected:
+                suggestion['search'] = corrected
+        if rows and localidad and rows[0][2] and rows[0][2].lower() != localidad.strip().lower():
+            suggestion['localidad'] = rows[0][2]
+        return self.browse([row[0] for row in rows]), suggestion or None
+
+    @api.model
+    def _search_keyset(self, domain, limit=20, after=None, text=None, geo=None):
+        """Buscar artículos paginando por cursor sobre ``(create_date, id)``.
+
+        A diferencia de ``search(offset=...)``, el coste de cada página no crece
+        con la profundidad del scroll: la condición ``(create_date, id) < after``
+        se resuelve con el índice ``second_market_article_feed_idx``.
+
+        La clave se compara en SQL con el valor exacto de la columna (con
+        microsegundos), por eso se devuelve tal cual sale de la base de datos.
+
+        :param domain: Dominio de filtrado.
+        :type domain: list
+        :param limit: Número máximo de artículos de la página.
+        :type limit: int
+        :param after: Clave ``(create_date, id)`` del último artículo de la página
+            anterior, o ``None`` para la primera página.
+        :type after: tuple or None
+        :param text: Texto libre de búsqueda (texto completo).
+        :type text: str or None
+        :param geo: Filtro geográfico (ver :meth:`_api_query`).
+        :type geo: dict or None
+        :return: Tupla ``(articulos, siguiente_clave)``; ``siguiente_clave`` es
+            ``None`` cuando no quedan más artículos.
+        :rtype: tuple
+        """
+        query = self._api_query(domain, text, geo)
+        create_date_sql = SQL.identifier(query.table, 'create_date')
+        id_sql = SQL.identifier(query.table, 'id')
+        if after:
+            query.add_where(SQL("(%s, %s) < (%s, %s)", create_date_sql, id_sql, after[0], after[1]))
+        query.order = SQL("%s DESC, %s DESC", create_date_sql, id_sql)
+        query.limit = limit + 1
+        self.env.cr.execute(query.select(id_sql, create_date_sql))
+        rows = self.env.cr.fetchall()
+
+        next_key = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_key = (rows[-1][1], rows[-1][0])
+        return self.browse([row[0] for row in rows]), next_key
+
+    @api.model
+    def _map_clusters(self, domain, bbox, precision):
+        """Agrupar los artículos de un rectángulo en celdas de geohash.
+
+        Una única consulta ``GROUP BY`` sobre el prefijo de ``geohash`` de la
+        precisión indicada, filtrada con :meth:`_api_query` (por lo que usa el
+        índice ``second_market_article_geohash_idx``). El número de grupos está
+        acotado por el número de celdas de esa precisión que cubren ``bbox``.
+
+        :param domain: Dominio de filtrado.
+        :type domain: list
+        :param bbox: Rectángulo ``(min_lat, min_lon, max_lat, max_lon)``.
+        :type bbox: tuple
+        :param precision: Longitud del prefijo de geohash de cada celda.
+        :type precision: int
+        :return: Lista de diccionarios con ``geohash``, ``count``, ``lat``,
+            ``lon``, ``precio_min``, ``precio_max`` y ``article_id`` (solo si la
+            celda contiene un único artículo), ordenada por ``count`` descendente.
+        :rtype: list[dict]
+        """
+        query = self._api_query(domain, geo={'bbox': bbox, 'center': None, 'radius_km': None})
+        table = query.table
+        self.env.cr.execute(SQL(
+            """
+            SELECT left(%(geohash)s, %(precision)s) AS cell,
+                   count(*) AS cell_count,
+                   avg(%(lat)s) AS lat,
+                   avg(%(lon)s) AS lon,
+                   min(%(precio)s) AS precio_min,
+                   max(%(precio)s) AS precio_max,
+                   min(%(id)s) AS article_id
+              FROM %(from_clause)s
+             WHERE %(where_clause)s
+          GROUP BY cell
+          ORDER BY cell_count DESC, cell
+            """,
+            geohash=SQL.identifier(table, 'geohash'),
+            precision=precision,
+            lat=SQL.identifier(table, 'latitud'),
+            lon=SQL.identifier(table, 'longitud'),
+            precio=SQL.identifier(table, 'precio'),
+            id=SQL.identifier(table, 'id'),
+            from_clause=query.from_clause,
+            where_clause=query.where_clause,
+        ))
+        return [{
+            'geohash': cell,
+            'count': count,
+            'lat': lat,
+            'lon': lon,
+            'precio_min': precio_min,
+            'precio_max': precio_max,
+            'article_id': article_id if count == 1 else None,
+        } for cell, count, lat, lon, precio_min, precio_max, article_id in self.env.cr.fetchall()]
+
+    @api.model
+    def _facet_counts(self, domain, text=None, geo=None):
+        """Contar artículos por categoría, estado y tramo de precio en una consulta.
+
+        Aplica los mismos filtros que :meth:`_search_api` y agrupa con
+        ``GROUPING SETS``, de modo que todas las facetas y el total salen de una
+        sola pasada sobre las filas filtradas. Los tramos de precio son los
+        definidos en :data:`PRICE_BUCKETS`; el último no tiene límite superior.
+
+        :param domain: Dominio de filtrado.
+        :type domain: list
+        :param text: Texto libre de búsqueda (texto completo).
+        :type text: str or None
+        :param geo: Filtro geográfico (ver :meth:`_api_query`).
+        :type geo: dict or None
+        :return: Diccionario con ``total``, ``categorias`` (``{id: count}``),
+            ``estados_producto`` (``{valor: count}``) y ``precios``
+            (lista de ``{'min', 'max', 'count'}`` sin tramos vacíos).
+        :rtype: dict
+        """
+        query = self._api_query(domain, text, geo)
+        table = query.table
+        self.env.cr.execute(SQL(
+            """
+            SELECT GROUPING(f.id_categoria), GROUPING(f.estado_producto), GROUPING(f.bucket),
+                   f.id_categoria, f.estado_producto, f.bucket, count(*)
+              FROM (
+                    SELECT %(categoria)s AS id_categoria,
+                           %(estado)s AS estado_producto,
+                           width_bucket(%(precio)s, %(bounds)s::double precision[]) AS bucket
+                      FROM %(from_clause)s
+                     WHERE %(where_clause)s
+                   ) f
+          GROUP BY GROUPING SETS ((f.id_categoria), (f.estado_producto), (f.bucket), ())
+            """,
+            categoria=SQL.identifier(table, 'id_categoria'),
+            estado=SQL.identifier(table, 'estado_producto'),
+            precio=SQL.identifier(table, 'precio'),
+            bounds=list(PRICE_BUCKETS),
+            from_clause=query.from_clause,
+            where_clause=query.where_clause,
+        ))
+
+        result = {'total': 0, 'categorias': {}, 'estados_producto': {}, 'precios': []}
+        buckets = {}
+        for g_cat, g_estado, g_bucket, categoria, estado, bucket, count in self.env.cr.fetchall():
+            if g_cat and g_estado and g_bucket:
+                result['total'] = count
+            elif not g_cat:
+                if categoria:
+                    result['categorias'][categoria] = count
+            elif not g_estado:
+                result['estados_producto'][estado] = count
+            elif bucket:
+                buckets[bucket] = count
+
+        for bucket, count in sorted(buckets.items()):
+            result['precios'].append({
+                'min': PRICE_BUCKETS[bucket - 1],
+                'max': PRICE_BUCKETS[bucket] if bucket < len(PRICE_BUCKETS) else None,
+                'count': count,
+            })
+        return result
+
+    # ============================================
+    # CONTADOR DE VISTAS
+    # ============================================
+
+    @api.model
+    def _record_view(self, article_id):
+        """Apuntar una visita al artículo en la tabla :data:`VIEW_BUFFER_TABLE`.
+
+        Es un ``INSERT`` sin bloqueos sobre la fila del artículo: las visitas
+        concurrentes de un artículo popular no compiten entre sí ni disparan el
+        seguimiento de ``mail.thread``. :meth:`_flush_view_buffer` las suma a
+        ``conteo_vistas`` periódicamente.
+
+        :param article_id: ID del artículo visitado.
+        :type article_id: int
+        """
+        self.env.cr.execute(SQL(
+            "INSERT INTO %s (article_id) VALUES (%s)",
+            SQL.identifier(VIEW_BUFFER_TABLE), article_id,
+        ))
+
+    @api.model
+    def _flush_view_buffer(self):
+        """Sumar las visitas acumuladas a ``conteo_vistas`` (tarea programada).
+
+        Vacía la tabla :data:`VIEW_BUFFER_TABLE` y aplica las visitas de todos
+        los artículos en una única sentencia ``UPDATE ... FROM`` agregada, sin
+        pasar por :meth:`write` (no modifica ``write_date`` ni genera mensajes
+        de seguimiento). Las visitas de artículos ya borrados se descartan.
+
+        :return: Número de artículos actualizados.
+        :rtype: int
+        """
+        self.env.cr.execute(SQL(
+            """
+            WITH hits AS (
+                DELETE FROM %(buffer)s RETURNING article_id
+            ), totals AS (
+                SELECT article_id, count(*) AS views FROM hits GROUP BY article_id
+            )
+            UPDATE %(table)s AS a
+               SET conteo_vistas = coalesce(a.conteo_vistas, 0) + totals.views
+              FROM totals
+             WHERE a.id = totals.article_id
+            """,
+            buffer=SQL.identifier(VIEW_BUFFER_TABLE),
+            table=SQL.identifier(self._table),
+        ))
+        updated = self.env.cr.rowcount
+        self.invalidate_model(['conteo_vistas'])
+        return updated
+
     # ============================================
     # CAMPOS COMPUTADOS
     # ============================================
@@ -276,19 +931,43 @@ class ArticuloSegundaMano(models.Model):
         for articulo in self:
             articulo.conteo_imagenes = len(articulo.ids_imagenes)
 
-    @api.depends('ids_imagenes.image')
+    @api.depends('ids_imagenes', 'ids_imagenes.sequence')
+    def _computar_main_image(self):
+        """Guardar la referencia a la imagen principal y el indicador ``has_image``.
+
+        La imagen principal es la de menor ``sequence`` (y menor ``id`` en caso de
+        empate). Se recalcula al crear, eliminar o reordenar imágenes, de modo que
+        los listados pueden consultar :attr:`main_image_id` y :attr:`has_image` sin
+        leer ningún binario.
+        """
+        for articulo in self:
+            principal = articulo.ids_imagenes.sorted(lambda img: (img.sequence, img.id))[:1]
+            articulo.main_image_id = principal
+            articulo.has_image = bool(principal)
+
+    @api.depends('main_image_id.image')
     def _computar_imagen_principal(self):
-        """Obtener la imagen principal del artículo.
+        """Obtener el binario de la imagen principal del artículo.
+
+        Lee únicamente la imagen referenciada por :attr:`main_image_id`.
+        Almacena el resultado en :attr:`imagen_principal`.
+        """
+        for articulo in self:
+            articulo.imagen_principal = articulo.main_image_id.image or False
+
+    @api.depends('latitud', 'longitud')
+    def _computar_geohash(self):
+        """Calcular el geohash de la ubicación del artículo.
 
-        Selecciona la primera imagen de la lista ``ids_imagenes`` (menor
-        secuencia o primera creada). Almacena el resultado en
-        :attr:`imagen_principal`.
+        Los artículos sin coordenadas (latitud y longitud a ``0``) no tienen
+        geohash y no aparecen en las búsquedas geográficas.
+        Almacena el resultado en :attr:`geohash`.
         """
         for articulo in self:
-            if articulo.ids_imagenes:
-                articulo.imagen_principal = articulo.ids_imagenes[0].image
+            if articulo.latitud or articulo.longitud:
+                articulo.geohash = geohash.encode(articulo.latitud, articulo.longitud)
             else:
-                articulo.imagen_principal = False
+                articulo.geohash = False
 
     @api.depends('ids_etiquetas')
     def _computar_conteo_etiquetas(self):
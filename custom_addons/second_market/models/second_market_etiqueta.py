@@ -37,3 +37,37 @@ class EtiquetaSegundaMano(models.Model):
     _sql_constraints = [
         ('name_uniq', 'unique (name)', 'El nombre de la etiqueta debe ser único.'),
     ]
+
+    def write(self, vals):
+        """Actualizar etiquetas y reindexar los artículos que las usan si cambia el nombre.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        res = super(EtiquetaSegundaMano, self).write(vals)
+        if 'name' in vals:
+            self._articulos_etiquetados()._refresh_search_vector()
+        return res
+
+    def unlink(self):
+        """Eliminar etiquetas y reindexar los artículos que las tenían asignadas.
+
+        :return: ``True`` si la operación se realizó correctamente.
+        :rtype: bool
+        """
+        articulos = self._articulos_etiquetados()
+        res = super(EtiquetaSegundaMano, self).unlink()
+        articulos._refresh_search_vector()
+        return res
+
+    def _articulos_etiquetados(self):
+        """Obtener los artículos que tienen asignada alguna de las etiquetas.
+
+        :return: Recordset de ``second_market.article``.
+        :rtype: second_market.article
+        """
+        return self.env['second_market.article'].sudo().search([
+            ('ids_etiquetas', 'in', self.ids)
+        ])
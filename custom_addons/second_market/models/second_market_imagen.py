@@ -7,14 +7,129 @@ Define el modelo :class:`ImagenArticulo` que almacena las imágenes
 asociadas a cada artículo de la plataforma Second Market.
 """
 
+import base64
+import datetime
+import hashlib
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
 from odoo import models, fields, api, _
+from odoo.tools import SQL, split_every
+from odoo.tools.image import base64_to_image
+
+_logger = logging.getLogger(__name__)
+
+#: Tamaños (lado mayor en píxeles) de las versiones reducidas de cada imagen.
+RENDITION_SIZES = (128, 400, 1024)
+
+#: Parámetros de sistema (``ir.config_parameter``) de la normalización y sus valores por defecto.
+NORMALIZATION_PARAMS = {
+    'second_market.image_max_edge': '2048',
+    'second_market.image_quality': '85',
+    'second_market.image_webp': 'False',
+    'second_market.image_strip_exif': 'True',
+    'second_market.image_workers': '4',
+}
+
+#: Parámetros de sistema (``ir.config_parameter``) de la limpieza de binarios y sus valores por defecto.
+GC_PARAMS = {
+    'second_market.gc_retention_days': '90',
+    'second_market.gc_batch_size': '200',
+    'second_market.gc_dry_run': 'False',
+}
+
+#: Modelos cuyos adjuntos de campos binarios se eliminan si el registro ya no existe.
+GC_ATTACHMENT_MODELS = (
+    'second_market.image',
+    'second_market.user',
+    'second_market.category',
+)
+
+#: Formatos que se normalizan; el resto (GIF, SVG...) se guarda tal cual.
+NORMALIZABLE_FORMATS = ('JPEG', 'MPO', 'PNG', 'WEBP')
+
+
+def normalize_image(content, max_edge=2048, quality=85, webp=False, strip_exif=True):
+    """Normalizar el contenido de una imagen subida.
+
+    - Aplica la orientación EXIF a los píxeles y, si ``strip_exif``, descarta
+      los metadatos (ubicación GPS, modelo del móvil...).
+    - Reduce la imagen para que su lado mayor no supere ``max_edge``.
+    - Recomprime en JPEG (o WebP si ``webp``) con la calidad indicada; los PNG
+      se mantienen en PNG salvo que se pida WebP.
+
+    Si la imagen ya cumple todo (tamaño, formato y sin EXIF) se devuelve sin
+    cambios, de modo que normalizar dos veces no degrada la calidad. No usa el
+    ORM, por lo que se puede ejecutar en hilos.
+
+    :param content: Contenido binario original.
+    :type content: bytes
+    :param max_edge: Lado mayor máximo en píxeles.
+    :type max_edge: int
+    :param quality: Calidad de compresión (1-95).
+    :type quality: int
+    :param webp: Convertir a WebP.
+    :type webp: bool
+    :param strip_exif: Eliminar los metadatos EXIF.
+    :type strip_exif: bool
+    :return: Contenido normalizado (o el original si no se puede procesar).
+    :rtype: bytes
+    """
+    try:
+        image = Image.open(io.BytesIO(content))
+        source_format = image.format
+        if source_format not in NORMALIZABLE_FORMATS:
+            return content
+
+        target_format = 'WEBP' if webp else ('JPEG' if source_format in ('JPEG', 'MPO') else source_format)
+        has_exif = bool(image.info.get('exif'))
+        if max(image.size) <= max_edge and target_format == source_format and not (strip_exif and has_exif):
+            return content
+
+        image = ImageOps.exif_transpose(image)
+        if max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if target_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        save_kwargs = {}
+        if target_format == 'JPEG':
+            save_kwargs = {'quality': quality, 'optimize': True, 'progressive': True}
+        elif target_format == 'WEBP':
+            save_kwargs = {'quality': quality, 'method': 4}
+        elif target_format == 'PNG':
+            save_kwargs = {'optimize': True}
+        if not strip_exif and has_exif:
+            save_kwargs['exif'] = image.getexif()
+
+        output = io.BytesIO()
+        image.save(output, format=target_format, **save_kwargs)
+        return output.getvalue()
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        _logger.warning(f"No se pudo normalizar la imagen, se guarda sin cambios: {e}")
+        return content
 
 
 class ImagenArticulo(models.Model):
     """Modelo que representa una imagen vinculada a un artículo de segunda mano.
 
+    Al crear o reemplazar una imagen se normaliza con :func:`normalize_image`
+    (configurable con los parámetros de sistema de :data:`NORMALIZATION_PARAMS`),
+    procesando en paralelo todas las imágenes de la misma llamada.
+
+    El contenido se guarda en el filestore de Odoo, que ya está direccionado por
+    contenido: dos imágenes idénticas comparten el mismo fichero en disco. El
+    campo :attr:`checksum` (SHA-1 del fichero subido, no del normalizado)
+    permite además reconocer una imagen ya subida antes de transferirla de nuevo.
+
     Cada artículo puede tener entre 1 y 10 imágenes. El orden de visualización
-    se controla mediante el campo ``sequence``.
+    se controla mediante el campo ``sequence``. Al guardar la imagen, Odoo genera
+    con Pillow las versiones reducidas de :data:`RENDITION_SIZES`, que la API sirve
+    en lugar del original cuando el cliente no lo necesita.
 
     :cvar _name: Nombre técnico del modelo en Odoo.
     :cvar _description: Descripción legible del modelo.
@@ -36,6 +151,55 @@ class ImagenArticulo(models.Model):
         help='Archivo de imagen'
     )
 
+    image_1024 = fields.Image(
+        string='Imagen 1024',
+        related='image',
+        max_width=1024,
+        max_height=1024,
+        store=True,
+        help='Versión de la imagen con el lado mayor limitado a 1024 px (detalle)'
+    )
+
+    image_400 = fields.Image(
+        string='Imagen 400',
+        related='image',
+        max_width=400,
+        max_height=400,
+        store=True,
+        help='Versión de la imagen con el lado mayor limitado a 400 px (tarjetas)'
+    )
+
+    image_128 = fields.Image(
+        string='Imagen 128',
+        related='image',
+        max_width=128,
+        max_height=128,
+        store=True,
+        help='Versión de la imagen con el lado mayor limitado a 128 px (miniaturas)'
+    )
+
+    width = fields.Integer(
+        string='Ancho',
+        compute='_computar_dimensiones',
+        store=True,
+        help='Ancho en píxeles de la imagen original'
+    )
+
+    height = fields.Integer(
+        string='Alto',
+        compute='_computar_dimensiones',
+        store=True,
+        help='Alto en píxeles de la imagen original'
+    )
+
+    checksum = fields.Char(
+        string='SHA-1',
+        readonly=True,
+        index=True,
+        copy=False,
+        help='SHA-1 (hex) del fichero tal como se subió, antes de normalizarlo'
+    )
+
     sequence = fields.Integer(
         string='Secuencia',
         default=10,
@@ -49,3 +213,346 @@ class ImagenArticulo(models.Model):
         required=True,
         help='Artículo al que pertenece esta imagen'
     )
+
+    @api.depends('image')
+    def _computar_dimensiones(self):
+        """Guardar el ancho y alto de la imagen original.
+
+        Pillow solo lee la cabecera del fichero para conocer el tamaño, por lo que
+        el coste es mínimo. Si el contenido no es una imagen válida se guardan ``0``.
+        Almacena el resultado en :attr:`width` y :attr:`height`.
+        """
+        for imagen in self:
+            try:
+                imagen.width, imagen.height = base64_to_image(imagen.image).size if imagen.image else (0, 0)
+            except Exception:
+                imagen.width, imagen.height = 0, 0
+
+    def _rendition_field(self, size=None):
+        """Nombre del campo binario que corresponde a un tamaño pedido.
+
+        Se elige la menor versión cuyo lado mayor cubre ``size``; sin tamaño,
+        o si es mayor que todas las versiones, el original.
+
+        :param size: Lado mayor deseado en píxeles.
+        :type size: int or None
+        :return: ``'image_128'``, ``'image_400'``, ``'image_1024'`` o ``'image'``.
+        :rtype: str
+        """
+        if size:
+            for rendition in RENDITION_SIZES:
+                if size <= rendition:
+                    return f'image_{rendition}'
+        return 'image'
+
+    # ============================================
+    # NORMALIZACIÓN
+    # ============================================
+
+    @api.model
+    def _normalization_settings(self):
+        """Leer la configuración de la normalización desde ``ir.config_parameter``.
+
+        :return: Diccionario con ``max_edge``, ``quality``, ``webp``,
+            ``strip_exif`` y ``workers``.
+        :rtype: dict
+        """
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        values = {key: get_param(key, default) for key, default in NORMALIZATION_PARAMS.items()}
+        return {
+            'max_edge': int(values['second_market.image_max_edge']),
+            'quality': int(values['second_market.image_quality']),
+            'webp': values['second_market.image_webp'].lower() in ('1', 'true'),
+            'strip_exif': values['second_market.image_strip_exif'].lower() in ('1', 'true'),
+            'workers': max(1, int(values['second_market.image_workers'])),
+        }
+
+    @api.model
+    def _normalize_contents(self, contents):
+        """Normalizar varios contenidos en paralelo con un *pool* de hilos.
+
+        Pillow libera el GIL al decodificar, redimensionar y comprimir, así que
+        las imágenes de un mismo artículo se procesan a la vez.
+
+        :param contents: Contenidos binarios originales.
+        :type contents: list[bytes]
+        :return: Contenidos normalizados, en el mismo orden.
+        :rtype: list[bytes]
+        """
+        settings = self._normalization_settings()
+        workers = min(settings.pop('workers'), len(contents), os.cpu_count() or 1)
+        if workers <= 1:
+            return [normalize_image(content, **settings) for content in contents]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(lambda content: normalize_image(content, **settings), contents))
+
+    @api.model
+    def _normalize_vals_list(self, vals_list):
+        """Normalizar en sitio el campo ``image`` de una lista de valores.
+
+        :param vals_list: Valores de :meth:`create` o :meth:`write`.
+        :type vals_list: list[dict]
+        """
+        targets = [vals for vals in vals_list if vals.get('image')]
+        if not targets:
+            return
+        originals = [base64.b64decode(vals['image']) for vals in targets]
+        for vals, original, content in zip(targets, originals, self._normalize_contents(originals)):
+            if content is not original:
+                vals['image'] = base64.b64encode(content)
+
+    @api.model
+    def _checksum_vals_list(self, vals_list):
+        """Fijar en sitio el ``checksum`` de una lista de valores con ``image``.
+
+        Se calcula sobre el contenido recibido, antes de normalizarlo: es el
+        SHA-1 que calcula el cliente antes de subir una foto para preguntar si
+        ya existe. Los valores que ya traen ``checksum`` (p. ej. el de una
+        subida verificada) se respetan.
+
+        :param vals_list: Valores de :meth:`create` o :meth:`write`.
+        :type vals_list: list[dict]
+        """
+        for vals in vals_list:
+            if 'image' not in vals or vals.get('checksum'):
+                continue
+            vals['checksum'] = hashlib.sha1(base64.b64decode(vals['image'])).hexdigest() if vals['image'] else False
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Crear imágenes guardando el SHA-1 del original y normalizando su contenido.
+
+        La normalización se omite con el contexto ``skip_image_normalization``.
+
+        :param vals_list: Lista de diccionarios con los valores de cada imagen.
+        :type vals_list: list[dict]
+        :return: Recordset con las imágenes creadas.
+        :rtype: second_market.image
+        """
+        self._checksum_vals_list(vals_list)
+        if not self.env.context.get('skip_image_normalization'):
+            self._normalize_vals_list(vals_list)
+        return super(ImagenArticulo, self).create(vals_list)
+
+    def write(self, vals):
+        """Actualizar imágenes normalizando el contenido si se reemplaza.
+
+        :param vals: Diccionario con los campos a actualizar.
+        :type vals: dict
+        :return: Resultado de la operación de escritura.
+        :rtype: bool
+        """
+        if 'image' in vals:
+            vals = dict(vals)
+            self._checksum_vals_list([vals])
+            if vals.get('image') and not self.env.context.get('skip_image_normalization'):
+                self._normalize_vals_list([vals])
+        return super(ImagenArticulo, self).write(vals)
+
+    def action_normalize_images(self, batch_size=50):
+        """Normalizar en sitio las imágenes del recordset (proceso por lotes).
+
+        Procesa las imágenes en lotes de ``batch_size``, cada lote en paralelo,
+        y solo reescribe las que cambian. Conserva el ``checksum`` original.
+        Desde la línea de comandos::
+
+            odoo shell -d <bd> <<< "env['second_market.image']._normalize_existing_images(); env.cr.commit()"
+
+        :param batch_size: Número de imágenes por lote.
+        :type batch_size: int
+        :return: Número de imágenes modificadas.
+        :rtype: int
+        """
+        updated = 0
+        for batch_ids in split_every(batch_size, self.ids):
+            images = self.browse(batch_ids).filtered('image')
+            originals = [base64.b64decode(image.image) for image in images]
+            normalized = self._normalize_contents(originals)
+            for image, original, content in zip(images, originals, normalized):
+                if content is original:
+                    continue
+                image.with_context(skip_image_normalization=True).write({
+                    'image': base64.b64encode(content),
+                    'checksum': image.checksum or hashlib.sha1(original).hexdigest(),
+                })
+                updated += 1
+            self.env.flush_all()
+            images.invalidate_recordset()
+            _logger.info(f"Normalización de imágenes: {updated} modificadas hasta el lote {batch_ids[-1]}")
+        return updated
+
+    @api.model
+    def _normalize_existing_images(self, batch_size=50):
+        """Normalizar todas las imágenes existentes.
+
+        :param batch_size: Número de imágenes por lote.
+        :type batch_size: int
+        :return: Número de imágenes modificadas.
+        :rtype: int
+        """
+        return self.search([]).action_normalize_images(batch_size=batch_size)
+
+    # ============================================
+    # LIMPIEZA DE BINARIOS
+    # ============================================
+
+    @api.model
+    def _gc_settings(self):
+        """Leer la configuración de la limpieza desde ``ir.config_parameter``.
+
+        :return: Diccionario con ``retention_days``, ``batch_size`` y ``dry_run``.
+        :rtype: dict
+        """
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        values = {key: get_param(key, default) for key, default in GC_PARAMS.items()}
+        return {
+            'retention_days': int(values['second_market.gc_retention_days']),
+            'batch_size': max(1, int(values['second_market.gc_batch_size'])),
+            'dry_run': values['second_market.gc_dry_run'].lower() in ('1', 'true'),
+        }
+
+    @api.model
+    def _gc_deleted_article_domain(self, retention_days):
+        """Dominio de las imágenes de artículos eliminados hace más de ``retention_days`` días.
+
+        Los artículos se borran de forma lógica (``activo = False`` y
+        ``estado_publicacion = 'eliminado'``); el plazo se cuenta desde su
+        ``fecha_eliminacion``, que no cambia aunque el artículo se vuelva a
+        modificar después.
+
+        :param retention_days: Días que se conservan las imágenes tras el borrado.
+        :type retention_days: int
+        :rtype: list
+        """
+        limit_date = fields.Datetime.now() - datetime.timedelta(days=retention_days)
+        return [
+            ('article_id.estado_publicacion', '=', 'eliminado'),
+            ('article_id.activo', '=', False),
+            ('article_id.fecha_eliminacion', '<', limit_date),
+        ]
+
+    @api.model
+    def _gc_orphan_attachment_query(self):
+        """Consulta de los adjuntos de campos binarios cuyo registro ya no existe.
+
+        Aparecen cuando se borran filas sin pasar por el ORM, por ejemplo las
+        imágenes eliminadas por el ``ON DELETE CASCADE`` de su artículo o los
+        usuarios borrados directamente en la base de datos.
+
+        :return: ``SELECT`` de los IDs de ``ir.attachment`` huérfanos.
+        :rtype: :class:`odoo.tools.SQL`
+        """
+        return SQL(" UNION ALL ").join(
+            SQL(
+                """
+                SELECT a.id FROM ir_attachment a
+                 WHERE a.res_model = %(model)s
+                   AND a.res_field IS NOT NULL
+                   AND NOT EXISTS (SELECT 1 FROM %(table)s r WHERE r.id = a.res_id)
+                """,
+                model=model_name,
+                table=SQL.identifier(self.env[model_name]._table),
+            )
+            for model_name in GC_ATTACHMENT_MODELS
+        )
+
+    @api.model
+    def _gc_orphan_attachment_ids(self, limit=None):
+        """IDs de los adjuntos huérfanos (ver :meth:`_gc_orphan_attachment_query`).
+
+        :param limit: Número máximo de IDs a devolver.
+        :type limit: int or None
+        :rtype: list[int]
+        """
+        query = self._gc_orphan_attachment_query()
+        if limit:
+            query = SQL("%s ORDER BY id LIMIT %s", query, limit)
+        self.env.cr.execute(query)
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _gc_orphan_attachment_count(self):
+        """Número de adjuntos huérfanos (ver :meth:`_gc_orphan_attachment_query`).
+
+        :rtype: int
+        """
+        self.env.cr.execute(SQL("SELECT count(*) FROM (%s) orphans", self._gc_orphan_attachment_query()))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _gc_orphan_binaries(self, dry_run=None):
+        """Liberar el espacio de imágenes de artículos eliminados y de adjuntos huérfanos (tarea programada).
+
+        Cada ejecución procesa como mucho ``second_market.gc_batch_size``
+        registros de cada tipo e informa del progreso con
+        ``ir.cron._notify_progress``, de modo que el planificador vuelve a
+        lanzar la tarea hasta terminar; si se interrumpe, la siguiente
+        ejecución continúa con lo que quede. Los ficheros del filestore los
+        borra después la limpieza automática de Odoo (``ir.autovacuum``),
+        solo cuando ningún otro adjunto comparte el mismo contenido.
+
+        En modo simulación (parámetro ``second_market.gc_dry_run`` o
+        ``dry_run=True``) no se borra nada y solo se registra el informe::
+
+            odoo shell -d <bd> <<< "print(env['second_market.image']._gc_orphan_binaries(dry_run=True))"
+
+        :param dry_run: Forzar o desactivar el modo simulación; ``None`` usa el parámetro.
+        :type dry_run: bool or None
+        :return: Informe con ``dry_run``, ``images``, ``attachments`` y ``bytes``
+            (tamaño de los adjuntos afectados) y, si no es simulación, ``remaining``.
+        :rtype: dict
+        """
+        settings = self._gc_settings()
+        if dry_run is None:
+            dry_run = settings['dry_run']
+        batch_size = settings['batch_size']
+        images_domain = self._gc_deleted_article_domain(settings['retention_days'])
+        Attachment = self.env['ir.attachment'].sudo()
+
+        if dry_run:
+            images = self.sudo().search(images_domain)
+            orphan_ids = self._gc_orphan_attachment_ids()
+            affected = Attachment.search([
+                ('res_model', '=', self._name),
+                ('res_id', 'in', images.ids),
+                ('res_field', '!=', False),
+            ]) | Attachment.browse(orphan_ids)
+            report = {
+                'dry_run': True,
+                'images': len(images),
+                'attachments': len(orphan_ids),
+                'bytes': sum(affected.mapped('file_size')),
+            }
+            _logger.info(
+                f"Limpieza de binarios (simulación): {report['images']} imágenes de artículos "
+                f"eliminados y {report['attachments']} adjuntos huérfanos, {report['bytes']} bytes"
+            )
+            return report
+
+        images = self.sudo().search(images_domain, order='id', limit=batch_size)
+        image_attachments = Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', images.ids),
+            ('res_field', '!=', False),
+        ])
+        orphans = Attachment.browse(self._gc_orphan_attachment_ids(limit=batch_size))
+        report = {
+            'dry_run': False,
+            'images': len(images),
+            'attachments': len(orphans),
+            'bytes': sum((image_attachments | orphans).mapped('file_size')),
+        }
+        images.unlink()
+        orphans.unlink()
+
+        report['remaining'] = self.sudo().search_count(images_domain) + self._gc_orphan_attachment_count()
+        self.env['ir.cron']._notify_progress(
+            done=report['images'] + report['attachments'],
+            remaining=report['remaining'],
+        )
+        if report['images'] or report['attachments']:
+            _logger.info(
+                f"Limpieza de binarios: eliminadas {report['images']} imágenes de artículos eliminados "
+                f"y {report['attachments']} adjuntos huérfanos ({report['bytes']} bytes), quedan {report['remaining']}"
+            )
+        return report
@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+
+from . import test_geohash
+from . import test_second_market_articulo
+from . import test_second_market_imagen
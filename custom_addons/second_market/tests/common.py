@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Utilidades comunes para los tests de Second Market.
+
+Proporciona :class:`SecondMarketCase`, una ``TransactionCase`` con un usuario,
+una categoría y un ayudante para crear artículos válidos (con al menos una
+imagen, como exige el modelo).
+"""
+
+import base64
+import io
+
+from PIL import Image
+
+from odoo.tests.common import TransactionCase
+
+
+def make_jpeg(width=64, height=64, color=(200, 30, 30), quality=95):
+    """Generar un JPEG en memoria.
+
+    :param width: Ancho en píxeles.
+    :type width: int
+    :param height: Alto en píxeles.
+    :type height: int
+    :param color: Color RGB de relleno.
+    :type color: tuple
+    :param quality: Calidad de compresión.
+    :type quality: int
+    :return: Bytes del JPEG generado.
+    :rtype: bytes
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+class SecondMarketCase(TransactionCase):
+    """Caso base con un propietario y una categoría de prueba."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(SecondMarketCase, cls).setUpClass()
+        cls.owner = cls.env['second_market.user'].create({
+            'name': 'Propietario Test',
+            'login': 'propietario.test@example.com',
+            'password': 'password-test',
+        })
+        cls.category = cls.env['second_market.category'].create({
+            'name': 'Categoría Test',
+        })
+
+    @classmethod
+    def create_article(cls, image_content=None, **vals):
+        """Crear un artículo con una imagen.
+
+        :param image_content: Bytes de la imagen; por defecto, un JPEG pequeño.
+        :type image_content: bytes or None
+        :param vals: Valores adicionales o que sustituyen a los de por defecto.
+        :return: Artículo creado.
+        :rtype: second_market.article
+        """
+        content = image_content or make_jpeg()
+        values = {
+            'nombre': 'Artículo Test',
+            'id_propietario': cls.owner.id,
+            'id_categoria': cls.category.id,
+            'precio': 10.0,
+            'localidad': 'Madrid',
+            'ids_imagenes': [(0, 0, {'image': base64.b64encode(content)})],
+        }
+        values.update(vals)
+        return cls.env['second_market.article'].create(values)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+
+from ..tools import geohash
+from .common import SecondMarketCase
+
+
+@tagged('post_install', '-at_install')
+class TestGeohash(BaseCase):
+    """Tests de las utilidades de :mod:`second_market.tools.geohash`."""
+
+    def test_encode_known_values(self):
+        self.assertEqual(geohash.encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        self.assertEqual(geohash.encode(42.6, -5.6, 5), 'ezs42')
+
+    def test_encode_default_precision(self):
+        self.assertEqual(len(geohash.encode(40.4168, -3.7038)), geohash.PRECISION)
+
+    def test_decode_bbox_contains_point(self):
+        min_lat, min_lon, max_lat, max_lon = geohash.decode_bbox('ezs42')
+        self.assertTrue(min_lat <= 42.6 <= max_lat)
+        self.assertTrue(min_lon <= -5.6 <= max_lon)
+        lat_h, lon_w = geohash.cell_size(5)
+        self.assertAlmostEqual(max_lat - min_lat, lat_h)
+        self.assertAlmostEqual(max_lon - min_lon, lon_w)
+
+    def test_nearby_points_share_prefix(self):
+        self.assertEqual(
+            geohash.encode(40.4168, -3.7038)[:5],
+            geohash.encode(40.4170, -3.7040)[:5],
+        )
+
+    def test_cover_bbox_covers_every_point(self):
+        bbox = (40.3, -3.8, 40.5, -3.6)
+        prefixes = geohash.cover_bbox(*bbox)
+        self.assertTrue(prefixes)
+        for step_lat in range(11):
+            for step_lon in range(11):
+                latitude = bbox[0] + (bbox[2] - bbox[0]) * step_lat / 10
+                longitude = bbox[1] + (bbox[3] - bbox[1]) * step_lon / 10
+                code = geohash.encode(latitude, longitude)
+                self.assertTrue(any(code.startswith(prefix) for prefix in prefixes), code)
+
+    def test_haversine(self):
+        # Madrid - Barcelona, unos 505 km en línea recta.
+        self.assertAlmostEqual(geohash.haversine_km(40.4168, -3.7038, 41.3874, 2.1686), 505, delta=2)
+        self.assertEqual(geohash.haversine_km(40.0, -3.0, 40.0, -3.0), 0)
+
+
+@tagged('post_install', '-at_install')
+class TestArticuloGeohash(SecondMarketCase):
+    """Tests del geohash guardado en cada artículo."""
+
+    def test_geohash_follows_coordinates(self):
+        articulo = self.create_article(latitud=40.4168, longitud=-3.7038)
+        self.assertEqual(articulo.geohash, geohash.encode(40.4168, -3.7038))
+
+        articulo.write({'latitud': 41.3874, 'longitud': 2.1686})
+        self.assertEqual(articulo.geohash, geohash.encode(41.3874, 2.1686))
+
+    def test_no_geohash_without_coordinates(self):
+        articulo = self.create_article()
+        self.assertFalse(articulo.geohash)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import SecondMarketCase
+
+
+@tagged('post_install', '-at_install')
+class TestArticuloKeyset(SecondMarketCase):
+    """Tests de la paginación por cursor de :meth:`_search_keyset`."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestArticuloKeyset, cls).setUpClass()
+        # Creados en la misma transacción: comparten create_date y el orden
+        # lo decide el id, que es justo el caso que debe resolver la clave.
+        cls.articulos = cls.env['second_market.article']
+        for index in range(5):
+            cls.articulos |= cls.create_article(nombre=f'Artículo {index}', estado_publicacion='publicado')
+        cls.domain = [('id', 'in', cls.articulos.ids)]
+
+    def _walk(self, limit):
+        Article = self.env['second_market.article']
+        pages = []
+        after = None
+        while True:
+            page, after = Article._search_keyset(self.domain, limit=limit, after=after)
+            pages.append(page)
+            if not after:
+                return pages
+
+    def test_pages_cover_all_articles_in_order(self):
+        pages = self._walk(limit=2)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        seen = [article.id for page in pages for article in page]
+        expected = self.env['second_market.article'].search(self.domain, order='create_date desc, id desc').ids
+        self.assertEqual(seen, expected)
+
+    def test_exact_page_has_no_next_key(self):
+        articulos, next_key = self.env['second_market.article']._search_keyset(self.domain, limit=5)
+
+        self.assertEqual(len(articulos), 5)
+        self.assertIsNone(next_key)
+
+    def test_next_key_is_last_article(self):
+        articulos, next_key = self.env['second_market.article']._search_keyset(self.domain, limit=2)
+
+        self.assertEqual(next_key[1], articulos[-1].id)
+        self.assertEqual(next_key[0].replace(microsecond=0), articulos[-1].create_date)
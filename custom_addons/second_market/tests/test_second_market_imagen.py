@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import datetime
+import hashlib
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import SecondMarketCase, make_jpeg
+
+
+@tagged('post_install', '-at_install')
+class TestImagenArticulo(SecondMarketCase):
+    """Tests del checksum y la normalización de ``second_market.image``."""
+
+    def test_checksum_is_sha1_of_original_upload(self):
+        # Más ancha que el máximo por defecto (2048 px): se reescala al guardarla.
+        original = make_jpeg(width=3000, height=100)
+        articulo = self.create_article(image_content=original)
+        imagen = articulo.ids_imagenes
+
+        self.assertEqual(imagen.checksum, hashlib.sha1(original).hexdigest())
+        self.assertNotEqual(base64.b64decode(imagen.image), original)
+
+    def test_checksum_follows_image_on_write(self):
+        articulo = self.create_article()
+        imagen = articulo.ids_imagenes
+        nuevo = make_jpeg(width=3000, height=100, color=(30, 200, 30))
+
+        imagen.write({'image': base64.b64encode(nuevo)})
+
+        self.assertEqual(imagen.checksum, hashlib.sha1(nuevo).hexdigest())
+
+    def test_explicit_checksum_is_kept(self):
+        articulo = self.create_article()
+        checksum = 'a' * 40
+
+        imagen = self.env['second_market.image'].create({
+            'article_id': articulo.id,
+            'image': base64.b64encode(make_jpeg(color=(0, 0, 200))),
+            'checksum': checksum,
+        })
+
+        self.assertEqual(imagen.checksum, checksum)
+
+    def test_gc_domain_counts_from_deletion_date(self):
+        articulo = self.create_article()
+        imagen = articulo.ids_imagenes
+        articulo.write({'activo': False, 'estado_publicacion': 'eliminado'})
+        self.assertTrue(articulo.fecha_eliminacion)
+
+        antigua = fields.Datetime.now() - datetime.timedelta(days=60)
+        articulo.write({'fecha_eliminacion': antigua})
+        # Una escritura posterior no reinicia el plazo de retención.
+        articulo.write({'nombre': 'Renombrado tras borrar'})
+        self.assertEqual(articulo.fecha_eliminacion, antigua)
+
+        Imagen = self.env['second_market.image']
+        self.assertIn(imagen, Imagen.search(Imagen._gc_deleted_article_domain(30)))
+        self.assertNotIn(imagen, Imagen.search(Imagen._gc_deleted_article_domain(90)))
+
+    def test_restoring_article_clears_deletion_date(self):
+        articulo = self.create_article()
+        articulo.write({'activo': False, 'estado_publicacion': 'eliminado'})
+
+        articulo.write({'activo': True, 'estado_publicacion': 'borrador'})
+
+        self.assertFalse(articulo.fecha_eliminacion)
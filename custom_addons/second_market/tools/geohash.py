@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""
+Utilidades de geohash y distancias para las búsquedas geográficas de artículos.
+
+Un geohash codifica un punto ``(latitud, longitud)`` como una cadena en base 32
+en la que cada carácter adicional subdivide la celda anterior. Dos puntos
+cercanos comparten prefijo, de modo que una zona rectangular se puede cubrir
+con unos pocos prefijos y consultar con ``geohash LIKE 'prefijo%'`` sobre un
+índice B-tree, sin extensiones de PostgreSQL.
+"""
+
+import math
+
+#: Alfabeto base 32 del geohash (sin ``a``, ``i``, ``l`` ni ``o``).
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+#: Precisión con la que se guarda el geohash de cada artículo (~5 m).
+PRECISION = 9
+
+#: Radio medio de la Tierra en kilómetros.
+EARTH_RADIUS_KM = 6371.0088
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    """Codificar un punto como geohash.
+
+    :param latitude: Latitud en grados (-90 a 90).
+    :type latitude: float
+    :param longitude: Longitud en grados (-180 a 180).
+    :type longitude: float
+    :param precision: Número de caracteres del geohash.
+    :type precision: int
+    :return: Geohash del punto.
+    :rtype: str
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bit = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                value = (value << 1) | 1
+                lon_range[0] = mid
+            else:
+                value <<= 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bit += 1
+        if bit == 5:
+            chars.append(BASE32[value])
+            bit = 0
+            value = 0
+    return ''.join(chars)
+
+
+def decode_bbox(geohash):
+    """Obtener el rectángulo que cubre un geohash.
+
+    :param geohash: Geohash a decodificar.
+    :type geohash: str
+    :return: Tupla ``(min_lat, min_lon, max_lat, max_lon)``.
+    :rtype: tuple
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+
+def cell_size(precision):
+    """Dimensiones en grados de una celda de geohash.
+
+    :param precision: Número de caracteres del geohash.
+    :type precision: int
+    :return: Tupla ``(alto_lat, ancho_lon)`` en grados.
+    :rtype: tuple
+    """
+    bits = precision * 5
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def _cells_for(min_lat, min_lon, max_lat, max_lon, precision):
+    """Número de celdas de la precisión dada que cubren el rectángulo."""
+    lat_h, lon_w = cell_size(precision)
+    rows = math.floor(max_lat / lat_h) - math.floor(min_lat / lat_h) + 1
+    cols = math.floor(max_lon / lon_w) - math.floor(min_lon / lon_w) + 1
+    return rows * cols
+
+
+def _steps(start, stop, step):
+    """Puntos de muestreo de ``start`` a ``stop`` (ambos incluidos) cada ``step``."""
+    points = []
+    value = start
+    while value < stop:
+        points.append(value)
+        value += step
+    points.append(stop)
+    return points
+
+
+def precision_for_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=16):
+    """Mayor precisión cuyo número de celdas para cubrir el rectángulo no supera ``max_cells``.
+
+    :return: Precisión entre 1 y :data:`PRECISION`.
+    :rtype: int
+    """
+    for precision in range(PRECISION, 0, -1):
+        if _cells_for(min_lat, min_lon, max_lat, max_lon, precision) <= max_cells:
+            return precision
+    return 1
+
+
+def precision_for_zoom(zoom):
+    """Precisión de geohash adecuada para un nivel de zoom de mapa (0-21).
+
+    Cada celda resultante ocupa aproximadamente entre 30 y 100 píxeles en
+    pantalla, el tamaño de un marcador de grupo.
+
+    :param zoom: Nivel de zoom del mapa (estilo Web Mercator).
+    :type zoom: int
+    :return: Precisión entre 1 y ``PRECISION - 1``.
+    :rtype: int
+    """
+    return max(1, min(PRECISION - 1, int(zoom * 2 // 5) + 1))
+
+
+def cover_bbox(min_lat, min_lon, max_lat, max_lon, max_cells=16):
+    """Calcular los prefijos de geohash que cubren un rectángulo.
+
+    Se elige la mayor precisión con la que bastan como mucho ``max_cells``
+    celdas, de forma que la consulta resultante recorre pocas ramas del índice
+    y descarta pocas filas.
+
+    :param min_lat: Latitud mínima.
+    :param min_lon: Longitud mínima.
+    :param max_lat: Latitud máxima.
+    :param max_lon: Longitud máxima.
+    :param max_cells: Número máximo de prefijos a devolver.
+    :type max_cells: int
+    :return: Lista ordenada de prefijos.
+    :rtype: list[str]
+    """
+    precision = precision_for_bbox(min_lat, min_lon, max_lat, max_lon, max_cells)
+    lat_h, lon_w = cell_size(precision)
+    prefixes = {
+        encode(lat, lon, precision)
+        for lat in _steps(min_lat, max_lat, lat_h)
+        for lon in _steps(min_lon, max_lon, lon_w)
+    }
+    return sorted(prefixes)
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Rectángulo que contiene el círculo de radio ``radius_km`` alrededor de un punto.
+
+    :return: Tupla ``(min_lat, min_lon, max_lat, max_lon)`` limitada a rangos válidos.
+    :rtype: tuple
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat < 1e-6:
+        delta_lon = 180.0
+    else:
+        delta_lon = min(180.0, math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)))
+    return (
+        max(-90.0, latitude - delta_lat),
+        max(-180.0, longitude - delta_lon),
+        min(90.0, latitude + delta_lat),
+        min(180.0, longitude + delta_lon),
+    )
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distancia de círculo máximo entre dos puntos, en kilómetros.
+
+    :rtype: float
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))